@@ -541,9 +541,10 @@ class ContestParticipationAdmin(admin.ModelAdmin):
 
     def recalculate_results(self, request, queryset):
         count = 0
-        for participation in queryset:
-            participation.recompute_results()
-            count += 1
+        for contest in Contest.objects.filter(id__in=queryset.values('contest_id')):
+            participations = list(contest.users.filter(id__in=queryset.values('id')))
+            contest.recompute_results(participations)
+            count += len(participations)
         self.message_user(request, ngettext('%d participation recalculated.',
                                              '%d participations recalculated.',
                                              count) % count)
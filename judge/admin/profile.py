@@ -5,7 +5,7 @@ from django.utils.html import format_html
 from django.utils.translation import gettext, gettext_lazy as _, ngettext
 from reversion.admin import VersionAdmin
 from django_ace import AceWidget
-from judge.models import Profile, WebAuthnCredential
+from judge.models import BestSubmission, Profile, Submission, WebAuthnCredential
 from judge.utils.views import NoBatchDeleteMixin
 from judge.widgets import AdminMartorWidget
 
@@ -165,6 +165,7 @@ class ProfileAdmin(NoBatchDeleteMixin, VersionAdmin):
 
     def recalculate_points(self, request, queryset):
         count = 0
+        BestSubmission.rebuild(Submission.objects.filter(user__in=queryset))
         for profile in queryset:
             profile.calculate_points()
             count += 1
@@ -13,8 +13,9 @@ from django.utils.html import format_html
 from django.utils.translation import gettext, gettext_lazy as _, pgettext, ngettext
 
 from django_ace import AceWidget
-from judge.models import ContestParticipation, ContestProblem, ContestSubmission, Profile, Submission, \
-    SubmissionSource, SubmissionTestCase
+from judge.judgeapi import judge_submissions
+from judge.models import BestSubmission, ContestParticipation, ContestProblem, ContestSubmission, Problem, Profile, \
+    Submission, SubmissionSource, SubmissionTestCase
 from judge.utils.raw_sql import use_straight_join
 
 
@@ -179,8 +180,7 @@ class SubmissionAdmin(admin.ModelAdmin):
             id = request.profile.id
             queryset = queryset.filter(Q(problem__authors__id=id) | Q(problem__curators__id=id))
         judged = len(queryset)
-        for model in queryset:
-            model.judge(rejudge=True, batch_rejudge=True)
+        judge_submissions([model.id for model in queryset if not model.is_locked], rejudge=True, batch_rejudge=True)
         self.message_user(request, ngettext('%d submission was successfully scheduled for rejudging.',
                                              '%d submissions were successfully scheduled for rejudging.',
                                              judged) % judged)
@@ -201,6 +201,10 @@ class SubmissionAdmin(admin.ModelAdmin):
             submission.save()
             submission.update_contest()
 
+        BestSubmission.rebuild(queryset)
+        for problem in Problem.objects.filter(id__in=queryset.values_list('problem_id', flat=True).distinct()):
+            problem.reconcile_stats()
+
         for profile in Profile.objects.filter(id__in=queryset.values_list('user_id', flat=True).distinct()):
             profile.calculate_points()
             cache.delete('user_complete:%d' % profile.id)
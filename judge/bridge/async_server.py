@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import zlib
+
+from judge.bridge.base_handler import Disconnect, MAX_PROXY_HEADER_SIZE, size_pack
+
+logger = logging.getLogger('judge.bridge')
+
+
+class AsyncRequest:
+    """Stands in for the socket of a ZlibPacketHandler, writing through an asyncio stream instead.
+
+    Handlers run in executor threads, so writes and shutdowns are handed over to the event loop.
+    """
+
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+        self._timeout = None
+
+    def gettimeout(self):
+        return self._timeout
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+
+    def _call(self, callback, *args):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            callback(*args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def sendall(self, data):
+        self._call(self.writer.write, data)
+
+    def shutdown(self, how):
+        self._call(self.writer.close)
+
+
+class AsyncListener:
+    def __init__(self, address, handler, executor):
+        self.server_address = address
+        self.handler = handler
+        self.executor = executor
+        self.loop = None
+        self.server = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._on_connection, *self.server_address, reuse_address=True)
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+    def run_in_executor(self, func, *args):
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    def run_periodically(self, interval, callback):
+        # Calls callback on the event loop every interval seconds, until it returns a false value.
+        def tick():
+            if callback():
+                self.loop.call_later(interval, tick)
+        self.loop.call_soon_threadsafe(tick)
+
+    async def _on_connection(self, reader, writer):
+        handler = self.handler(AsyncRequest(self.loop, writer), writer.get_extra_info('peername'), self)
+        await self.run_in_executor(handler.on_connect)
+        try:
+            await self._handle(handler, reader)
+        except Exception:
+            logger.exception('Error in base packet handling')
+        finally:
+            await self.run_in_executor(handler.on_disconnect)
+            writer.close()
+
+    async def _read(self, handler, awaitable):
+        return await asyncio.wait_for(awaitable, handler.timeout)
+
+    async def _handle(self, handler, reader):
+        # Mirrors ZlibPacketHandler.handle, with packets handled one at a time on the executor.
+        try:
+            tag = await self._read(handler, reader.readexactly(size_pack.size))
+            handler._initial_tag = tag
+            if handler.client_address[0] in handler.proxies and tag == b'PROX':
+                line = await self._read(handler, reader.readuntil(b'\r\n'))
+                if len(line) > MAX_PROXY_HEADER_SIZE:
+                    raise Disconnect()
+                handler.parse_proxy_protocol(tag + line[:-2])
+                tag = await self._read(handler, reader.readexactly(size_pack.size))
+
+            while True:
+                size = size_pack.unpack(tag)[0]
+                handler.check_packet_size(size)
+                data = await self._read(handler, reader.readexactly(size))
+                await self.run_in_executor(handler._on_packet, data)
+                tag = await self._read(handler, reader.readexactly(size_pack.size))
+        except (Disconnect, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            return
+        except zlib.error:
+            handler.handle_zlib_error()
+        except asyncio.TimeoutError:
+            await self.run_in_executor(handler.handle_timeout)
+
+
+class AsyncServer:
+    def __init__(self, addresses, handler, executor):
+        self.listeners = [AsyncListener(address, handler, executor) for address in addresses]
+
+    async def start(self):
+        for listener in self.listeners:
+            await listener.start()
+
+    def close(self):
+        for listener in self.listeners:
+            listener.close()
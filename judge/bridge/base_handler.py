@@ -14,6 +14,8 @@ size_pack = struct.Struct('!I')
 assert size_pack.size == 4
 
 MAX_ALLOWED_PACKET_SIZE = 8 * 1024 * 1024
+# Max line length for PROXY protocol v1.
+MAX_PROXY_HEADER_SIZE = 107
 
 
 def proxy_list(human_readable):
@@ -38,7 +40,7 @@ class Disconnect(Exception):
 # calling the methods that handles the request.
 class RequestHandlerMeta(type):
     def __call__(cls, *args, **kwargs):
-        handler = super().__call__(*args, **kwargs)
+        handler = cls.create(*args, **kwargs)
         handler.on_connect()
         try:
             handler.handle()
@@ -48,6 +50,10 @@ class RequestHandlerMeta(type):
         finally:
             handler.on_disconnect()
 
+    def create(cls, *args, **kwargs):
+        # Constructs the handler without handling the request, for servers that drive the handler themselves.
+        return super().__call__(*args, **kwargs)
+
 
 class ZlibPacketHandler(metaclass=RequestHandlerMeta):
     proxies = []
@@ -68,12 +74,15 @@ class ZlibPacketHandler(metaclass=RequestHandlerMeta):
     def timeout(self, timeout):
         self.request.settimeout(timeout or None)
 
-    def read_sized_packet(self, size, initial=None):
+    def check_packet_size(self, size):
         if size > MAX_ALLOWED_PACKET_SIZE:
             logger.log(logging.WARNING if self._got_packet else logging.INFO,
                        'Disconnecting client due to too-large message size (%d bytes): %s', size, self.client_address)
             raise Disconnect()
 
+    def read_sized_packet(self, size, initial=None):
+        self.check_packet_size(size)
+
         buffer = []
         remainder = size
 
@@ -114,11 +123,11 @@ class ZlibPacketHandler(metaclass=RequestHandlerMeta):
         return size_pack.unpack(buffer)[0]
 
     def read_proxy_header(self, buffer=b''):
-        # Max line length for PROXY protocol is 107, and we received 4 already.
+        # We received 4 bytes of the header already.
         while b'\r\n' not in buffer:
-            if len(buffer) > 107:
+            if len(buffer) > MAX_PROXY_HEADER_SIZE:
                 raise Disconnect()
-            data = self.request.recv(107)
+            data = self.request.recv(MAX_PROXY_HEADER_SIZE)
             if not data:
                 raise Disconnect()
             buffer += data
@@ -170,24 +179,30 @@ class ZlibPacketHandler(metaclass=RequestHandlerMeta):
         except Disconnect:
             return
         except zlib.error:
-            if self._got_packet:
-                logger.warning('Encountered zlib error during packet handling, disconnecting client: %s',
-                               self.client_address, exc_info=True)
-            else:
-                logger.info('Potentially wrong protocol (zlib error): %s: %r', self.client_address, self._initial_tag,
-                            exc_info=True)
+            self.handle_zlib_error()
         except socket.timeout:
-            if self._got_packet:
-                logger.info('Socket timed out: %s', self.client_address)
-                self.on_timeout()
-            else:
-                logger.info('Potentially wrong protocol: %s: %r', self.client_address, self._initial_tag)
+            self.handle_timeout()
         except socket.error as e:
             # When a gevent socket is shutdown, gevent cancels all waits, causing recv to raise cancel_wait_ex.
             if e.__class__.__name__ == 'cancel_wait_ex':
                 return
             raise
 
+    def handle_zlib_error(self):
+        if self._got_packet:
+            logger.warning('Encountered zlib error during packet handling, disconnecting client: %s',
+                           self.client_address, exc_info=True)
+        else:
+            logger.info('Potentially wrong protocol (zlib error): %s: %r', self.client_address, self._initial_tag,
+                        exc_info=True)
+
+    def handle_timeout(self):
+        if self._got_packet:
+            logger.info('Socket timed out: %s', self.client_address)
+            self.on_timeout()
+        else:
+            logger.info('Potentially wrong protocol: %s: %r', self.client_address, self._initial_tag)
+
     def send(self, data):
         compressed = zlib.compress(data.encode('utf-8'))
         self.request.sendall(size_pack.pack(len(compressed)) + compressed)
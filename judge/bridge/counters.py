@@ -0,0 +1,16 @@
+import threading
+from collections import Counter
+
+# Bridge-wide counters, e.g. test case packets received versus rows written, reported to Django on request.
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def count(**kwargs):
+    with _lock:
+        _counters.update(kwargs)
+
+
+def snapshot():
+    with _lock:
+        return dict(_counters)
@@ -1,29 +1,46 @@
+import asyncio
 import logging
 import signal
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
 from django.conf import settings
 
+from judge.bridge.async_server import AsyncServer
 from judge.bridge.django_handler import DjangoHandler
 from judge.bridge.judge_handler import JudgeHandler
 from judge.bridge.judge_list import JudgeList
+from judge.bridge.post_grading import post_grading
 from judge.bridge.server import Server
 from judge.models import Judge, Submission
 
 logger = logging.getLogger('judge.bridge')
 
+STOP_SIGNALS = (signal.SIGINT, signal.SIGQUIT, signal.SIGTERM)
+
 
 def reset_judges():
     Judge.objects.update(online=False, ping=None, load=None)
 
 
-def judge_daemon():
+def judge_daemon(use_asyncio=False):
     reset_judges()
     Submission.objects.filter(status__in=Submission.IN_PROGRESS_GRADING_STATUS) \
         .update(status='IE', result='IE', error=None)
     judges = JudgeList()
 
+    post_grading.start()
+    try:
+        if use_asyncio:
+            judge_daemon_asyncio(judges)
+        else:
+            judge_daemon_threaded(judges)
+    finally:
+        post_grading.stop()
+
+
+def judge_daemon_threaded(judges):
     judge_server = Server(settings.BRIDGED_JUDGE_ADDRESS, partial(JudgeHandler, judges=judges))
     django_server = Server(settings.BRIDGED_DJANGO_ADDRESS, partial(DjangoHandler, judges=judges))
 
@@ -36,12 +53,44 @@ def judge_daemon():
         logger.info('Exiting due to %s', signal.Signals(signum).name)
         stop.set()
 
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGQUIT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    for signum in STOP_SIGNALS:
+        signal.signal(signum, signal_handler)
 
     try:
         stop.wait()
     finally:
         django_server.shutdown()
         judge_server.shutdown()
+
+
+def judge_daemon_asyncio(judges):
+    # All judge and Django connections share one event loop. Handlers, and with them all database work, run on a
+    # bounded pool of threads.
+    executor = ThreadPoolExecutor(max_workers=settings.BRIDGED_DB_WORKERS, thread_name_prefix='bridge-db')
+    judge_server = AsyncServer(settings.BRIDGED_JUDGE_ADDRESS, partial(JudgeHandler.create, judges=judges), executor)
+    django_server = AsyncServer(settings.BRIDGED_DJANGO_ADDRESS, partial(DjangoHandler.create, judges=judges),
+                                executor)
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+
+        def signal_handler(signum):
+            logger.info('Exiting due to %s', signal.Signals(signum).name)
+            stop.set()
+
+        for signum in STOP_SIGNALS:
+            loop.add_signal_handler(signum, signal_handler, signum)
+
+        await django_server.start()
+        await judge_server.start()
+        try:
+            await stop.wait()
+        finally:
+            django_server.close()
+            judge_server.close()
+
+    try:
+        asyncio.run(serve())
+    finally:
+        executor.shutdown(wait=True)
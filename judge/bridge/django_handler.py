@@ -2,6 +2,9 @@ import json
 import logging
 import struct
 
+from django.conf import settings
+
+from judge.bridge import counters
 from judge.bridge.base_handler import Disconnect, ZlibPacketHandler
 
 logger = logging.getLogger('judge.bridge')
@@ -14,11 +17,17 @@ class DjangoHandler(ZlibPacketHandler):
 
         self.handlers = {
             'submission-request': self.on_submission,
+            'submission-request-batch': self.on_submission_batch,
             'terminate-submission': self.on_termination,
             'disconnect-judge': self.on_disconnect_request,
+            'get-counters': self.on_get_counters,
         }
         self.judges = judges
 
+    def on_connect(self):
+        # Pooled connections wait for requests between uses, and shouldn't hold on to a thread once abandoned.
+        self.timeout = settings.BRIDGED_DJANGO_IDLE_TIMEOUT
+
     def send(self, data):
         super().send(json.dumps(data, separators=(',', ':')))
 
@@ -29,8 +38,14 @@ class DjangoHandler(ZlibPacketHandler):
         except Exception:
             logger.exception('Error in packet handling (Django-facing)')
             result = {'name': 'bad-request'}
-        self.send(result)
-        raise Disconnect()
+
+        # Packets tagged with a request id come from a persistent connection, which stays open for further requests.
+        # Untagged packets are one-shot requests.
+        request_id = packet.get('request-id')
+        if request_id is None:
+            self.send(result)
+            raise Disconnect()
+        self.send(dict(result or {}, **{'request-id': request_id}))
 
     def on_submission(self, data):
         id = data['submission-id']
@@ -44,6 +59,21 @@ class DjangoHandler(ZlibPacketHandler):
         self.judges.judge(id, problem, language, source, judge_id, priority)
         return {'name': 'submission-received', 'submission-id': id}
 
+    def on_submission_batch(self, data):
+        received = []
+        for submission in data['submissions']:
+            try:
+                result = self.on_submission(submission)
+            except Exception:
+                logger.exception('Error queueing submission from batch: %s', submission.get('submission-id'))
+                continue
+            if result['name'] == 'submission-received':
+                received.append(result['submission-id'])
+        return {'name': 'submission-batch-received', 'submission-ids': received}
+
+    def on_get_counters(self, data):
+        return {'name': 'counters', 'counters': counters.snapshot()}
+
     def on_termination(self, data):
         return {'name': 'submission-received', 'judge-aborted': self.judges.abort(data['submission-id'])}
 
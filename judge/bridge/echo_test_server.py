@@ -26,13 +26,25 @@ def main():
     parser.add_argument('-l', '--host', action='append')
     parser.add_argument('-p', '--port', type=int, action='append')
     parser.add_argument('-P', '--proxy', action='append')
+    parser.add_argument('-a', '--asyncio', action='store_true')
     args = parser.parse_args()
 
     class Handler(EchoPacketHandler):
         proxies = args.proxy or []
 
-    server = Server(list(zip(args.host, args.port)), Handler)
-    server.serve_forever()
+    if args.asyncio:
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        from judge.bridge.async_server import AsyncServer
+
+        async def serve():
+            await AsyncServer(list(zip(args.host, args.port)), Handler.create, ThreadPoolExecutor(4)).start()
+            await asyncio.Event().wait()
+
+        asyncio.run(serve())
+    else:
+        server = Server(list(zip(args.host, args.port)), Handler)
+        server.serve_forever()
 
 
 if __name__ == '__main__':
@@ -17,9 +17,13 @@ from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
 # from judge import event_poster as event
+from judge.bridge.async_server import AsyncListener
 from judge.bridge.base_handler import ZlibPacketHandler, proxy_list
+from judge.bridge.counters import count
+from judge.bridge.post_grading import post_grading
 from judge.caching import finished_submission
-from judge.models import Judge, Language, LanguageLimit, Problem, RuntimeVersion, Submission, SubmissionTestCase
+from judge.models import BestSubmission, Judge, Language, LanguageLimit, Problem, RuntimeVersion, Submission, \
+    SubmissionTestCase
 
 logger = logging.getLogger('judge.bridge')
 json_log = logging.getLogger('judge.json.bridge')
@@ -27,6 +31,9 @@ json_log = logging.getLogger('judge.json.bridge')
 URL_VALIDATOR = URLValidator()
 UPDATE_RATE_LIMIT = 5
 UPDATE_RATE_TIME = 0.5
+# Test case results are buffered, and written once this many are pending or this many seconds after the first.
+CASE_BUFFER_SIZE = 50
+CASE_BUFFER_TIME = 0.5
 SubmissionData = namedtuple(
     'SubmissionData', 
     'time memory short_circuit pretests_only contest_no attempt_no user_id file_only file_size_limit'
@@ -34,6 +41,9 @@ SubmissionData = namedtuple(
 
 channel_layer = get_channel_layer()
 
+# Test case statuses, from least to most severe. A submission's result is the most severe status of its cases.
+STATUS_CODES = ['SC', 'AC', 'WA', 'MLE', 'TLE', 'IR', 'RTE', 'OLE']
+
 
 def get_submission_file_url(source):
     """ Get absolute URL to submission file
@@ -56,6 +66,43 @@ def _ensure_connection():
         db.connection.close()
 
 
+class SubmissionAggregate(object):
+    """Running totals over the test cases of a submission, from which grading-end computes its result."""
+
+    def __init__(self, id):
+        self.id = id
+        self.time = 0
+        self.memory = 0
+        self.points = 0.0
+        self.total = 0
+        self.status = 0
+        self.batches = {}  # batch number: [points, total]
+
+    def add(self, case):
+        self.time += case.time
+        if not case.batch:
+            self.points += case.points
+            self.total += case.total
+        elif case.batch in self.batches:
+            self.batches[case.batch][0] = min(self.batches[case.batch][0], case.points)
+            self.batches[case.batch][1] = max(self.batches[case.batch][1], case.total)
+        else:
+            self.batches[case.batch] = [case.points, case.total]
+        self.memory = max(self.memory, case.memory)
+        self.status = max(self.status, STATUS_CODES.index(case.status))
+
+    def case_points(self):
+        points, total = self.points, self.total
+        for batch_points, batch_total in self.batches.values():
+            points += batch_points
+            total += batch_total
+        return round(points, 1), round(total, 1)
+
+    @property
+    def result(self):
+        return STATUS_CODES[self.status]
+
+
 class JudgeHandler(ZlibPacketHandler):
     proxies = proxy_list(settings.BRIDGED_JUDGE_PROXIES or [])
 
@@ -101,6 +148,14 @@ class JudgeHandler(ZlibPacketHandler):
         self._submission_cache_id = None
         self._submission_cache = {}
 
+        # Buffered test case results: (submission id, SubmissionTestCase list, highest position)
+        self._case_buffer = None
+        # Flushes the buffer CASE_BUFFER_TIME seconds after it was opened, if nothing else has by then.
+        self._case_timer = None
+        self._case_lock = threading.RLock()
+        # Totals over the test cases of the submission being graded, if this handler has seen all of them.
+        self._aggregate = None
+
     def on_connect(self):
         self.timeout = 15
         logger.info('Judge connected from: %s', self.client_address)
@@ -108,6 +163,10 @@ class JudgeHandler(ZlibPacketHandler):
 
     def on_disconnect(self):
         self._stop_ping.set()
+        try:
+            self._flush_test_cases()
+        except Exception:
+            logger.exception('Failed to write buffered test cases of %s', self.name)
         if self._working:
             logger.error('Judge %s disconnected while handling submission %s', self.name, self._working)
         self.judges.remove(self)
@@ -189,7 +248,10 @@ class JudgeHandler(ZlibPacketHandler):
         self.send({'name': 'handshake-success'})
         logger.info('Judge authenticated: %s (%s)', self.client_address, packet['id'])
         self.judges.register(self)
-        threading.Thread(target=self._ping_thread).start()
+        if isinstance(self.server, AsyncListener):
+            self.server.run_periodically(10, self._ping_once)
+        else:
+            threading.Thread(target=self._ping_thread).start()
         self._connected()
 
     def can_judge(self, problem, executor, judge_id=None):
@@ -359,11 +421,16 @@ class JudgeHandler(ZlibPacketHandler):
     def on_grading_begin(self, packet):
         logger.info('%s: Grading has begun on: %s', self.name, packet['submission-id'])
         self.batch_id = None
+        with self._case_lock:
+            self._cancel_case_timer()
+            self._case_buffer = None
+        self._aggregate = None
 
         if Submission.objects.filter(id=packet['submission-id']).update(
                 status='G', is_pretested=packet['pretested'], current_testcase=1,
                 batch=False, judged_date=timezone.now()):
             SubmissionTestCase.objects.filter(submission_id=packet['submission-id']).delete()
+            self._aggregate = SubmissionAggregate(packet['submission-id'])
             async_to_sync(channel_layer.group_send)(
                 'sub_%s' % Submission.get_id_secret(packet['submission-id']),
                 {
@@ -380,46 +447,30 @@ class JudgeHandler(ZlibPacketHandler):
 
     def on_grading_end(self, packet):
         logger.info('%s: Grading has ended on: %s', self.name, packet['submission-id'])
+        self._flush_test_cases()
         self._free_self(packet)
         self.batch_id = None
 
         try:
-            submission = Submission.objects.get(id=packet['submission-id'])
+            submission = Submission.objects.select_related('problem', 'user').get(id=packet['submission-id'])
         except Submission.DoesNotExist:
             logger.warning('Unknown submission: %s', packet['submission-id'])
             json_log.error(self._make_json_log(packet, action='grading-end', info='unknown submission'))
             return
 
-        time = 0
-        memory = 0
-        points = 0.0
-        total = 0
-        status = 0
-        status_codes = ['SC', 'AC', 'WA', 'MLE', 'TLE', 'IR', 'RTE', 'OLE']
-        batches = {}  # batch number: (points, total)
-
-        for case in SubmissionTestCase.objects.filter(submission=submission):
-            time += case.time
-            if not case.batch:
-                points += case.points
-                total += case.total
-            else:
-                if case.batch in batches:
-                    batches[case.batch][0] = min(batches[case.batch][0], case.points)
-                    batches[case.batch][1] = max(batches[case.batch][1], case.total)
-                else:
-                    batches[case.batch] = [case.points, case.total]
-            memory = max(memory, case.memory)
-            i = status_codes.index(case.status)
-            if i > status:
-                status = i
-
-        for i in batches:
-            points += batches[i][0]
-            total += batches[i][1]
-
-        points = round(points, 1)
-        total = round(total, 1)
+        aggregate, self._aggregate = self._aggregate, None
+        if aggregate is None or aggregate.id != submission.id:
+            # This handler didn't see the whole submission being graded, e.g. the judge reconnected or the bridge
+            # restarted mid-grading, so the totals have to come from the test cases stored so far.
+            count(aggregate_fallbacks=1)
+            aggregate = SubmissionAggregate(submission.id)
+            for case in SubmissionTestCase.objects.filter(submission=submission) \
+                    .only('time', 'memory', 'points', 'total', 'batch', 'status'):
+                aggregate.add(case)
+
+        time = aggregate.time
+        memory = aggregate.memory
+        points, total = aggregate.case_points()
         submission.case_points = points
         submission.case_total = total
 
@@ -432,8 +483,14 @@ class JudgeHandler(ZlibPacketHandler):
         submission.time = time
         submission.memory = memory
         submission.points = sub_points
-        submission.result = status_codes[status]
-        submission.save()
+        submission.result = aggregate.result
+        if problem.is_accepted(submission.result, submission.points):
+            with db.transaction.atomic():
+                Problem.lock_stats([problem.id])
+                submission.save()
+                problem.adjust_stats(accepted={submission.user_id: 1})
+        else:
+            submission.save()
 
         json_log.info(self._make_json_log(
             packet, action='grading-end', time=time, memory=memory,
@@ -442,13 +499,10 @@ class JudgeHandler(ZlibPacketHandler):
             problem=problem.code, finish=True,
         ))
 
-        if problem.is_public and not problem.is_organization_private:
-            submission.user._updating_stats_only = True
-            submission.user.calculate_points()
-
-        problem._updating_stats_only = True
-        problem.update_stats()
-        submission.update_contest()
+        # User points and contest results are recomputed by the post-grading worker.
+        BestSubmission.update_for(submission)
+        submission.update_contest(recompute=False)
+        post_grading.submission_graded(submission)
 
         finished_submission(submission)
 
@@ -474,19 +528,11 @@ class JudgeHandler(ZlibPacketHandler):
         #     'total': float(problem.points),
         #     'result': submission.result,
         # })
-        if hasattr(submission, 'contest'):
-            participation = submission.contest.participation
-            # event.post('contest_%d' % participation.contest_id, {'type': 'update'})
-            async_to_sync(channel_layer.group_send)(
-                'contest_%d' % participation.contest_id,
-                {
-                    'type': 'update',
-                }
-            )
         self._post_update_submission(submission.id, 'grading-end', done=True)
 
     def on_compile_error(self, packet):
         logger.info('%s: Submission failed to compile: %s', self.name, packet['submission-id'])
+        self._flush_test_cases()
         self._free_self(packet)
 
         if Submission.objects.filter(id=packet['submission-id']).update(status='CE', result='CE', error=packet['log']):
@@ -534,6 +580,7 @@ class JudgeHandler(ZlibPacketHandler):
             raise ValueError('\n\n' + packet['message'])
         except ValueError:
             logger.exception('Judge %s failed while handling submission %s', self.name, packet['submission-id'])
+        self._flush_test_cases()
         self._free_self(packet)
 
         id = packet['submission-id']
@@ -556,6 +603,7 @@ class JudgeHandler(ZlibPacketHandler):
 
     def on_submission_terminated(self, packet):
         logger.info('%s: Submission aborted: %s', self.name, packet['submission-id'])
+        self._flush_test_cases()
         self._free_self(packet)
 
         if Submission.objects.filter(id=packet['submission-id']).update(status='AB', result='AB', points=0):
@@ -585,6 +633,7 @@ class JudgeHandler(ZlibPacketHandler):
         json_log.info(self._make_json_log(packet, action='batch-begin', batch=self.batch_id))
 
     def on_batch_end(self, packet):
+        self._flush_test_cases()
         self.in_batch = False
         logger.info('%s: Batch ended on: %s', self.name, packet['submission-id'])
         json_log.info(self._make_json_log(packet, action='batch-end', batch=self.batch_id))
@@ -595,13 +644,22 @@ class JudgeHandler(ZlibPacketHandler):
         id = packet['submission-id']
         updates = packet['cases']
         max_position = max(map(itemgetter('position'), updates))
+        count(case_packets=1, cases=len(updates))
+
+        with self._case_lock:
+            self._buffer_test_cases(packet, id, updates, max_position, max_feedback)
+
+    def _buffer_test_cases(self, packet, id, updates, max_position, max_feedback):
+        if self._case_buffer is not None and self._case_buffer[0] != id:
+            self._flush_test_cases()
+        if self._case_buffer is None:
+            self._case_buffer = (id, [], max_position)
+            self._case_timer = threading.Timer(CASE_BUFFER_TIME, self._flush_test_cases_on_timer)
+            self._case_timer.daemon = True
+            self._case_timer.start()
+        _, test_cases, buffered_position = self._case_buffer
+        self._case_buffer = (id, test_cases, max(buffered_position, max_position))
 
-        if not Submission.objects.filter(id=id).update(current_testcase=max_position + 1):
-            logger.warning('Unknown submission: %s', id)
-            json_log.error(self._make_json_log(packet, action='test-case', info='unknown submission'))
-            return
-
-        bulk_test_case_updates = []
         for result in updates:
             test_case = SubmissionTestCase(submission_id=id, case=result['position'])
             status = result['status']
@@ -629,7 +687,9 @@ class JudgeHandler(ZlibPacketHandler):
             test_case.feedback = (result.get('feedback') or '')[:max_feedback]
             test_case.extended_feedback = result.get('extended-feedback') or ''
             test_case.output = result['output']
-            bulk_test_case_updates.append(test_case)
+            test_cases.append(test_case)
+            if self._aggregate is not None and self._aggregate.id == id:
+                self._aggregate.add(test_case)
 
             json_log.info(self._make_json_log(
                 packet, action='test-case', case=test_case.case, batch=test_case.batch,
@@ -638,6 +698,44 @@ class JudgeHandler(ZlibPacketHandler):
                 points=test_case.points, total=test_case.total, status=test_case.status,
             ))
 
+        if len(test_cases) >= CASE_BUFFER_SIZE:
+            self._flush_test_cases()
+
+    def _cancel_case_timer(self):
+        if self._case_timer is not None:
+            self._case_timer.cancel()
+            self._case_timer = None
+
+    def _flush_test_cases_on_timer(self):
+        try:
+            self._flush_test_cases()
+        except Exception:
+            logger.exception('Failed to write buffered test cases of %s', self.name)
+        finally:
+            # Each timer runs on its own thread, whose connection would otherwise stay open.
+            db.connection.close()
+
+    def _flush_test_cases(self):
+        # Writes out the buffered test cases, which must happen before anything reads them back or the submission
+        # moves on, e.g. at the end of a batch or of grading.
+        with self._case_lock:
+            self._cancel_case_timer()
+            if self._case_buffer is None:
+                return
+            id, test_cases, max_position = self._case_buffer
+            self._case_buffer = None
+            self._write_test_cases(id, test_cases, max_position)
+
+    def _write_test_cases(self, id, test_cases, max_position):
+
+        if not Submission.objects.filter(id=id).update(current_testcase=max_position + 1):
+            logger.warning('Unknown submission: %s', id)
+            json_log.error(self._make_json_log(sub=id, action='test-case', info='unknown submission'))
+            return
+
+        SubmissionTestCase.objects.bulk_create(test_cases)
+        count(case_flushes=1, case_rows=len(test_cases))
+
         do_post = True
 
         if id in self.update_counter:
@@ -668,8 +766,6 @@ class JudgeHandler(ZlibPacketHandler):
             # })
             self._post_update_submission(id, state='test-case')
 
-        SubmissionTestCase.objects.bulk_create(bulk_test_case_updates)
-
     def on_malformed(self, packet):
         logger.error('%s: Malformed packet: %s', self.name, packet)
         json_log.exception(self._make_json_log(sub=self._working, info='malformed json packet'))
@@ -686,16 +782,20 @@ class JudgeHandler(ZlibPacketHandler):
     def _free_self(self, packet):
         self.judges.on_judge_free(self, packet['submission-id'])
 
-    def _ping_thread(self):
+    def _ping_once(self):
+        if self._stop_ping.is_set():
+            return False
         try:
-            while True:
-                self.ping()
-                if self._stop_ping.wait(10):
-                    break
+            self.ping()
         except Exception:
             logger.exception('Ping error in %s', self.name)
             self.close()
-            raise
+            return False
+        return True
+
+    def _ping_thread(self):
+        while self._ping_once() and not self._stop_ping.wait(10):
+            pass
 
     def _make_json_log(self, packet=None, sub=None, **kwargs):
         data = {
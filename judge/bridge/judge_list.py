@@ -1,5 +1,7 @@
 import logging
 from collections import namedtuple
+from heapq import heappop, heappush
+from itertools import count
 from random import random
 from threading import RLock
 
@@ -10,39 +12,138 @@ except ImportError:
 
 logger = logging.getLogger('judge.bridge')
 
-PriorityMarker = namedtuple('PriorityMarker', 'priority')
+QueuedSubmission = namedtuple('QueuedSubmission', 'sequence id problem language source judge_id priority')
+
+
+class BucketHeap(object):
+    """Min-heap of bucket keys by the sequence number of their head, supporting updates and removal by key."""
+
+    def __init__(self):
+        self.heap = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.positions[heap[i][1]] = i
+        self.positions[heap[j][1]] = j
+
+    def _sift_up(self, index):
+        while index:
+            parent = (index - 1) // 2
+            if self.heap[parent] <= self.heap[index]:
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index):
+        heap = self.heap
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap) and heap[child] < heap[smallest]:
+                    smallest = child
+            if smallest == index:
+                break
+            self._swap(index, smallest)
+            index = smallest
+
+    def push(self, key, sequence):
+        self.positions[key] = len(self.heap)
+        self.heap.append((sequence, key))
+        self._sift_up(len(self.heap) - 1)
+
+    def update(self, key, sequence):
+        # Bucket heads only ever move back in the queue.
+        index = self.positions[key]
+        self.heap[index] = (sequence, key)
+        self._sift_down(index)
+
+    def remove(self, key):
+        index = self.positions.pop(key)
+        last = self.heap.pop()
+        if index < len(self.heap):
+            self.heap[index] = last
+            self.positions[last[1]] = index
+            self._sift_up(index)
+            self._sift_down(self.positions[last[1]])
+
+    def ordered(self):
+        # Yields keys in sequence order by walking the heap from its root. Stopping after k keys costs O(k log k),
+        # regardless of how many buckets there are.
+        heap = self.heap
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            (_, key), index = heappop(frontier)
+            yield key
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heappush(frontier, (heap[child], child))
 
 
 class JudgeList(object):
     priorities = 4
 
     def __init__(self):
-        self.queue = dllist()
-        self.priority = [self.queue.append(PriorityMarker(i)) for i in range(self.priorities)]
+        # One index per priority level: (problem, language, judge id) => dllist of QueuedSubmission.
+        # Sequence numbers are global, so that FIFO order is kept within a priority level across buckets.
+        self.queue = [{} for _ in range(self.priorities)]
+        self.heads = [BucketHeap() for _ in range(self.priorities)]
         self.judges = set()
         self.node_map = {}
         self.submission_map = {}
         self.lock = RLock()
+        self._sequence = count()
+
+    def _next_for_judge(self, judge):
+        # A free judge only has to skip over the buckets it can't judge, not every submission queued in them.
+        for buckets, heads in zip(self.queue, self.heads):
+            for key in heads.ordered():
+                if judge.can_judge(*key):
+                    return buckets[key]
+
+    def _enqueue(self, id, problem, language, source, judge_id, priority):
+        entry = QueuedSubmission(next(self._sequence), id, problem, language, source, judge_id, priority)
+        key = problem, language, judge_id
+        bucket = self.queue[priority].get(key)
+        if bucket is None:
+            bucket = self.queue[priority][key] = dllist()
+            self.heads[priority].push(key, entry.sequence)
+        self.node_map[id] = (bucket, bucket.append(entry))
+
+    def _dequeue(self, bucket, node):
+        entry = node.value
+        was_head = bucket.first.value.sequence == entry.sequence
+        bucket.remove(node)
+        del self.node_map[entry.id]
+
+        key = entry.problem, entry.language, entry.judge_id
+        if not bucket.size:
+            del self.queue[entry.priority][key]
+            self.heads[entry.priority].remove(key)
+        elif was_head:
+            self.heads[entry.priority].update(key, bucket.first.value.sequence)
 
     def _handle_free_judge(self, judge):
         with self.lock:
-            node = self.queue.first
-            while node:
-                if not isinstance(node.value, PriorityMarker):
-                    id, problem, language, source, judge_id = node.value
-                    if judge.can_judge(problem, language, judge_id):
-                        self.submission_map[id] = judge
-                        try:
-                            judge.submit(id, problem, language, source)
-                        except Exception:
-                            logger.exception('Failed to dispatch %d (%s, %s) to %s', id, problem, language, judge.name)
-                            self.judges.remove(judge)
-                            return
-                        logger.info('Dispatched queued submission %d: %s', id, judge.name)
-                        self.queue.remove(node)
-                        del self.node_map[id]
-                        break
-                node = node.next
+            bucket = self._next_for_judge(judge)
+            if bucket is None:
+                return
+
+            node = bucket.first
+            id, problem, language, source = node.value[1:5]
+            self.submission_map[id] = judge
+            try:
+                judge.submit(id, problem, language, source)
+            except Exception:
+                logger.exception('Failed to dispatch %d (%s, %s) to %s', id, problem, language, judge.name)
+                self.judges.remove(judge)
+                return
+            logger.info('Dispatched queued submission %d: %s', id, judge.name)
+            self._dequeue(bucket, node)
 
     def register(self, judge):
         with self.lock:
@@ -74,6 +175,9 @@ class JudgeList(object):
     def __iter__(self):
         return iter(self.judges)
 
+    def __len__(self):
+        return len(self.node_map)
+
     def on_judge_free(self, judge, submission):
         logger.info('Judge available after grading %d: %s', submission, judge.name)
         with self.lock:
@@ -89,12 +193,11 @@ class JudgeList(object):
                 return True
             except KeyError:
                 try:
-                    node = self.node_map[submission]
+                    bucket, node = self.node_map[submission]
                 except KeyError:
                     pass
                 else:
-                    self.queue.remove(node)
-                    del self.node_map[submission]
+                    self._dequeue(bucket, node)
                 return False
 
     def check_priority(self, priority):
@@ -126,8 +229,5 @@ class JudgeList(object):
                     self.judges.discard(judge)
                     return self.judge(id, problem, language, source, judge_id, priority)
             else:
-                self.node_map[id] = self.queue.insert(
-                    (id, problem, language, source, judge_id),
-                    self.priority[priority],
-                )
+                self._enqueue(id, problem, language, source, judge_id, priority)
                 logger.info('Queued submission: %d', id)
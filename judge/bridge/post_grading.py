@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django import db
+from django.conf import settings
+
+from judge.bridge.counters import count
+from judge.models import ContestParticipation, Profile
+
+logger = logging.getLogger('judge.bridge')
+
+channel_layer = get_channel_layer()
+
+
+class PostGradingQueue(object):
+    """Recomputes user points and contest results after submissions are graded.
+
+    Once started, the work happens on a background thread, so that judge handlers can go back to grading. Requests
+    made within BRIDGED_POST_GRADING_DELAY seconds of each other are coalesced, e.g. ten submissions by one user
+    cause a single Profile.calculate_points. Until started, the work is done right away on the calling thread.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.profiles = set()
+        self.participations = set()
+        self.thread = None
+        self.stopping = False
+
+    def start(self):
+        if settings.BRIDGED_POST_GRADING_DELAY is None:
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name='post-grading', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Stops the worker, after it has finished the work already requested.
+        if self.thread is None:
+            return
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.thread.join()
+        self.thread = None
+
+    def submission_graded(self, submission):
+        problem = submission.problem
+        profiles = {submission.user_id} if problem.is_public and not problem.is_organization_private else set()
+        participations = {submission.contest.participation_id} if hasattr(submission, 'contest') else set()
+
+        if self.thread is None:
+            self._process(profiles, participations)
+            return
+
+        with self.condition:
+            self.profiles |= profiles
+            self.participations |= participations
+            self.condition.notify()
+
+    def _take(self):
+        with self.condition:
+            pending = self.profiles, self.participations
+            self.profiles, self.participations = set(), set()
+            return pending
+
+    def _has_work(self):
+        return self.profiles or self.participations
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self._has_work() and not self.stopping:
+                    self.condition.wait()
+                if not self._has_work():
+                    break
+                stopping = self.stopping
+
+            if not stopping:
+                # Give further requests for the same objects a chance to arrive.
+                time.sleep(settings.BRIDGED_POST_GRADING_DELAY)
+
+            db.close_old_connections()
+            try:
+                self._process(*self._take())
+            except Exception:
+                logger.exception('Error in post-grading updates')
+
+    def _process(self, profiles, participations):
+        # Each object is updated on its own, so that one failing doesn't leave the rest of the batch stale.
+        for profile in Profile.objects.filter(id__in=profiles):
+            try:
+                profile._updating_stats_only = True
+                profile.calculate_points()
+            except Exception:
+                logger.exception('Error in updating points of profile %d', profile.id)
+
+        for participation in ContestParticipation.objects.filter(id__in=participations).select_related('contest'):
+            try:
+                participation.recompute_results()
+                async_to_sync(channel_layer.group_send)(
+                    'contest_%d' % participation.contest_id,
+                    {
+                        'type': 'update',
+                    },
+                )
+            except Exception:
+                logger.exception('Error in updating results of participation %d', participation.id)
+
+        count(post_grading_runs=1, post_grading_profiles=len(profiles),
+              post_grading_participations=len(participations))
+
+
+post_grading = PostGradingQueue()
@@ -0,0 +1,51 @@
+import threading
+import time
+from functools import partial
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from judge import judgeapi
+from judge.bridge.django_handler import DjangoHandler
+from judge.bridge.server import ThreadingTCPListener
+
+
+class PooledConnectionTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingTCPListener(('127.0.0.1', 0), partial(DjangoHandler, judges=mock.MagicMock()))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        settings = override_settings(BRIDGED_DJANGO_CONNECT=self.server.server_address, BRIDGED_DJANGO_POOL_SIZE=1,
+                                     BRIDGED_DJANGO_IDLE_TIMEOUT=0.2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(self.empty_pool)
+
+    def empty_pool(self):
+        while not judgeapi._connection_pool.empty():
+            judgeapi._connection_pool.get_nowait().close()
+
+    def test_idle_timeout(self):
+        judgeapi.bridge_counters()
+        connection = judgeapi._connection_pool.queue[0]
+        judgeapi.bridge_counters()
+        self.assertIs(judgeapi._connection_pool.queue[0], connection)
+
+        time.sleep(0.5)
+        # The bridge has hung up, and the connection isn't used again.
+        self.assertEqual(connection.reader.read(1), b'')
+        self.assertTrue(connection.is_idle())
+        judgeapi.bridge_counters()
+        self.assertIsNot(judgeapi._connection_pool.queue[0], connection)
+
+    def test_no_reply(self):
+        with mock.patch('judge.judgeapi._pooled_request') as pooled_request, \
+                mock.patch('judge.judgeapi.socket.create_connection') as create_connection:
+            judgeapi.disconnect_judge(SimpleNamespace(name='judge'))
+        pooled_request.assert_not_called()
+        create_connection.return_value.sendall.assert_called_once()
+        create_connection.return_value.makefile.assert_not_called()
@@ -0,0 +1,125 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from judge.bridge import counters
+from judge.bridge.judge_handler import CASE_BUFFER_SIZE, JudgeHandler
+from judge.bridge.judge_list import JudgeList
+from judge.models import Language, Submission, SubmissionTestCase
+from judge.models.tests.util import create_problem, create_user
+
+
+class FakeServer(object):
+    server_address = ('localhost', 9999)
+
+
+@mock.patch('judge.bridge.judge_handler.async_to_sync', mock.MagicMock())
+@mock.patch('judge.bridge.judge_handler.CASE_BUFFER_TIME', 60)
+class JudgeHandlerTestCase(TestCase):
+    fixtures = ['language_all.json']
+
+    def setUp(self):
+        self.submission = Submission.objects.create(
+            user=create_user(username='user').profile,
+            problem=create_problem(code='many_cases', points=10, partial=True),
+            language=Language.get_python3(),
+            status='P',
+        )
+        self.judges = JudgeList()
+        self.handler = JudgeHandler.create(mock.MagicMock(), ('127.0.0.1', 0), FakeServer(), judges=self.judges)
+        self.handler.name = 'judge'
+        self.handler._working = self.submission.id
+        self.judges.submission_map[self.submission.id] = self.handler
+
+    def packet(self, name, **kwargs):
+        return dict(kwargs, name=name, **{'submission-id': self.submission.id})
+
+    def case(self, position, status=0, points=1):
+        return {'position': position, 'status': status, 'time': 0.5, 'memory': position, 'points': points,
+                'total-points': 1, 'output': ''}
+
+    def test_test_cases_buffered(self):
+        self.handler.on_grading_begin(self.packet('grading-begin', pretested=False))
+        before = counters.snapshot()
+
+        cases = CASE_BUFFER_SIZE + 10
+        for position in range(1, cases + 1):
+            self.handler.on_test_case(self.packet('test-case-status', cases=[
+                self.case(position, status=1 if position == 3 else 0, points=0 if position == 3 else 1),
+            ]))
+        self.assertEqual(SubmissionTestCase.objects.filter(submission=self.submission).count(), CASE_BUFFER_SIZE)
+
+        self.handler.on_grading_end(self.packet('grading-end'))
+        self.assertEqual(SubmissionTestCase.objects.filter(submission=self.submission).count(), cases)
+
+        after = counters.snapshot()
+        self.assertEqual(after['case_packets'] - before.get('case_packets', 0), cases)
+        self.assertEqual(after['case_rows'] - before.get('case_rows', 0), cases)
+        self.assertEqual(after['case_flushes'] - before.get('case_flushes', 0), 2)
+
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, 'D')
+        self.assertEqual(self.submission.result, 'WA')
+        self.assertEqual(self.submission.case_points, cases - 1)
+        self.assertEqual(self.submission.case_total, cases)
+        self.assertEqual(self.submission.time, 0.5 * cases)
+        self.assertEqual(self.submission.memory, cases)
+        self.assertEqual(self.submission.current_testcase, cases + 1)
+
+    def test_batch_end_flushes(self):
+        self.handler.on_grading_begin(self.packet('grading-begin', pretested=False))
+        self.handler.on_batch_begin(self.packet('batch-begin'))
+        self.handler.on_test_case(self.packet('test-case-status', cases=[self.case(1), self.case(2, points=0)]))
+        self.assertFalse(SubmissionTestCase.objects.filter(submission=self.submission).exists())
+
+        self.handler.on_batch_end(self.packet('batch-end'))
+        self.assertEqual(list(SubmissionTestCase.objects.filter(submission=self.submission)
+                              .values_list('case', 'batch')), [(1, 1), (2, 1)])
+
+    def test_test_cases_flushed_on_timer(self):
+        self.handler.on_grading_begin(self.packet('grading-begin', pretested=False))
+        with mock.patch('judge.bridge.judge_handler.threading.Timer') as timer, \
+                mock.patch('judge.bridge.judge_handler.db.connection.close'):
+            self.handler.on_test_case(self.packet('test-case-status', cases=[self.case(1)]))
+            self.handler.on_test_case(self.packet('test-case-status', cases=[self.case(2)]))
+            self.assertEqual(timer.call_count, 1)
+            interval, flush = timer.call_args[0]
+            self.assertEqual(interval, 60)
+            self.assertFalse(SubmissionTestCase.objects.filter(submission=self.submission).exists())
+
+            flush()
+            self.assertEqual(SubmissionTestCase.objects.filter(submission=self.submission).count(), 2)
+            self.submission.refresh_from_db()
+            self.assertEqual(self.submission.current_testcase, 3)
+
+            self.handler.on_test_case(self.packet('test-case-status', cases=[self.case(3)]))
+            self.assertEqual(timer.call_count, 2)
+            self.handler.on_grading_end(self.packet('grading-end'))
+            timer.return_value.cancel.assert_called()
+        self.assertEqual(SubmissionTestCase.objects.filter(submission=self.submission).count(), 3)
+
+    def grade(self, reconnect=False):
+        self.handler.on_grading_begin(self.packet('grading-begin', pretested=False))
+        self.handler.on_test_case(self.packet('test-case-status', cases=[self.case(1), self.case(2, status=4)]))
+        self.handler.on_batch_begin(self.packet('batch-begin'))
+        self.handler.on_test_case(self.packet('test-case-status', cases=[self.case(3), self.case(4, points=0.5)]))
+        self.handler.on_batch_end(self.packet('batch-end'))
+        if reconnect:
+            self.handler._aggregate = None
+
+        before = counters.snapshot().get('aggregate_fallbacks', 0)
+        self.handler.on_grading_end(self.packet('grading-end'))
+        self.submission.refresh_from_db()
+        return counters.snapshot().get('aggregate_fallbacks', 0) - before
+
+    def test_incremental_aggregate(self):
+        self.assertEqual(self.grade(), 0)
+        self.assertEqual((self.submission.result, self.submission.case_points, self.submission.case_total),
+                         ('TLE', 2.5, 3))
+        self.assertEqual((self.submission.time, self.submission.memory), (2, 4))
+
+    def test_aggregate_fallback(self):
+        self.assertEqual(self.grade(reconnect=True), 1)
+        self.assertEqual((self.submission.result, self.submission.case_points, self.submission.case_total),
+                         ('TLE', 2.5, 3))
+        self.assertEqual((self.submission.time, self.submission.memory), (2, 4))
@@ -0,0 +1,86 @@
+from django.test import SimpleTestCase
+
+from judge.bridge.judge_list import JudgeList
+
+
+class FakeJudge(object):
+    def __init__(self, name, problems, executors, load=0):
+        self.name = name
+        self.problems = dict.fromkeys(problems)
+        self.executors = dict.fromkeys(executors)
+        self.load = load
+        self.submitted = []
+        self._working = False
+
+    @property
+    def working(self):
+        return bool(self._working)
+
+    def can_judge(self, problem, executor, judge_id=None):
+        return problem in self.problems and executor in self.executors and (not judge_id or self.name == judge_id)
+
+    def submit(self, id, problem, language, source):
+        self._working = id
+        self.submitted.append(id)
+
+    def get_current_submission(self):
+        return self._working or None
+
+    def abort(self):
+        pass
+
+
+class JudgeListTestCase(SimpleTestCase):
+    def setUp(self):
+        self.judges = JudgeList()
+
+    def queue(self, id, problem='aplusb', language='PY3', judge_id=None, priority=1):
+        self.judges.judge(id, problem, language, 'source', judge_id, priority)
+
+    def drain(self, judge):
+        self.judges.register(judge)
+        while judge.working:
+            self.judges.on_judge_free(judge, judge.get_current_submission())
+        return judge.submitted
+
+    def test_priority_then_fifo(self):
+        self.queue(1, priority=3)
+        self.queue(2, problem='other', priority=1)
+        self.queue(3, priority=0)
+        self.queue(4, priority=1)
+        self.queue(5, problem='other', language='CPP17', priority=0)
+        self.assertEqual(len(self.judges), 5)
+
+        judge = FakeJudge('judge', ['aplusb', 'other'], ['PY3', 'CPP17'])
+        self.assertEqual(self.drain(judge), [3, 5, 2, 4, 1])
+        self.assertEqual(len(self.judges), 0)
+        self.assertEqual(self.judges.queue, [{}] * JudgeList.priorities)
+
+    def test_unsupported_skipped(self):
+        self.queue(1, problem='hard')
+        self.queue(2, language='CPP17')
+        self.queue(3)
+
+        judge = FakeJudge('judge', ['aplusb'], ['PY3'])
+        self.assertEqual(self.drain(judge), [3])
+        self.assertEqual(len(self.judges), 2)
+
+    def test_specific_judge(self):
+        self.queue(1, judge_id='other')
+        self.queue(2)
+
+        judge = FakeJudge('judge', ['aplusb'], ['PY3'])
+        self.assertEqual(self.drain(judge), [2])
+
+        other = FakeJudge('other', ['aplusb'], ['PY3'])
+        self.assertEqual(self.drain(other), [1])
+
+    def test_abort_queued(self):
+        self.queue(1)
+        self.queue(2)
+        self.queue(2)
+        self.assertEqual(len(self.judges), 2)
+
+        self.assertFalse(self.judges.abort(1))
+        judge = FakeJudge('judge', ['aplusb'], ['PY3'])
+        self.assertEqual(self.drain(judge), [2])
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from judge.bridge.post_grading import PostGradingQueue
+
+
+def graded_submission(user_id, problem_id, participation_id=None, is_public=True):
+    submission = SimpleNamespace(
+        user_id=user_id,
+        problem=SimpleNamespace(id=problem_id, is_public=is_public, is_organization_private=False),
+    )
+    if participation_id is not None:
+        submission.contest = SimpleNamespace(participation_id=participation_id)
+    return submission
+
+
+@override_settings(BRIDGED_POST_GRADING_DELAY=0.2)
+class PostGradingQueueTestCase(SimpleTestCase):
+    def setUp(self):
+        self.queue = PostGradingQueue()
+        self.queue._process = mock.MagicMock()
+
+    def test_inline_until_started(self):
+        self.queue.submission_graded(graded_submission(1, 2, participation_id=3))
+        self.queue._process.assert_called_once_with({1}, {3})
+
+    def test_coalesced(self):
+        self.queue.start()
+        for user_id in range(10):
+            self.queue.submission_graded(graded_submission(user_id % 2, 1))
+        self.queue.submission_graded(graded_submission(5, 2, participation_id=7, is_public=False))
+        self.queue.stop()
+
+        self.queue._process.assert_called_once_with({0, 1}, {7})
+
+    @mock.patch('judge.bridge.post_grading.async_to_sync', mock.MagicMock())
+    def test_failure_isolated(self):
+        profiles = [mock.MagicMock(id=id) for id in (1, 2)]
+        profiles[0].calculate_points.side_effect = ValueError
+        participations = [mock.MagicMock(id=id, contest_id=1) for id in (3, 4)]
+        participations[0].recompute_results.side_effect = ValueError
+
+        with mock.patch('judge.bridge.post_grading.Profile') as Profile, \
+                mock.patch('judge.bridge.post_grading.ContestParticipation') as ContestParticipation, \
+                self.assertLogs('judge.bridge', 'ERROR') as logs:
+            Profile.objects.filter.return_value = profiles
+            ContestParticipation.objects.filter.return_value.select_related.return_value = participations
+            PostGradingQueue()._process({1, 2}, {3, 4})
+
+        self.assertEqual(len(logs.records), 2)
+        profiles[1].calculate_points.assert_called_once_with()
+        participations[1].recompute_results.assert_called_once_with()
@@ -1,7 +1,8 @@
+from operator import attrgetter
+
 from django import forms
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from django.db.models import Count, FilteredRelation, F, Q
 from django.db.models.expressions import Value
@@ -14,14 +15,22 @@ from django.utils.translation import gettext as _
 from django.views.generic import View
 from django.views.generic.base import TemplateResponseMixin
 from django.views.generic.detail import SingleObjectMixin
+from mptt.utils import get_cached_trees
 from reversion import revisions
-from reversion.models import Revision, Version
+from reversion.models import Version
 
-from judge.dblock import LockModel
 from judge.models import Comment, CommentLock, CommentVote
 from judge.widgets import HeavyPreviewPageDownWidget
 
 
+def add_revision_counts(comments):
+    # Sets comment.revisions on each comment, counting the versions of all of them in one grouped query.
+    counts = dict(Version.objects.get_for_model(Comment).filter(object_id__in=[str(comment.id) for comment in comments])
+                  .values('object_id').annotate(count=Count('id')).order_by().values_list('object_id', 'count'))
+    for comment in comments:
+        comment.revisions = counts.get(str(comment.id), 0)
+
+
 class CommentForm(ModelForm):
     class Meta:
         model = Comment
@@ -87,7 +96,7 @@ class CommentedDetailView(TemplateResponseMixin, SingleObjectMixin, View):
             comment = form.save(commit=False)
             comment.author = request.profile
             comment.page = page
-            with LockModel(write=(Comment, Revision, Version), read=(ContentType,)), revisions.create_revision():
+            with comment.lock_tree(), revisions.create_revision():
                 revisions.set_user(request.user)
                 revisions.set_comment(_('Posted comment'))
                 comment.save()
@@ -106,9 +115,8 @@ class CommentedDetailView(TemplateResponseMixin, SingleObjectMixin, View):
     def get_context_data(self, **kwargs):
         context = super(CommentedDetailView, self).get_context_data(**kwargs)
         queryset = Comment.objects.filter(hidden=False, page=self.get_comment_page())
-        context['has_comments'] = queryset.exists()
         context['comment_lock'] = self.is_comment_locked()
-        queryset = queryset.select_related('author__user').defer('author__about').annotate(revisions=Count('versions'))
+        queryset = queryset.select_related('author__user').defer('author__about')
 
         if self.request.user.is_authenticated:
             profile = self.request.profile
@@ -116,7 +124,11 @@ class CommentedDetailView(TemplateResponseMixin, SingleObjectMixin, View):
                 my_vote=FilteredRelation('votes', condition=Q(votes__voter_id=profile.id)),
             ).annotate(vote_score=Coalesce(F('my_vote__score'), Value(0)))
             context['is_new_user'] = not self.request.user.is_staff and not profile.has_any_solves
-        context['comment_list'] = queryset
+        # Threads are not kept in order of time in the tree, see Comment.lock_tree.
+        context['comment_tree'] = sorted(get_cached_trees(queryset), key=attrgetter('time'), reverse=True)
+        context['comment_list'] = comments = list(queryset)
+        context['has_comments'] = bool(comments)
+        add_revision_counts(comments)
         context['vote_hide_threshold'] = settings.DMOJ_COMMENT_VOTE_HIDE_THRESHOLD
 
         return context
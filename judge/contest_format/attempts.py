@@ -0,0 +1,41 @@
+from collections import namedtuple
+
+__all__ = ['ProblemAttempts', 'ProblemAttemptsMixin', 'get_problem_attempts']
+
+ProblemAttempts = namedtuple('ProblemAttempts', 'points time attempts')
+
+
+def get_problem_attempts(participation_ids):
+    """
+    Returns, for each participation and each contest problem it submitted to, the best points it scored, the first
+    time it scored them, and its attempts until then: submissions which were graded and neither an IE nor a CE, at or
+    before that time, or all of them if the best points are 0.
+
+    :param participation_ids: The ids of the participations.
+    :return: A dictionary of dictionaries of ProblemAttempts, by participation id, then contest problem id.
+    """
+    from judge.models import ContestSubmission
+
+    submissions = {}
+    for participation_id, problem_id, points, date, result in ContestSubmission.objects \
+            .filter(participation_id__in=participation_ids).order_by() \
+            .values_list('participation_id', 'problem_id', 'points', 'submission__date', 'submission__result'):
+        submissions.setdefault((participation_id, problem_id), []).append((points, date, result))
+
+    results = {participation_id: {} for participation_id in participation_ids}
+    for (participation_id, problem_id), problem_submissions in sorted(submissions.items()):
+        points = max(points for points, _, _ in problem_submissions)
+        time = min(date for submission_points, date, _ in problem_submissions if submission_points == points)
+        # An IE can have a submission result of `None`
+        counted = [date for _, date, result in problem_submissions if result is not None and result not in ('IE', 'CE')]
+        attempts = sum(date <= time for date in counted) if points else len(counted)
+        results[participation_id][problem_id] = ProblemAttempts(points, time, attempts)
+    return results
+
+
+class ProblemAttemptsMixin:
+    """For formats whose penalties depend on attempts: their results are the ProblemAttempts of the participations, by
+    contest problem id."""
+
+    def get_participation_results(self, participation_ids):
+        return get_problem_attempts(participation_ids)
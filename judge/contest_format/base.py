@@ -48,6 +48,17 @@ class BaseContestFormat(six.with_metaclass(ABCMeta)):
         """
         raise NotImplementedError()
 
+    def update_participations(self, participations):
+        """
+        Updates the score, cumtime, tiebreaker and format_data fields of many ContestParticipation objects of the
+        contest at once, e.g. when rescoring it. Implementations may save them in bulk, without sending post_save.
+
+        :param participations: A list of ContestParticipation objects.
+        :return: None
+        """
+        for participation in participations:
+            self.update_participation(participation)
+
     @abstractmethod
     def display_user_problem(self, participation, contest_problem):
         """
@@ -10,6 +10,7 @@ from django.utils.translation import gettext_lazy
 
 from judge.contest_format.base import BaseContestFormat
 from judge.contest_format.registry import register_contest_format
+from judge.utils.api_cache import model_changed
 from judge.utils.timedelta import nice_repr
 
 
@@ -25,33 +26,77 @@ class DefaultContestFormat(BaseContestFormat):
     def __init__(self, contest, config):
         super(DefaultContestFormat, self).__init__(contest, config)
 
-    def update_participation(self, participation):
+    def get_participation_results(self, participation_ids):
+        """
+        Loads what score_participation needs, for all the participations with a single query.
+
+        :param participation_ids: The ids of the participations.
+        :return: A dictionary of results, by participation id.
+        """
+        from judge.models import ContestSubmission
+
+        results = {participation_id: [] for participation_id in participation_ids}
+        for participation_id, problem_id, time, points in ContestSubmission.objects \
+                .filter(participation_id__in=participation_ids).order_by() \
+                .values('participation_id', 'problem_id').annotate(time=Max('submission__date'), points=Max('points')) \
+                .values_list('participation_id', 'problem_id', 'time', 'points'):
+            results[participation_id].append((problem_id, time, points))
+        return results
+
+    def score_participation(self, participation, results):
+        """
+        Sets a ContestParticipation object's score, cumtime, tiebreaker and format_data fields from its results, as
+        loaded by get_participation_results, without saving it.
+
+        :param participation: A ContestParticipation object.
+        :param results: The results of the participation.
+        :return: None
+        """
         cumtime = 0
         points = 0
         format_data = {}
 
-        for result in participation.submissions.values('problem_id').annotate(
-                time=Max('submission__date'), points=Max('points'),
-        ):
-            dt = (result['time'] - participation.start).total_seconds()
-            if result['points']:
+        for problem_id, time, problem_points in results:
+            dt = (time - participation.start).total_seconds()
+            if problem_points:
                 cumtime += dt
-            format_data[str(result['problem_id'])] = {'time': dt, 'points': result['points']}
-            points += result['points']
+            format_data[str(problem_id)] = {'time': dt, 'points': problem_points}
+            points += problem_points
 
         participation.cumtime = max(cumtime, 0)
         participation.score = round(points, self.contest.points_precision)
         participation.tiebreaker = 0
         participation.format_data = format_data
+
+    def update_participation(self, participation):
+        self.score_participation(participation, self.get_participation_results([participation.id])[participation.id])
         participation.save()
 
+    def update_participations(self, participations):
+        from judge.models import ContestParticipation
+
+        fields = ['score', 'cumtime', 'tiebreaker', 'format_data']
+        results = self.get_participation_results([participation.id for participation in participations])
+        changed = []
+        for participation in participations:
+            old = [getattr(participation, field) for field in fields]
+            self.score_participation(participation, results[participation.id])
+            if [getattr(participation, field) for field in fields] != old:
+                changed.append(participation)
+
+        # Rescoring usually leaves most participations as they were, and those need not be written again.
+        if changed:
+            ContestParticipation.objects.bulk_update(changed, fields)
+            # bulk_update doesn't send post_save.
+            model_changed(ContestParticipation)
+
     def display_user_problem(self, participation, contest_problem):
         format_data = (participation.format_data or {}).get(str(contest_problem.id))
         if format_data:
             return format_html(
                 u'<td class="{state} default_format"><a href="{url}">{points}<div class="solving-time">{time}</div></a></td>',
                 state=(('pretest-' if self.contest.run_pretests_only and contest_problem.is_pretested else '') +
-                       self.best_solution_state(format_data['points'], contest_problem.points, contest_problem.first_accept == participation)),
+                       self.best_solution_state(format_data['points'], contest_problem.points, contest_problem.first_accept_id == participation.id)),
                 url=reverse('contest_user_submissions',
                             args=[self.contest.key, participation.user.user.username, contest_problem.problem.code]),
                 points=floatformat(format_data['points']),
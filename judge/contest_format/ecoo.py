@@ -1,7 +1,6 @@
 from datetime import timedelta
 
 from django.core.exceptions import ValidationError
-from django.db.models import Count, Max, OuterRef, Subquery
 from django.template.defaultfilters import floatformat
 from django.urls import reverse
 from django.utils.html import format_html
@@ -46,34 +45,32 @@ class ECOOContestFormat(DefaultContestFormat):
         self.config.update(config or {})
         self.contest = contest
 
-    def update_participation(self, participation):
+    def get_participation_results(self, participation_ids):
+        from judge.models import ContestSubmission
+
+        submissions = {}
+        for participation_id, problem_id, problem_points, points, date in ContestSubmission.objects \
+                .filter(participation_id__in=participation_ids).exclude(submission__result__in=('IE', 'CE')) \
+                .order_by() \
+                .values_list('participation_id', 'problem_id', 'problem__points', 'points', 'submission__date'):
+            submissions.setdefault((participation_id, problem_id), []).append((problem_points, points, date))
+
+        # The best points of the last submission to each problem, and the number of submissions to it.
+        results = {participation_id: [] for participation_id in participation_ids}
+        for (participation_id, problem_id), problem_submissions in sorted(submissions.items()):
+            date = max(date for _, _, date in problem_submissions)
+            points = max(points for _, points, submission_date in problem_submissions if submission_date == date)
+            results[participation_id].append(
+                (problem_id, problem_submissions[0][0], points, date, len(problem_submissions)),
+            )
+        return results
+
+    def score_participation(self, participation, results):
         cumtime = 0
         score = 0
         format_data = {}
 
-        submissions = participation.submissions.exclude(submission__result__in=('IE', 'CE'))
-
-        submission_counts = {
-            data['problem_id']: data['count'] for data in submissions.values('problem_id').annotate(count=Count('id'))
-        }
-        queryset = (
-            submissions
-            .values('problem_id')
-            .filter(
-                submission__date=Subquery(
-                    submissions
-                    .filter(problem_id=OuterRef('problem_id'))
-                    .order_by('-submission__date')
-                    .values('submission__date')[:1],
-                ),
-            )
-            .annotate(points=Max('points'))
-            .values_list('problem_id', 'problem__points', 'points', 'submission__date')
-        )
-
-        for problem_id, problem_points, points, date in queryset:
-            sub_cnt = submission_counts.get(problem_id, 0)
-
+        for problem_id, problem_points, points, date, sub_cnt in results:
             dt = (date - participation.start).total_seconds()
 
             bonus = 0
@@ -96,7 +93,6 @@ class ECOOContestFormat(DefaultContestFormat):
         participation.score = round(score, self.contest.points_precision)
         participation.tiebreaker = 0
         participation.format_data = format_data
-        participation.save()
 
     def display_user_problem(self, participation, contest_problem):
         format_data = (participation.format_data or {}).get(str(contest_problem.id))
@@ -107,7 +103,7 @@ class ECOOContestFormat(DefaultContestFormat):
             return format_html(
                 '<td class="{state} ecoo_format"><a href="{url}">{points}{bonus}<div class="solving-time">{time}</div></a></td>',
                 state=(('pretest-' if self.contest.run_pretests_only and contest_problem.is_pretested else '') +
-                       self.best_solution_state(format_data['points'], contest_problem.points, contest_problem.first_accept == participation)),
+                       self.best_solution_state(format_data['points'], contest_problem.points, contest_problem.first_accept_id == participation.id)),
                 url=reverse('contest_user_submissions',
                             args=[self.contest.key, participation.user.user.username, contest_problem.problem.code]),
                 points=floatformat(format_data['points']),
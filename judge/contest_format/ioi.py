@@ -1,9 +1,8 @@
-from django.db import connection
+from django.db.models import Min
 from django.utils.translation import gettext_lazy
 
 from judge.contest_format.legacy_ioi import LegacyIOIContestFormat
 from judge.contest_format.registry import register_contest_format
-from judge.timezone import from_database_time
 
 
 @register_contest_format('ioi16')
@@ -14,80 +13,55 @@ class IOIContestFormat(LegacyIOIContestFormat):
         cumtime: Specify True if time penalties are to be computed. Defaults to False.
     '''
 
-    def update_participation(self, participation):
+    def get_participation_results(self, participation_ids):
+        from judge.models import SubmissionTestCase
+
+        # The points of every batch of every graded submission are those of its worst test case. Each batch then counts
+        # for its best points, first scored at the earliest of those submissions.
+        batches = {}
+        for participation_id, problem_id, date, batch, points in SubmissionTestCase.objects \
+                .filter(submission__contest__participation_id__in=participation_ids, submission__status='D') \
+                .values('submission__contest__participation_id', 'submission__contest__problem_id', 'submission_id',
+                        'submission__date', 'batch').order_by().annotate(batch_points=Min('points')) \
+                .values_list('submission__contest__participation_id', 'submission__contest__problem_id',
+                             'submission__date', 'batch', 'batch_points'):
+            if points is None:
+                continue
+            key = (participation_id, problem_id, batch)
+            best = batches.get(key)
+            if best is None or points > best[0] or points == best[0] and date < best[1]:
+                batches[key] = (points, date)
+
+        results = {participation_id: [] for participation_id in participation_ids}
+        for (participation_id, problem_id, _), (points, date) in sorted(batches.items(), key=lambda item: item[0][:2]):
+            results[participation_id].append((problem_id, date, points))
+        return results
+
+    def score_participation(self, participation, results):
         cumtime = 0
         score = 0
         format_data = {}
 
-        with connection.cursor() as cursor:
-            cursor.execute('''
-                SELECT q.prob,
-                       MIN(q.date) as `date`,
-                       q.batch_points
-                FROM (
-                         SELECT cp.id          as `prob`,
-                                sub.id         as `subid`,
-                                sub.date       as `date`,
-                                tc.points      as `points`,
-                                tc.batch       as `batch`,
-                                MIN(tc.points) as `batch_points`
-                         FROM judge_contestproblem cp
-                                  INNER JOIN
-                              judge_contestsubmission cs
-                              ON (cs.problem_id = cp.id AND cs.participation_id = %s)
-                                  LEFT OUTER JOIN
-                              judge_submission sub
-                              ON (sub.id = cs.submission_id AND sub.status = 'D')
-                                  INNER JOIN judge_submissiontestcase tc
-                              ON sub.id = tc.submission_id
-                         GROUP BY cp.id, tc.batch, sub.id
-                     ) q
-                         INNER JOIN (
-                    SELECT prob, batch, MAX(r.batch_points) as max_batch_points
-                    FROM (
-                             SELECT cp.id          as `prob`,
-                                    tc.batch       as `batch`,
-                                    MIN(tc.points) as `batch_points`
-                             FROM judge_contestproblem cp
-                                      INNER JOIN
-                                  judge_contestsubmission cs
-                                  ON (cs.problem_id = cp.id AND cs.participation_id = %s)
-                                      LEFT OUTER JOIN
-                                  judge_submission sub
-                                  ON (sub.id = cs.submission_id AND sub.status = 'D')
-                                      INNER JOIN judge_submissiontestcase tc
-                                  ON sub.id = tc.submission_id
-                             GROUP BY cp.id, tc.batch, sub.id
-                         ) r
-                    GROUP BY prob, batch
-                ) p
-                ON p.prob = q.prob AND (p.batch = q.batch OR p.batch is NULL AND q.batch is NULL)
-                WHERE p.max_batch_points = q.batch_points
-                GROUP BY q.prob, q.batch
-            ''', (participation.id, participation.id))
-
-            for problem_id, time, subtask_points in cursor.fetchall():
-                problem_id = str(problem_id)
-                time = from_database_time(time)
-                if self.config['cumtime']:
-                    dt = (time - participation.start).total_seconds()
-                else:
-                    dt = 0
+        for problem_id, time, subtask_points in results:
+            problem_id = str(problem_id)
+            if self.config['cumtime']:
+                dt = (time - participation.start).total_seconds()
+            else:
+                dt = 0
 
-                if format_data.get(problem_id) is None:
-                    format_data[problem_id] = {'points': 0, 'time': 0}
-                format_data[problem_id]['points'] += subtask_points
-                format_data[problem_id]['time'] = max(dt, format_data[problem_id]['time'])
+            if format_data.get(problem_id) is None:
+                format_data[problem_id] = {'points': 0, 'time': 0}
+            format_data[problem_id]['points'] += subtask_points
+            format_data[problem_id]['time'] = max(dt, format_data[problem_id]['time'])
 
-            for _, problem_data in format_data.items():
-                penalty = problem_data['time']
-                points = problem_data['points']
-                if self.config['cumtime'] and points:
-                    cumtime += penalty
-                score += points
+        for _, problem_data in format_data.items():
+            penalty = problem_data['time']
+            points = problem_data['points']
+            if self.config['cumtime'] and points:
+                cumtime += penalty
+            score += points
 
         participation.cumtime = max(cumtime, 0)
         participation.score = round(score, self.contest.points_precision)
         participation.tiebreaker = 0
         participation.format_data = format_data
-        participation.save()
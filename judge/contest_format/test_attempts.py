@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from judge.models import ContestParticipation, ContestSubmission, Language, Submission
+from judge.models.tests.util import create_contest, create_contest_participation, create_contest_problem, \
+    create_problem, create_user
+
+
+class ProblemAttemptsTestCase(TestCase):
+    fixtures = ['language_all.json']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.start = timezone.now() - timedelta(hours=2)
+        cls.contest = create_contest(key='attempts', start_time=cls.start, end_time=cls.start + timedelta(hours=5))
+        cls.problems = [create_contest_problem(contest=cls.contest, problem=create_problem(code='attempts%d' % i),
+                                               points=100, order=i) for i in range(3)]
+        cls.participations = [
+            create_contest_participation(contest=cls.contest, user=create_user(username=username).profile, virtual=0)
+            for username in ('attempts', 'other')
+        ]
+
+        a, b, c = cls.problems
+        for minutes, problem, result, points in (
+            (10, a, 'WA', 0), (20, a, 'CE', 0), (30, a, 'AC', 100), (40, a, 'AC', 100),
+            (5, b, 'WA', 0), (15, b, None, 0), (25, b, 'WA', 0),
+            (50, c, 'WA', 30), (60, c, 'WA', 30),
+        ):
+            cls.submit(cls.participations[0], problem, minutes, result, points)
+        cls.submit(cls.participations[1], b, 70, 'AC', 100)
+
+    @classmethod
+    def submit(cls, participation, problem, minutes, result, points):
+        submission = Submission.objects.create(user=participation.user, problem=problem.problem, result=result,
+                                               language=Language.get_python3(), points=points)
+        Submission.objects.filter(id=submission.id).update(date=cls.start + timedelta(minutes=minutes))
+        ContestSubmission.objects.create(submission=submission, problem=problem, participation=participation,
+                                         points=points)
+
+    def rescore(self, format_name, config):
+        self.contest.format_name = format_name
+        self.contest.format_config = config
+        self.contest.save()
+        self.contest.__dict__.pop('format', None)
+        participation = ContestParticipation.objects.get(id=self.participations[0].id)
+        participation.contest = self.contest
+        with CaptureQueriesContext(connection) as queries:
+            self.contest.format.update_participation(participation)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('SELECT')]), 1)
+        return participation
+
+    def test_tmath(self):
+        participation = self.rescore('tmath', {'penalty': 20, 'weight': 0.5})
+        a, b, c = (str(problem.id) for problem in self.problems)
+        self.assertEqual(participation.format_data, {
+            a: {'time': 1800, 'points': 50, 'penalty': 1},
+            b: {'time': 300, 'points': 0, 'penalty': 2},
+            c: {'time': 3000, 'points': 30, 'penalty': 0},
+        })
+        self.assertEqual(participation.score, 80)
+        self.assertEqual(participation.cumtime, 1800 + 3000 + 20 * 60)
+        self.assertEqual(participation.tiebreaker, 3000)
+
+    def test_atcoder(self):
+        participation = self.rescore('atcoder', {'penalty': 5})
+        a, b, c = (str(problem.id) for problem in self.problems)
+        self.assertEqual(participation.format_data, {
+            a: {'time': 1800, 'points': 100, 'penalty': 1},
+            b: {'time': 300, 'points': 0, 'penalty': 2},
+            c: {'time': 3000, 'points': 30, 'penalty': 0},
+        })
+        self.assertEqual(participation.score, 130)
+        self.assertEqual(participation.cumtime, 3000 + 5 * 60)
+
+        participation = self.rescore('atcoder', {'penalty': 0})
+        self.assertEqual(participation.format_data[a]['penalty'], 0)
+        self.assertEqual(participation.cumtime, 3000)
+
+    def test_update_participations(self):
+        self.contest.format_name = 'tmath'
+        self.contest.save()
+        participations = list(self.contest.users.all())
+        for participation in participations:
+            participation.contest = self.contest
+
+        with CaptureQueriesContext(connection) as queries:
+            self.contest.format.update_participations(participations)
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['SELECT', 'UPDATE'])
+        self.assertEqual([participation.score for participation in participations], [128, 100])
+        self.assertEqual(list(self.contest.users.values_list('score', flat=True)), [128, 100])
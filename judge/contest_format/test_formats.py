@@ -0,0 +1,190 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from judge.models import ContestParticipation, ContestSubmission, Language, Submission, SubmissionTestCase
+from judge.models.tests.util import create_contest, create_contest_participation, create_contest_problem, \
+    create_problem, create_user
+from judge.tasks import rescore_contest
+from judge.utils.scoreboard import ContestScoreboard
+
+FORMATS = (
+    ('default', {}),
+    ('ioi', {'cumtime': True}),
+    ('ioi16', {'cumtime': True}),
+    ('icpc', {'penalty': 10}),
+    ('atcoder', {}),
+    ('ecoo', {'cumtime': True}),
+    ('tmath', {}),
+)
+
+
+class BulkRescoreTestCase(TestCase):
+    fixtures = ['language_all.json']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.start = timezone.now() - timedelta(hours=2)
+        cls.contest = create_contest(key='bulk', start_time=cls.start, end_time=cls.start + timedelta(hours=5))
+        cls.problems = [create_contest_problem(contest=cls.contest, problem=create_problem(code='bulk%d' % i),
+                                               points=100, order=i) for i in range(2)]
+        first, second, disqualified = [
+            create_contest_participation(contest=cls.contest, user=create_user(username=username).profile, virtual=0)
+            for username in ('first', 'second', 'disqualified')
+        ]
+        ContestParticipation.objects.filter(id=disqualified.id).update(is_disqualified=True)
+        virtual = ContestParticipation.objects.create(contest=cls.contest, user=first.user, virtual=1,
+                                                      real_start=cls.start + timedelta(hours=1))
+        create_contest_participation(contest=cls.contest, user=create_user(username='nothing').profile, virtual=0)
+
+        a, b = cls.problems
+        for participation, problem, minutes, result, cases in (
+            (first, a, 10, 'WA', [(None, 10), (1, 0), (1, 20)]),
+            (first, a, 20, 'CE', []),
+            (first, a, 30, 'AC', [(None, 10), (1, 40), (1, 40), (2, 50)]),
+            (first, b, 40, 'WA', [(None, 30), (None, 20)]),
+            (second, a, 15, 'WA', [(None, 10), (1, 40), (1, 0), (2, 50)]),
+            (second, a, 25, 'WA', [(None, 0), (1, 40), (1, 40), (2, 0)]),
+            (second, b, 35, None, []),
+            (disqualified, b, 5, 'AC', [(None, 100)]),
+            (virtual, b, 75, 'AC', [(None, 100)]),
+        ):
+            cls.submit(participation, problem, minutes, result, cases)
+
+    @classmethod
+    def submit(cls, participation, problem, minutes, result, cases):
+        points = sum(points for _, points in cases)
+        submission = Submission.objects.create(user=participation.user, problem=problem.problem, result=result,
+                                               status='D' if cases else 'IE', language=Language.get_python3(),
+                                               points=points)
+        Submission.objects.filter(id=submission.id).update(date=cls.start + timedelta(minutes=minutes))
+        ContestSubmission.objects.create(submission=submission, problem=problem, participation=participation,
+                                         points=points)
+        SubmissionTestCase.objects.bulk_create([
+            SubmissionTestCase(submission=submission, case=case, status='AC', points=points, total=100, batch=batch)
+            for case, (batch, points) in enumerate(cases, 1)
+        ])
+
+    def set_format(self, format_name, config):
+        self.contest.format_name = format_name
+        self.contest.format_config = config
+        self.contest.save()
+        self.contest.__dict__.pop('format_class', None)
+        self.contest.__dict__.pop('format', None)
+
+    def results(self):
+        return list(self.contest.users.order_by('id').values_list('score', 'cumtime', 'tiebreaker', 'format_data'))
+
+    def test_formats(self):
+        for format_name, config in FORMATS:
+            with self.subTest(format=format_name):
+                self.set_format(format_name, config)
+                for participation in self.contest.users.all():
+                    participation.recompute_results()
+                expected = self.results()
+                self.contest.users.update(score=0, cumtime=0, tiebreaker=0, format_data=None)
+
+                participations = list(self.contest.users.all())
+                with CaptureQueriesContext(connection) as queries:
+                    self.contest.recompute_results(participations)
+                self.assertEqual(len([query for query in queries if query['sql'].startswith('SELECT')]), 1)
+                self.assertEqual(self.results(), expected)
+                self.assertEqual(sorted(participation.score for participation in participations),
+                                 sorted(score for score, _, _, _ in expected))
+
+    def test_legacy_results(self):
+        # Results of the formats as they were when each participation was scored with its own raw SQL queries.
+        expected = {
+            'icpc': {
+                'first': (190, 4800, 2400, {'a': {'time': 1800, 'points': 140, 'penalty': 1},
+                                            'b': {'time': 2400, 'points': 50, 'penalty': 0}}),
+                'second': (100, 900, 900, {'a': {'time': 900, 'points': 100, 'penalty': 0},
+                                           'b': {'time': 2100, 'points': 0, 'penalty': 0}}),
+                'disqualified': (-9999, 300, 300, {'b': {'time': 300, 'points': 100, 'penalty': 0}}),
+                'virtual': (100, 900, 900, {'b': {'time': 900, 'points': 100, 'penalty': 0}}),
+            },
+            'ioi16': {
+                'first': (120, 4200, 0, {'a': {'points': 100, 'time': 1800}, 'b': {'points': 20, 'time': 2400}}),
+                'second': (100, 1500, 0, {'a': {'points': 100, 'time': 1500}}),
+                'disqualified': (-9999, 300, 0, {'b': {'points': 100, 'time': 300}}),
+                'virtual': (100, 900, 0, {'b': {'points': 100, 'time': 900}}),
+            },
+            'atcoder': {
+                'first': (190, 2700, 0, {'a': {'time': 1800, 'points': 140, 'penalty': 1},
+                                         'b': {'time': 2400, 'points': 50, 'penalty': 0}}),
+                'second': (100, 900, 0, {'a': {'time': 900, 'points': 100, 'penalty': 0},
+                                         'b': {'time': 2100, 'points': 0, 'penalty': 0}}),
+                'disqualified': (-9999, 300, 0, {'b': {'time': 300, 'points': 100, 'penalty': 0}}),
+                'virtual': (100, 900, 0, {'b': {'time': 900, 'points': 100, 'penalty': 0}}),
+            },
+            'ecoo': {
+                'first': (296, 4200, 0, {'a': {'time': 1800, 'points': 140, 'bonus': 54},
+                                         'b': {'time': 2400, 'points': 50, 'bonus': 52}}),
+                'second': (135, 3600, 0, {'a': {'time': 1500, 'points': 80, 'bonus': 55},
+                                          'b': {'time': 2100, 'points': 0, 'bonus': 0}}),
+                'disqualified': (-9999, 300, 0, {'b': {'time': 300, 'points': 100, 'bonus': 69}}),
+                'virtual': (167, 900, 0, {'b': {'time': 900, 'points': 100, 'bonus': 67}}),
+            },
+            'tmath': {
+                'first': (187.2, 5400, 2400, {'a': {'time': 1800, 'points': 137.2, 'penalty': 1},
+                                              'b': {'time': 2400, 'points': 50, 'penalty': 0}}),
+                'second': (100, 900, 900, {'a': {'time': 900, 'points': 100, 'penalty': 0},
+                                           'b': {'time': 2100, 'points': 0, 'penalty': 0}}),
+                'disqualified': (-9999, 300, 300, {'b': {'time': 300, 'points': 100, 'penalty': 0}}),
+                'virtual': (100, 900, 900, {'b': {'time': 900, 'points': 100, 'penalty': 0}}),
+            },
+        }
+        problems = {str(problem.id): label for problem, label in zip(self.problems, 'ab')}
+
+        for format_name, config in FORMATS:
+            if format_name not in expected:
+                continue
+            self.set_format(format_name, config)
+            for bulk in (False, True):
+                with self.subTest(format=format_name, bulk=bulk):
+                    self.contest.users.update(score=0, cumtime=0, tiebreaker=0, format_data=None)
+                    participations = list(self.contest.users.all())
+                    if bulk:
+                        self.contest.recompute_results(participations)
+                    else:
+                        for participation in participations:
+                            participation.recompute_results()
+
+                    results = {}
+                    for username, virtual, score, cumtime, tiebreaker, format_data in self.contest.users.values_list(
+                            'user__user__username', 'virtual', 'score', 'cumtime', 'tiebreaker', 'format_data'):
+                        results['virtual' if virtual else username] = (
+                            score, cumtime, tiebreaker,
+                            {problems[problem]: data for problem, data in (format_data or {}).items()},
+                        )
+                    self.assertEqual(results, dict(expected[format_name], nothing=(0, 0, 0, {})))
+
+    def test_ioi_batches(self):
+        self.set_format('ioi16', {'cumtime': True})
+        self.contest.recompute_results(list(self.contest.users.all()))
+        results = dict(self.contest.users.filter(virtual=0).values_list('user__user__username', 'format_data'))
+        a, b = (str(problem.id) for problem in self.problems)
+        # A batch scores its worst test case, and counts from the first submission with its best score: the batches of
+        # the first problem are best at 10 and 30 minutes for the first user, and at 15 and 25 for the second.
+        self.assertEqual(results['first'], {a: {'points': 10 + 40 + 50, 'time': 1800}, b: {'points': 20, 'time': 2400}})
+        self.assertEqual(results['second'], {a: {'points': 10 + 40 + 50, 'time': 1500}})
+        self.assertEqual(results['nothing'], {})
+
+    def test_rescore_contest(self):
+        cache.clear()
+        self.set_format('icpc', {})
+        scoreboard = ContestScoreboard(self.contest)
+        scoreboard.ranking()
+        version = scoreboard.current_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(rescore_contest.apply(args=(self.contest.key,)).get(), 5)
+        self.assertEqual(dict(self.contest.users.filter(virtual=0).values_list('user__user__username', 'score')),
+                         {'first': 190, 'second': 100, 'disqualified': -9999, 'nothing': 0})
+        # Pollers have to reload the whole scoreboard, which is rebuilt with the new scores.
+        self.assertIsNone(scoreboard.changes_since(version))
+        self.assertEqual([row.username for row in scoreboard.ranking()], ['first', 'second', 'nothing', 'disqualified'])
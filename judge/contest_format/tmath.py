@@ -1,21 +1,20 @@
 from datetime import timedelta
 
 from django.core.exceptions import ValidationError
-from django.db import connection
 from django.template.defaultfilters import floatformat
 from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy
 
+from judge.contest_format.attempts import ProblemAttemptsMixin
 from judge.contest_format.default import DefaultContestFormat
 from judge.contest_format.registry import register_contest_format
-from judge.timezone import from_database_time
 from judge.utils.timedelta import nice_repr
 
 
 @register_contest_format('tmath')
-class TmathContestFormat(DefaultContestFormat):
+class TmathContestFormat(ProblemAttemptsMixin, DefaultContestFormat):
     name = gettext_lazy('Tmath')
     config_defaults = {'penalty': 20, 'weight': 0.98}
     config_validators = {'penalty': lambda x: x >= 0, 'weight': lambda x: x > 0 and x <= 1}
@@ -45,59 +44,39 @@ class TmathContestFormat(DefaultContestFormat):
         self.config.update(config or {})
         self.contest = contest
 
-    def update_participation(self, participation):
+    def score_participation(self, participation, results):
         cumtime = 0
         last = 0
         penalty = 0
         score = 0
         format_data = {}
 
-        with connection.cursor() as cursor:
-            cursor.execute('''
-                SELECT MAX(cs.points) as `points`, (
-                    SELECT MIN(csub.date)
-                        FROM judge_contestsubmission ccs LEFT OUTER JOIN
-                             judge_submission csub ON (csub.id = ccs.submission_id)
-                        WHERE ccs.problem_id = cp.id AND ccs.participation_id = %s AND ccs.points = MAX(cs.points)
-                ) AS `time`, cp.id AS `prob`
-                FROM judge_contestproblem cp INNER JOIN
-                     judge_contestsubmission cs ON (cs.problem_id = cp.id AND cs.participation_id = %s) LEFT OUTER JOIN
-                     judge_submission sub ON (sub.id = cs.submission_id)
-                GROUP BY cp.id
-            ''', (participation.id, participation.id))
-
-            for points, time, prob in cursor.fetchall():
-                time = from_database_time(time)
-                dt = (time - participation.start).total_seconds()
-
-                # Compute penalty
-                if self.config['penalty']:
-                    # An IE can have a submission result of `None`
-                    subs = participation.submissions.exclude(submission__result__isnull=True) \
-                                                    .exclude(submission__result__in=['IE', 'CE']) \
-                                                    .filter(problem_id=prob)
-                    if points:
-                        prev = subs.filter(submission__date__lte=time).count() - 1
-                        penalty += prev * self.config['penalty'] * 60
-                        points *= self.config['weight'] ** prev
-                    else:
-                        # We should always display the penalty, even if the user has a score of 0
-                        prev = subs.count()
-                else:
-                    prev = 0
+        for prob, (points, time, attempts) in results.items():
+            dt = (time - participation.start).total_seconds()
 
+            # Compute penalty
+            if self.config['penalty']:
                 if points:
-                    cumtime += dt
-                    last = max(last, dt)
+                    prev = attempts - 1
+                    penalty += prev * self.config['penalty'] * 60
+                    points *= self.config['weight'] ** prev
+                else:
+                    # We should always display the penalty, even if the user has a score of 0
+                    prev = attempts
+            else:
+                prev = 0
+
+            if points:
+                cumtime += dt
+                last = max(last, dt)
 
-                format_data[str(prob)] = {'time': dt, 'points': points, 'penalty': prev}
-                score += points
+            format_data[str(prob)] = {'time': dt, 'points': points, 'penalty': prev}
+            score += points
 
         participation.cumtime = max(cumtime, 0) + penalty
         participation.score = round(score, self.contest.points_precision)
         participation.tiebreaker = last  # field is sorted from least to greatest
         participation.format_data = format_data
-        participation.save()
 
     def display_user_problem(self, participation, contest_problem):
         format_data = (participation.format_data or {}).get(str(contest_problem.id))
@@ -108,7 +87,7 @@ class TmathContestFormat(DefaultContestFormat):
             return format_html(
                 '<td class="{state} icpc_format"><a href="{url}">{points}{penalty}<div class="solving-time">{time}</div></a></td>',
                 state=(('pretest-' if self.contest.run_pretests_only and contest_problem.is_pretested else '') +
-                       self.best_solution_state(format_data['points'], contest_problem.points * (self.config['weight'] ** format_data['penalty']), contest_problem.first_accept == participation)),
+                       self.best_solution_state(format_data['points'], contest_problem.points * (self.config['weight'] ** format_data['penalty']), contest_problem.first_accept_id == participation.id)),
                 url=reverse('contest_user_submissions',
                             args=[self.contest.key, participation.user.user.username, contest_problem.problem.code]),
                 points=floatformat(format_data['points']),
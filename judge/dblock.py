@@ -1,6 +1,6 @@
 from itertools import chain
 
-from django.db import connection, transaction
+from django.db import OperationalError, connection, transaction
 
 
 class LockModel(object):
@@ -21,3 +21,29 @@ class LockModel(object):
             transaction.rollback()
         self.cursor.execute('UNLOCK TABLES')
         self.cursor.close()
+
+
+class NamedLock(object):
+    """A lock on a name rather than on tables, so that readers and other writers are left alone.
+
+    Only MySQL has named locks; elsewhere this does nothing, which is fine on SQLite as it only has one writer anyway.
+    The lock belongs to the connection, not to a transaction, so take it before starting the transaction it protects.
+    """
+
+    def __init__(self, name, timeout=10):
+        self.name = name
+        self.timeout = timeout
+
+    def __enter__(self):
+        if connection.vendor != 'mysql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT GET_LOCK(%s, %s)', (self.name, self.timeout))
+            if cursor.fetchone()[0] != 1:
+                raise OperationalError('Timed out waiting for lock %s' % self.name)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if connection.vendor != 'mysql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (self.name,))
@@ -1,6 +1,12 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
 from django.utils.html import escape, mark_safe
 
-__all__ = ['highlight_code']
+__all__ = ['highlight_code', 'highlight_code_lines', 'highlight_cache']
 
 
 def _make_pre_code(code):
@@ -14,6 +20,49 @@ def _wrap_code(inner):
     yield 0, "</code>"
 
 
+class HighlightCache(object):
+    """Highlighted code by hash of the code, language and CSS class, kept in each process.
+
+    The least recently used entries are evicted when their total length exceeds DMOJ_HIGHLIGHT_CACHE_SIZE characters.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+
+    @staticmethod
+    def get_key(code, language, cssclass):
+        return hashlib.sha1(code.encode('utf-8', errors='surrogatepass')).hexdigest(), language, cssclass
+
+    def get(self, key):
+        with self.lock:
+            html = self.entries.get(key)
+            if html is not None:
+                self.entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        max_size = settings.DMOJ_HIGHLIGHT_CACHE_SIZE
+        if len(html) > max_size:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = html
+            self.size += len(html)
+            while self.size > max_size:
+                self.size -= len(self.entries.popitem(last=False)[1])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+highlight_cache = HighlightCache()
+
+
 try:
     import pygments
     import pygments.lexers
@@ -22,16 +71,63 @@ try:
 except ImportError:
     def highlight_code(code, language, cssclass=None):
         return _make_pre_code(code)
+
+    def highlight_code_lines(code, language, start, stop, cssclass=None):
+        return _make_pre_code('\n'.join(code.split('\n')[start:stop]))
 else:
     class HtmlCodeFormatter(pygments.formatters.HtmlFormatter):
         def wrap(self, source):
             return self._wrap_div(self._wrap_pre(_wrap_code(source)))
 
-    def highlight_code(code, language, cssclass='codehilite'):
+    @lru_cache(maxsize=None)
+    def _get_lexer_class(language):
         try:
-            lexer = pygments.lexers.get_lexer_by_name(language)
+            return type(pygments.lexers.get_lexer_by_name(language))
         except pygments.util.ClassNotFound:
-            return _make_pre_code(code)
+            return None
+
+    @lru_cache(maxsize=None)
+    def _get_formatter(cssclass):
+        return HtmlCodeFormatter(cssclass=cssclass)
+
+    def highlight_code(code, language, cssclass='codehilite'):
+        key = highlight_cache.get_key(code, language, cssclass)
+        html = highlight_cache.get(key)
+        if html is None:
+            lexer_class = _get_lexer_class(language)
+            if lexer_class is None:
+                return _make_pre_code(code)
+            # Lexers keep state while lexing, so each call gets its own; formatters don't.
+            html = pygments.highlight(code, lexer_class(), _get_formatter(cssclass))
+            highlight_cache.set(key, html)
+        return mark_safe(html)
+
+    def _highlight_lines(code, language):
+        key = highlight_cache.get_key(code, language, None) + ('lines',)
+        html = highlight_cache.get(key)
+        if html is None:
+            lexer_class = _get_lexer_class(language)
+            if lexer_class is None:
+                return None
+            # Without wrapping, the formatter closes and reopens spans at every newline, so each line of its output
+            # stands on its own. Leading newlines are kept, so that the lines match those of the code.
+            html = pygments.highlight(code, lexer_class(stripnl=False), _get_line_formatter())
+            highlight_cache.set(key, html)
+        # The lexer ends the code with a newline, which is not a line of its own.
+        return html.split('\n')[:code.count('\n') + 1]
+
+    @lru_cache(maxsize=None)
+    def _get_line_formatter():
+        return pygments.formatters.HtmlFormatter(nowrap=True)
 
-        # return mark_safe(pygments.highlight(code, lexer, HtmlCodeFormatter(cssclass=cssclass, linenos='table')))
-        return mark_safe(pygments.highlight(code, lexer, HtmlCodeFormatter(cssclass=cssclass)))
+    def highlight_code_lines(code, language, start, stop, cssclass='codehilite'):
+        """Highlights lines start to stop of code, lexing all of it, so that tokens spanning several lines, like block
+        comments, are highlighted as they would be in the whole code."""
+        lines = _highlight_lines(code, language)
+        if lines is None:
+            return _make_pre_code('\n'.join(code.split('\n')[start:stop]))
+        # Wrapped as pygments.highlight wraps the whole code.
+        formatter = _get_formatter(cssclass)
+        return mark_safe(''.join(piece for _, piece in formatter._wrap_div(formatter.wrap(
+            (1, line + '\n') for line in lines[start:stop]
+        ))))
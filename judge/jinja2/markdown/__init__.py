@@ -1,7 +1,11 @@
+import hashlib
 import logging
+import threading
+from collections import Counter, OrderedDict
 
 from bleach.sanitizer import Cleaner
 from django.conf import settings
+from django.core.cache import cache
 from markupsafe import Markup
 from lxml import html
 from lxml.etree import ParserError, XMLSyntaxError
@@ -56,8 +60,122 @@ def fragment_tree_to_str(tree):
     return html.tostring(tree, encoding='unicode')[len('<div>'):-len('</div>')]
 
 
+class RenderCache(object):
+    """Rendered markdown, keyed by a hash of everything the rendering depends on, so that edits never serve stale HTML.
+
+    A small LRU in each process sits in front of the shared cache. Bump VERSION when the rendering changes.
+    """
+    VERSION = 1
+
+    def __init__(self):
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def key(self, value, style, math_engine, lazy_load):
+        digest = hashlib.sha256()
+        for part in (self.VERSION, style, math_engine, lazy_load):
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(value.encode('utf-8'))
+        return 'markdown:%s' % digest.hexdigest()
+
+    def _remember(self, key, result):
+        self.local[key] = result
+        self.local.move_to_end(key)
+        while len(self.local) > settings.DMOJ_MARKDOWN_CACHE_SIZE:
+            self.local.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            result = self.local.get(key)
+            if result is not None:
+                self.local.move_to_end(key)
+                self.stats['local_hits'] += 1
+                return result
+
+        result = cache.get(key)
+        with self.lock:
+            if result is None:
+                self.stats['misses'] += 1
+            else:
+                self.stats['shared_hits'] += 1
+                self._remember(key, result)
+        return result
+
+    def set(self, key, result):
+        cache.set(key, result, settings.DMOJ_MARKDOWN_CACHE_TIMEOUT)
+        with self.lock:
+            self._remember(key, result)
+
+    def get_many(self, keys):
+        # As get, but with a single trip to the shared cache for all the keys missing locally.
+        found = {}
+        with self.lock:
+            for key in keys:
+                result = self.local.get(key)
+                if result is not None:
+                    self.local.move_to_end(key)
+                    self.stats['local_hits'] += 1
+                    found[key] = result
+
+        missing = [key for key in keys if key not in found]
+        shared = cache.get_many(missing) if missing else {}
+        with self.lock:
+            for key in missing:
+                if key in shared:
+                    self.stats['shared_hits'] += 1
+                    self._remember(key, shared[key])
+                else:
+                    self.stats['misses'] += 1
+        found.update(shared)
+        return found
+
+    def set_many(self, results):
+        cache.set_many(results, settings.DMOJ_MARKDOWN_CACHE_TIMEOUT)
+        with self.lock:
+            for key, result in results.items():
+                self._remember(key, result)
+
+    def counters(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def clear(self):
+        with self.lock:
+            self.local.clear()
+            self.stats.clear()
+
+
+render_cache = RenderCache()
+
+
 @registry.filter
 def markdown(value, style, math_engine=None, lazy_load=False):
+    key = render_cache.key(value, style, math_engine, lazy_load)
+    result = render_cache.get(key)
+    if result is None:
+        result = render_markdown(value, style, lazy_load)
+        render_cache.set(key, result)
+    return Markup(result)
+
+
+def markdown_many(values, style, math_engine=None, lazy_load=False):
+    """Renders several sources with the same options, as the markdown filter does, looking them all up in the cache
+    at once."""
+    keys = [render_cache.key(value, style, math_engine, lazy_load) for value in values]
+    found = render_cache.get_many(set(keys))
+    rendered = {}
+    for key, value in zip(keys, values):
+        if key not in found and key not in rendered:
+            rendered[key] = render_markdown(value, style, lazy_load)
+    if rendered:
+        render_cache.set_many(rendered)
+        found.update(rendered)
+    return [Markup(found[key]) for key in keys]
+
+
+def render_markdown(value, style, lazy_load=False):
     styles = settings.MARKDOWN_STYLES.get(style, settings.MARKDOWN_DEFAULT_STYLE)
     bleach_params = styles.get('bleach', {})
 
@@ -76,4 +194,4 @@ def markdown(value, style, math_engine=None, lazy_load=False):
         result = fragment_tree_to_str(tree)
     if bleach_params:
         result = get_cleaner(style, bleach_params).clean(result)
-    return Markup(result)
+    return result
@@ -1,7 +1,10 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import SimpleTestCase
 from lxml import html
 
-from . import fragment_tree_to_str, fragments_to_tree, get_cleaner, markdown
+from . import fragment_tree_to_str, fragments_to_tree, get_cleaner, markdown, markdown_many, render_cache
 
 MATHML_N = '''\
 <math xmlns="http://www.w3.org/1998/Math/MathML">
@@ -131,6 +134,45 @@ class TestMarkdown(SimpleTestCase):
                              '<img src="/static/blank.gif" data-src="test.png" class="unveil"></p>')
 
 
+class TestRenderCache(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        render_cache.clear()
+
+    def test_hits(self):
+        source = '<img src="test.png">'
+        rendered = markdown(source, 'problem-full', lazy_load=True)
+        with mock.patch('judge.jinja2.markdown.md.markdown') as render:
+            self.assertEqual(markdown(source, 'problem-full', lazy_load=True), rendered)
+            render_cache.local.clear()
+            self.assertEqual(markdown(source, 'problem-full', lazy_load=True), rendered)
+            render.assert_not_called()
+        self.assertEqual(render_cache.counters(), {'misses': 1, 'local_hits': 1, 'shared_hits': 1})
+
+    def test_key(self):
+        source = '<img src="test.png">'
+        self.assertNotEqual(markdown(source, 'problem-full'), markdown(source, 'problem-full', lazy_load=True))
+        self.assertNotEqual(markdown('<script>void(0)</script>', 'problem'),
+                            markdown('<script>void(0)</script>', 'problem-full'))
+        self.assertEqual(render_cache.counters(), {'misses': 4})
+
+    def test_many(self):
+        markdown('a', 'comment')
+        render_cache.local.clear()
+        markdown('b', 'comment')
+        with mock.patch('judge.jinja2.markdown.cache.get_many', wraps=cache.get_many) as get_many:
+            rendered = markdown_many(['a', 'b', 'c', 'c'], 'comment')
+            get_many.assert_called_once()
+        self.assertEqual(rendered, [markdown(source, 'comment') for source in ('a', 'b', 'c', 'c')])
+        self.assertEqual(render_cache.counters(), {'misses': 3, 'local_hits': 5, 'shared_hits': 1})
+
+    def test_size(self):
+        with self.settings(DMOJ_MARKDOWN_CACHE_SIZE=2):
+            for source in ('a', 'b', 'c'):
+                markdown(source, 'problem')
+        self.assertEqual(len(render_cache.local), 2)
+
+
 class TestFragmentUtils(SimpleTestCase):
     def test_simple(self):
         tree = fragments_to_tree('<p>a</p><p>b</p>')
@@ -12,6 +12,7 @@ from judge import lxml_tree
 from judge.models import Contest, Problem, Profile
 from judge.ratings import rating_class, rating_progress
 from . import registry
+from .markdown import markdown_many
 
 rereference = re.compile(r'\[(r?user):(\w+)\]')
 
@@ -112,22 +113,53 @@ def update_tree(list, results, is_tail=False):
             link = child
 
 
-@registry.filter
-def reference(text):
-    tree = lxml_tree.fromstring(text)
+def find_references(tree, queries):
     texts = []
     tails = []
-    queries = defaultdict(list)
     for element in tree.iter():
         if element.text:
             populate_list(queries, texts, element, *process_reference(element.text))
         if element.tail:
             populate_list(queries, tails, element, *process_reference(element.tail))
+    return texts, tails
 
-    results = {type: reference_map[type][1](values) for type, values in queries.items()}
-    update_tree(texts, results, is_tail=False)
-    update_tree(tails, results, is_tail=True)
-    return tree
+
+def get_reference_results(queries):
+    # Types of references sharing a lookup, i.e. user and ruser, are looked up together.
+    lookups = defaultdict(set)
+    for type, values in queries.items():
+        lookups[reference_map[type][1]].update(values)
+    data = {lookup: lookup(values) for lookup, values in lookups.items()}
+    return {type: data[reference_map[type][1]] for type in queries}
+
+
+@registry.filter
+def reference(text):
+    return reference_many([text])[0]
+
+
+def reference_many(texts):
+    """Expands the references in several HTML fragments, with a single lookup for all of them."""
+    trees = []
+    found = []
+    queries = defaultdict(list)
+    for text in texts:
+        tree = lxml_tree.fromstring(text)
+        trees.append(tree)
+        found.append(find_references(tree, queries))
+
+    results = get_reference_results(queries)
+    for element_texts, element_tails in found:
+        update_tree(element_texts, results, is_tail=False)
+        update_tree(element_tails, results, is_tail=True)
+    return trees
+
+
+@registry.function
+def markdown_references(items, style, math_engine=None, lazy_load=False):
+    """The bodies of a page of items, e.g. comments, through the markdown and reference filters, by item id."""
+    bodies = reference_many(markdown_many([item.body for item in items], style, math_engine, lazy_load))
+    return {item.id: str(body) for item, body in zip(items, bodies)}
 
 
 @registry.filter
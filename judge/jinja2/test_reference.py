@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.test import TestCase
+from reversion import revisions
+
+from judge.comments import add_revision_counts
+from judge.jinja2.markdown import render_cache
+from judge.jinja2.reference import markdown_references, reference, reference_many
+from judge.models import Comment
+from judge.models.tests.util import create_user
+
+
+class ReferenceTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_user(username='alice').profile
+        cls.bob = create_user(username='bob').profile
+
+    def setUp(self):
+        cache.clear()
+        render_cache.clear()
+
+    def test_reference_many(self):
+        texts = ['<p>[user:alice] and [ruser:bob]</p>', '<p>[user:bob], [user:nobody]</p>', '<p>nobody</p>']
+        with self.assertNumQueries(1):
+            trees = reference_many(texts)
+        self.assertEqual([str(tree) for tree in trees], [str(reference(text)) for text in texts])
+        self.assertIn('href="/user/alice"', str(trees[0]))
+        self.assertIn('<span>nobody</span>', str(trees[1]))
+
+        with self.assertNumQueries(0):
+            reference_many(['<p>[user]</p>'])
+
+    def test_comments(self):
+        with revisions.create_revision():
+            first = Comment.objects.create(author=self.alice, page='p:test', body='[user:bob]')
+        second = Comment.objects.create(author=self.bob, page='p:test', body='*[ruser:alice]*', parent=first)
+        with revisions.create_revision():
+            first.body = 'hi [user:bob]'
+            first.save()
+        comments = list(Comment.objects.filter(page='p:test'))
+
+        with self.assertNumQueries(1):
+            add_revision_counts(comments)
+        self.assertEqual({comment.id: comment.revisions for comment in comments}, {first.id: 2, second.id: 0})
+
+        with self.assertNumQueries(1):
+            bodies = markdown_references(comments, 'comment', lazy_load=True)
+        self.assertIn('hi <span', bodies[first.id])
+        self.assertIn('<em><a class="rate-group"', bodies[second.id])
+        self.assertEqual(render_cache.counters(), {'misses': 2})
@@ -1,10 +1,16 @@
+import itertools
 import json
 import logging
+import queue
 import socket
 import struct
+import time
 import zlib
+from collections import Counter, defaultdict
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
 
 # from channels.layers import get_channel_layer
@@ -14,6 +20,16 @@ from asgiref.sync import async_to_sync
 
 logger = logging.getLogger('judge.judgeapi')
 size_pack = struct.Struct('!I')
+
+CONTEST_SUBMISSION_PRIORITY = 0
+DEFAULT_PRIORITY = 1
+REJUDGE_PRIORITY = 2
+BATCH_REJUDGE_PRIORITY = 3
+
+# Limits on the submissions sent in one submission-request-batch packet, keeping it well under the bridge's
+# maximum packet size.
+BATCH_REQUEST_SIZE = 1000
+BATCH_REQUEST_BYTES = 4 * 1024 * 1024
 # channel_layer = get_channel_layer()
 
 
@@ -41,52 +57,125 @@ def _post_update_submission(submission, done=False):
         #                            'status': submission.status, 'language': submission.language.key})
 
 
-def judge_request(packet, reply=True):
-    sock = socket.create_connection(settings.BRIDGED_DJANGO_CONNECT or
-                                    settings.BRIDGED_DJANGO_ADDRESS[0])
+class BridgeConnection:
+    """A persistent connection to the bridge, answering each request-id tagged packet without hanging up."""
+
+    def __init__(self):
+        self.sock = socket.create_connection(_bridge_address())
+        self.reader = self.sock.makefile('rb', -1)
+        self.last_used = time.monotonic()
+
+    def request(self, packet):
+        request_id = next(_request_ids)
+        _write_packet(self.sock, dict(packet, **{'request-id': request_id}))
+        result = _read_packet(self.reader)
+        if result.pop('request-id', None) != request_id:
+            raise ValueError('Judge replied to the wrong request')
+        self.last_used = time.monotonic()
+        return result
+
+    def is_idle(self):
+        # The bridge closes connections idle for BRIDGED_DJANGO_IDLE_TIMEOUT; stop short of that to avoid the race.
+        return time.monotonic() - self.last_used > settings.BRIDGED_DJANGO_IDLE_TIMEOUT * 0.9
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
 
+
+_request_ids = itertools.count(1)
+_connection_pool = queue.LifoQueue()
+
+
+def _bridge_address():
+    return settings.BRIDGED_DJANGO_CONNECT or settings.BRIDGED_DJANGO_ADDRESS[0]
+
+
+def _write_packet(sock, packet):
     output = json.dumps(packet, separators=(',', ':'))
     output = zlib.compress(output.encode('utf-8'))
-    writer = sock.makefile('wb')
-    writer.write(size_pack.pack(len(output)))
-    writer.write(output)
-    writer.close()
-
-    if reply:
-        reader = sock.makefile('rb', -1)
-        input = reader.read(size_pack.size)
-        if not input:
-            raise ValueError('Judge did not respond')
-        length = size_pack.unpack(input)[0]
-        input = reader.read(length)
-        if not input:
-            raise ValueError('Judge did not respond')
-        reader.close()
-        sock.close()
+    sock.sendall(size_pack.pack(len(output)) + output)
+
 
-        result = json.loads(zlib.decompress(input).decode('utf-8'))
+def _read_packet(reader):
+    input = reader.read(size_pack.size)
+    if not input:
+        raise ValueError('Judge did not respond')
+    length = size_pack.unpack(input)[0]
+    input = reader.read(length)
+    if not input:
+        raise ValueError('Judge did not respond')
+    return json.loads(zlib.decompress(input).decode('utf-8'))
+
+
+def _pooled_request(packet):
+    while True:
+        try:
+            connection = _connection_pool.get_nowait()
+        except queue.Empty:
+            connection, reused = BridgeConnection(), False
+        else:
+            if connection.is_idle():
+                connection.close()
+                continue
+            reused = True
+
+        try:
+            result = connection.request(packet)
+        except (OSError, ValueError):
+            connection.close()
+            # A pooled connection may have gone stale, e.g. when the bridge restarted; retry on a fresh one.
+            if reused:
+                continue
+            raise
+
+        if _connection_pool.qsize() < settings.BRIDGED_DJANGO_POOL_SIZE:
+            _connection_pool.put(connection)
+        else:
+            connection.close()
         return result
 
 
-def judge_submission(submission, rejudge=False, batch_rejudge=False, judge_id=None):
-    from .models import ContestSubmission, Submission, SubmissionTestCase
+def judge_request(packet, reply=True):
+    # Requests not waiting for a reply go over a connection of their own, which the bridge hangs up after answering.
+    if settings.BRIDGED_DJANGO_POOL_SIZE and reply:
+        return _pooled_request(packet)
 
-    CONTEST_SUBMISSION_PRIORITY = 0
-    DEFAULT_PRIORITY = 1
-    REJUDGE_PRIORITY = 2
-    BATCH_REJUDGE_PRIORITY = 3
+    sock = socket.create_connection(_bridge_address())
+    _write_packet(sock, packet)
+
+    if not reply:
+        sock.close()
+        return
+
+    reader = sock.makefile('rb', -1)
+    result = _read_packet(reader)
+    reader.close()
+    sock.close()
+    return result
+
+
+def _judge_priority(submission_id, pretested, rejudge, batch_rejudge):
+    if batch_rejudge:
+        return BATCH_REJUDGE_PRIORITY
+    elif rejudge:
+        return REJUDGE_PRIORITY
+    return CONTEST_SUBMISSION_PRIORITY if submission_id in pretested else DEFAULT_PRIORITY
+
+
+def _reset_for_judging(submission_ids, rejudge, batch_rejudge):
+    """Resets submissions to the queued state, returning the ids that can be judged and, for contest submissions,
+    whether they run on pretests only."""
+    from .models import BestSubmission, ContestSubmission, Problem, Submission, SubmissionTestCase
 
     updates = {'time': None, 'memory': None, 'points': None, 'result': None, 'case_points': 0, 'case_total': 0,
                'error': None, 'rejudged_date': timezone.now() if rejudge or batch_rejudge else None, 'status': 'QU'}
-    try:
-        # This is set proactively; it might get unset in judgecallback's on_grading_begin if the problem doesn't
-        # actually have pretests stored on the judge.
-        updates['is_pretested'] = all(ContestSubmission.objects.filter(submission=submission)
-                                      .values_list('problem__contest__run_pretests_only', 'problem__is_pretested')[0])
-    except IndexError:
-        priority = DEFAULT_PRIORITY
-    else:
-        priority = CONTEST_SUBMISSION_PRIORITY
+    pretested = {
+        id: bool(contest_pretests_only and problem_pretested) for id, contest_pretests_only, problem_pretested in
+        ContestSubmission.objects.filter(submission_id__in=submission_ids)
+                                 .values_list('submission_id', 'problem__contest__run_pretests_only',
+                                              'problem__is_pretested')
+    }
 
     # This should prevent double rejudge issues by permitting only the judging of
     # QU (which is the initial state) and D (which is the final state).
@@ -96,10 +185,43 @@ def judge_submission(submission, rejudge=False, batch_rejudge=False, judge_id=No
     # as that would prevent people from knowing a submission is being scheduled for rejudging.
     # It is worth noting that this mechanism does not prevent a new rejudge from being scheduled
     # while already queued, but that does not lead to data corruption.
-    if not Submission.objects.filter(id=submission.id).exclude(status__in=('P', 'G')).update(**updates):
-        return False
+    #
+    # Accepted submissions stop being so, which has to be reflected in their problems' statistics.
+    accepted = Submission.objects.filter(result='AC', points__gte=F('problem__points'))
+    with transaction.atomic():
+        Problem.lock_stats(accepted.filter(id__in=submission_ids).values_list('problem_id', flat=True).distinct())
+        judgeable = list(Submission.objects.filter(id__in=submission_ids).exclude(status__in=('P', 'G'))
+                         .select_for_update().values_list('id', flat=True))
+        lost = defaultdict(Counter)
+        for problem_id, user_id in accepted.filter(id__in=judgeable).values_list('problem_id', 'user_id'):
+            lost[problem_id][user_id] -= 1
+        # Users' best submissions on the problems have to be rebuilt too, if these were among them.
+        best = BestSubmission.objects.filter(submission_id__in=judgeable).values('submission_id')
+        rebuild = list(Submission.objects.filter(id__in=judgeable).filter(Q(result='AC') | Q(id__in=best))
+                       .values_list('id', flat=True))
+        # This is set proactively; it might get unset in judgecallback's on_grading_begin if the problem doesn't
+        # actually have pretests stored on the judge.
+        for is_pretested in (True, False, None):
+            ids = [id for id in judgeable if pretested.get(id) is is_pretested]
+            if ids:
+                Submission.objects.filter(id__in=ids).update(
+                    **updates, **({} if is_pretested is None else {'is_pretested': is_pretested}),
+                )
+        for problem in Problem.objects.filter(id__in=lost):
+            problem.adjust_stats(accepted=lost[problem.id])
+        if rebuild:
+            BestSubmission.rebuild(Submission.objects.filter(id__in=rebuild))
+
+    SubmissionTestCase.objects.filter(submission_id__in=judgeable).delete()
+    return judgeable, pretested
 
-    SubmissionTestCase.objects.filter(submission_id=submission.id).delete()
+
+def judge_submission(submission, rejudge=False, batch_rejudge=False, judge_id=None):
+    from .models import Submission
+
+    judgeable, pretested = _reset_for_judging([submission.id], rejudge, batch_rejudge)
+    if not judgeable:
+        return False
 
     try:
         response = judge_request({
@@ -109,7 +231,7 @@ def judge_submission(submission, rejudge=False, batch_rejudge=False, judge_id=No
             'language': submission.language.key,
             'source': submission.source.source,
             'judge-id': judge_id,
-            'priority': BATCH_REJUDGE_PRIORITY if batch_rejudge else (REJUDGE_PRIORITY if rejudge else priority),
+            'priority': _judge_priority(submission.id, pretested, rejudge, batch_rejudge),
         })
     except BaseException:
         logger.exception('Failed to send request to judge')
@@ -123,10 +245,70 @@ def judge_submission(submission, rejudge=False, batch_rejudge=False, judge_id=No
     return success
 
 
+def judge_submissions(submission_ids, rejudge=False, batch_rejudge=False, judge_id=None):
+    """Queues many submissions for judging, sending them to the bridge in as few round trips as possible.
+
+    Returns the number of submissions the bridge accepted.
+    """
+    accepted = 0
+    for start in range(0, len(submission_ids), BATCH_REQUEST_SIZE):
+        accepted += _judge_submission_chunk(submission_ids[start:start + BATCH_REQUEST_SIZE],
+                                            rejudge, batch_rejudge, judge_id)
+    return accepted
+
+
+def _judge_submission_chunk(submission_ids, rejudge, batch_rejudge, judge_id):
+    from .models import Submission
+
+    judgeable, pretested = _reset_for_judging(submission_ids, rejudge, batch_rejudge)
+    accepted = 0
+    batch, batch_size = [], 0
+    sources = Submission.objects.filter(id__in=judgeable).values_list('id', 'problem__code', 'language__key',
+                                                                      'source__source')
+    for id, problem, language, source in sources:
+        batch.append({
+            'submission-id': id,
+            'problem-id': problem,
+            'language': language,
+            'source': source,
+            'judge-id': judge_id,
+            'priority': _judge_priority(id, pretested, rejudge, batch_rejudge),
+        })
+        batch_size += len(source)
+        if batch_size >= BATCH_REQUEST_BYTES:
+            accepted += _judge_batch(batch)
+            batch, batch_size = [], 0
+    if batch:
+        accepted += _judge_batch(batch)
+    return accepted
+
+
+def _judge_batch(batch):
+    from .models import Submission
+
+    ids = [packet['submission-id'] for packet in batch]
+    try:
+        response = judge_request({'name': 'submission-request-batch', 'submissions': batch})
+    except BaseException:
+        logger.exception('Failed to send batch request to judge')
+        received = set()
+    else:
+        received = set(response.get('submission-ids', ()))
+
+    failed = [id for id in ids if id not in received]
+    if failed:
+        Submission.objects.filter(id__in=failed).update(status='IE', result='IE')
+    return len(received)
+
+
 def disconnect_judge(judge, force=False):
     judge_request({'name': 'disconnect-judge', 'judge-id': judge.name, 'force': force}, reply=False)
 
 
+def bridge_counters():
+    return judge_request({'name': 'get-counters'})['counters']
+
+
 def abort_submission(submission):
     from .models import Submission
     response = judge_request({'name': 'terminate-submission', 'submission-id': submission.id})
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from judge.models import Problem
+
+
+class Command(BaseCommand):
+    help = 'rebuilds the submission counters behind problem statistics from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('problems', nargs='*', help='codes of the problems to reconcile, all by default')
+
+    def handle(self, *args, **options):
+        problems = Problem.objects.order_by('id')
+        if options['problems']:
+            problems = problems.filter(code__in=options['problems'])
+
+        reconciled = 0
+        problems = problems.only('id', 'code', 'points', 'submission_count', 'accepted_count', 'user_count')
+        for problem in problems.iterator():
+            old = problem.submission_count, problem.accepted_count, problem.user_count
+            problem.reconcile_stats()
+            if old != (problem.submission_count, problem.accepted_count, problem.user_count):
+                reconciled += 1
+                self.stdout.write('%s: submissions %d -> %d, accepted %d -> %d, users %d -> %d' % (
+                    problem.code, old[0], problem.submission_count, old[1], problem.accepted_count,
+                    old[2], problem.user_count,
+                ))
+        self.stdout.write('Reconciled %d problems' % reconciled)
@@ -4,5 +4,9 @@ from judge.bridge.daemon import judge_daemon
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--asyncio', action='store_true',
+                            help='serve all judge and Django connections from a single asyncio event loop')
+
     def handle(self, *args, **options):
-        judge_daemon()
+        judge_daemon(use_asyncio=options['asyncio'])
@@ -10,10 +10,11 @@ from django.contrib.auth import logout
 from django.contrib.sessions.models import Session
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
 from django.utils.encoding import force_bytes
-from django.db import transaction
 from requests.exceptions import HTTPError
-from typeracer.models import TypoRoom
+
+from judge.utils.session_state import SessionState
 
 
 # One session_key to one Person anytime
@@ -23,14 +24,20 @@ class OneSessionPerUser(object):
 
     def __call__(self, request):
         if request.user.is_authenticated:
-            current_session_key = request.user.logged_in_user.session_key
+            session_key = request.session.session_key
+            state = SessionState.for_request(request)
+            if state.get('session_key') != session_key:
+                logged_in_user = request.user.logged_in_user
+                current_session_key = logged_in_user.session_key
+
+                if current_session_key and current_session_key != session_key:
+                    Session.objects.filter(session_key=current_session_key).delete()
 
-            if current_session_key and current_session_key != request.session.session_key:
-                Session.objects.filter(session_key=current_session_key).delete()
+                if current_session_key != session_key:
+                    logged_in_user.session_key = session_key
+                    logged_in_user.save(update_fields=['session_key'])
+                state.set('session_key', session_key)
 
-            request.user.logged_in_user.session_key = request.session.session_key
-            request.user.logged_in_user.save()
-        
         return self.get_response(request)
 
 
@@ -94,7 +101,17 @@ class ContestMiddleware(object):
     def __call__(self, request):
         profile = request.profile
         if profile:
-            profile.update_contest()
+            # The current contest is only checked again once it is over, or after a while for changes in who can join
+            # it, unless it is changed in between.
+            state = SessionState.for_request(request)
+            now = timezone.now()
+            checked = state.get('contest')
+            if checked is None or checked[0] != profile.current_contest_id or checked[1] <= now:
+                profile.update_contest()
+                recheck = now + settings.DMOJ_SESSION_STATE_RECHECK
+                if profile.current_contest is not None:
+                    recheck = min(recheck, profile.current_contest.end_time or recheck)
+                state.set('contest', (profile.current_contest_id, recheck))
             request.participation = profile.current_contest
             request.in_contest = request.participation is not None
         else:
@@ -108,17 +125,15 @@ class TypoMiddleware(object):
         self.get_response = get_response
     
     def __call__(self, request):
-        with transaction.atomic():
-            for room in TypoRoom.objects.all().exclude(contest=None):
-                if room.contest.ended and room.is_random:
-                    room.contest = None
-                    room.save()
-        if request.user.is_authenticated:
-            profile = request.user.profile
-        else:
-            profile = None
-        if profile:
-            profile.update_typo()
+        # Expired random rooms are released by the sweep_typo_rooms task.
+        profile = request.profile
+        if profile and profile.typo_contest_id is not None:
+            state = SessionState.for_request(request)
+            checked = state.get('typo')
+            if checked is None or checked[0] != profile.typo_contest_id or checked[1] <= timezone.now():
+                profile.update_typo()
+                if profile.typo_contest is not None:
+                    state.set('typo', (profile.typo_contest_id, profile.typo_contest.time_end))
         return self.get_response(request)
 
 
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def count_submissions(apps, schema_editor):
+    Problem = apps.get_model('judge', 'Problem')
+    Submission = apps.get_model('judge', 'Submission')
+
+    listed = Submission.objects.filter(user__is_unlisted=False)
+    accepted = listed.filter(result='AC', points__gte=F('problem__points'))
+    for problem_id, count in listed.values_list('problem_id').annotate(count=Count('id')).order_by():
+        Problem.objects.filter(id=problem_id).update(submission_count=count)
+    for problem_id, count in accepted.values_list('problem_id').annotate(count=Count('id')).order_by():
+        Problem.objects.filter(id=problem_id).update(accepted_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('judge', '0170_alter_contest_authors_alter_contest_curators_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='submission_count',
+            field=models.IntegerField(default=0, help_text='The number of submissions by listed users.', verbose_name='number of submissions'),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='accepted_count',
+            field=models.IntegerField(default=0, help_text='The number of accepted submissions by listed users.', verbose_name='number of accepted submissions'),
+        ),
+        migrations.RunPython(count_submissions, migrations.RunPython.noop, atomic=True),
+    ]
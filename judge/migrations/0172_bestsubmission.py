@@ -0,0 +1,49 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_best_submissions(apps, schema_editor):
+    BestSubmission = apps.get_model('judge', 'BestSubmission')
+    Submission = apps.get_model('judge', 'Submission')
+
+    batch = []
+    best = None
+    graded = Submission.objects.filter(points__isnull=False).order_by('user_id', 'problem_id', '-points', 'id')
+    for id, user_id, problem_id, points, result in \
+            graded.values_list('id', 'user_id', 'problem_id', 'points', 'result').iterator():
+        if best is None or (best.user_id, best.problem_id) != (user_id, problem_id):
+            best = BestSubmission(user_id=user_id, problem_id=problem_id, submission_id=id, points=points)
+            batch.append(best)
+            if len(batch) > 1000:
+                BestSubmission.objects.bulk_create(batch[:-1])
+                del batch[:-1]
+        best.is_accepted |= result == 'AC'
+    BestSubmission.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('judge', '0171_problem_submission_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestSubmission',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.FloatField(verbose_name='points')),
+                ('is_accepted', models.BooleanField(default=False, help_text='Whether any submission by the user on the problem was accepted.', verbose_name='accepted')),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='judge.problem', verbose_name='problem')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='judge.submission', verbose_name='submission')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_submissions', to='judge.profile', verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'best submission',
+                'verbose_name_plural': 'best submissions',
+                'unique_together': {('user', 'problem')},
+                'indexes': [models.Index(fields=['user', '-points'], name='judge_bestsubmission_points')],
+            },
+        ),
+        migrations.RunPython(build_best_submissions, migrations.RunPython.noop, atomic=True),
+    ]
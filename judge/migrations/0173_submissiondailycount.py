@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Cast
+
+
+def count_daily_submissions(apps, schema_editor):
+    Submission = apps.get_model('judge', 'Submission')
+    SubmissionDailyCount = apps.get_model('judge', 'SubmissionDailyCount')
+
+    batch = []
+    for user_id, date, count in Submission.objects.annotate(date_only=Cast('date', models.DateField())) \
+            .values_list('user_id', 'date_only').annotate(count=Count('id')).order_by().iterator():
+        batch.append(SubmissionDailyCount(user_id=user_id, date=date, count=count))
+        if len(batch) >= 1000:
+            SubmissionDailyCount.objects.bulk_create(batch)
+            batch = []
+    SubmissionDailyCount.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('judge', '0172_bestsubmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionDailyCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='date')),
+                ('count', models.IntegerField(default=0, verbose_name='submission count')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_submission_counts', to='judge.profile', verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'daily submission count',
+                'verbose_name_plural': 'daily submission counts',
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(count_daily_submissions, migrations.RunPython.noop, atomic=True),
+    ]
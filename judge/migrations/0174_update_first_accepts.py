@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import F, Q
+
+
+def update_first_accepts(apps, schema_editor):
+    ContestProblem = apps.get_model('judge', 'ContestProblem')
+    ContestSubmission = apps.get_model('judge', 'ContestSubmission')
+
+    # First accepts used to be found when the scoreboard was loaded, so those never looked for yet, and those copied
+    # from the original of a cloned contest, have to be found now.
+    for problem in ContestProblem.objects.filter(Q(first_accept=None) | ~Q(first_accept__contest=F('contest'))) \
+            .select_related('contest').iterator():
+        first_accept_id = ContestSubmission.objects.filter(
+            problem=problem, points=problem.points,
+            submission__date__gte=problem.contest.start_time, submission__date__lte=problem.contest.end_time,
+        ).order_by('id').values_list('participation_id', flat=True).first()
+        if first_accept_id != problem.first_accept_id:
+            ContestProblem.objects.filter(id=problem.id).update(first_accept_id=first_accept_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('judge', '0173_submissiondailycount'),
+    ]
+
+    operations = [
+        migrations.RunPython(update_first_accepts, migrations.RunPython.noop, atomic=True),
+    ]
@@ -12,7 +12,8 @@ from judge.models.problem_data import CHECKERS, ProblemData, ProblemTestCase, pr
     problem_directory_file, PublicSolution
 from judge.models.profile import Organization, OrganizationRequest, Profile, WebAuthnCredential, SchoolYear, LoggedInUser
 from judge.models.runtime import Judge, Language, RuntimeVersion
-from judge.models.submission import SUBMISSION_RESULT, Submission, SubmissionSource, SubmissionTestCase
+from judge.models.submission import BestSubmission, SUBMISSION_RESULT, Submission, SubmissionDailyCount, \
+    SubmissionSource, SubmissionTestCase
 from judge.models.ticket import Ticket, TicketMessage
 # from judge.models.tmatheng import Exam, ExamProblem, ExamSubmission, ExamParticipation, MathProblem
 
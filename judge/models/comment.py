@@ -1,11 +1,12 @@
 import itertools
+from contextlib import contextmanager
 
 from django.contrib.contenttypes.fields import GenericRelation
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import RegexValidator
-from django.db import models
-from django.db.models import CASCADE
+from django.db import models, transaction
+from django.db.models import CASCADE, Max
 from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
@@ -13,6 +14,7 @@ from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
 from reversion.models import Version
 
+from judge.dblock import NamedLock
 from judge.models.contest import Contest
 from judge.models.interface import BlogPost
 from judge.models.problem import Problem, Solution
@@ -56,6 +58,33 @@ class Comment(MPTTModel):
     class MPTTMeta:
         order_insertion_by = ['-time']
 
+    @contextmanager
+    def lock_tree(self):
+        """Makes room for this new comment in the comment trees, to be saved within the block.
+
+        Only the thread being replied to is locked: its root row, which every insertion into the thread goes through
+        first. A new thread is given the next tree id under a named lock, instead of having MPTT renumber every thread
+        after it to keep them ordered by time, so threads must be sorted by time when displayed.
+        """
+        if self.parent_id is None:
+            with NamedLock('judge_comment_tree'), transaction.atomic():
+                last = Comment.objects.aggregate(last=Max('tree_id'))['last'] or 0
+                self.tree_id, self.lft, self.rght, self.level = last + 1, 1, 2, 0
+                yield
+            return
+
+        with transaction.atomic():
+            parent = Comment.objects.get(id=self.parent_id)
+            while True:
+                tree_id = parent.tree_id
+                list(Comment.objects.select_for_update().filter(tree_id=tree_id, level=0).values_list('id'))
+                # The thread may have been moved while we were waiting for it.
+                parent = Comment.objects.get(id=self.parent_id)
+                if parent.tree_id == tree_id:
+                    break
+            self.parent = parent
+            yield
+
     @classmethod
     def most_recent(cls, user, n, batch=None):
         queryset = cls.objects.filter(hidden=False).select_related('author__user') \
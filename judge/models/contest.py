@@ -1,7 +1,7 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
 from django.db import models, transaction
-from django.db.models import CASCADE, Q
+from django.db.models import CASCADE, F, Q
 # from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
@@ -456,6 +456,24 @@ class Contest(models.Model):
             ).order_by('end_time'):
                 rate_contest(contest)
 
+    def recompute_results(self, participations):
+        """Recomputes the results of many participations of the contest at once, as ContestParticipation's
+        recompute_results does one by one."""
+        from judge.utils.scoreboard import ContestScoreboard
+
+        for participation in participations:
+            participation.contest = self
+        with transaction.atomic():
+            self.format.update_participations(participations)
+            disqualified = [participation for participation in participations if participation.is_disqualified]
+            for participation in disqualified:
+                participation.score = -9999
+            if disqualified:
+                ContestParticipation.objects.filter(id__in=[participation.id for participation in disqualified]) \
+                                            .update(score=-9999)
+            transaction.on_commit(ContestScoreboard(self).reset)
+    recompute_results.alters_data = True
+
     class Meta:
         permissions = (
             ('see_private_contest', _('See private contests')),
@@ -579,11 +597,14 @@ class ContestParticipation(models.Model):
     format_data = JSONField(verbose_name=_('contest format specific data'), null=True, blank=True)
 
     def recompute_results(self):
+        from judge.utils.scoreboard import ContestScoreboard
+
         with transaction.atomic():
             self.contest.format.update_participation(self)
             if self.is_disqualified:
                 self.score = -9999
                 self.save(update_fields=['score'])
+            transaction.on_commit(lambda: ContestScoreboard(self.contest).update(self))
     recompute_results.alters_data = True
 
     def set_disqualified(self, disqualified):
@@ -694,18 +715,22 @@ class ContestProblem(models.Model):
                                                                                    'can\'t submit to?'))])
 
     def update_first_accept(self):
-        if self.first_accept is not None:
-            if self.first_accept.contest == self.contest:
-                return
-            self.first_accept = None
-        queryset = ContestSubmission.objects.filter(problem=self, points=self.points, 
-                                                    submission__date__lte=self.contest.end_time, 
-                                                    submission__date__gte=self.contest.start_time)
-        submission = queryset.order_by('id').first()
-        self.first_accept = submission.participation if submission is not None else None
-        self.save()
+        """Sets first_accept to the participation whose submission was the first to score full points during the
+        contest. Called whenever a submission to the problem gets or loses full points, so that the scoreboard can tell
+        the first accept of every problem from first_accept_id alone."""
+        from judge.utils.scoreboard import ContestScoreboard
+
+        first_accept_id = ContestSubmission.objects.filter(
+            problem=self, points=self.points,
+            submission__date__gte=F('problem__contest__start_time'),
+            submission__date__lte=F('problem__contest__end_time'),
+        ).order_by('id').values_list('participation_id', flat=True).first()
+        if first_accept_id != self.first_accept_id:
+            changed = {self.first_accept_id, first_accept_id} - {None}
+            self.first_accept_id = first_accept_id
+            self.save(update_fields=['first_accept'])
+            transaction.on_commit(lambda: ContestScoreboard(self.contest).update_rows(changed))
     update_first_accept.alters_data = True
-    
 
     class Meta:
         unique_together = ('problem', 'contest')
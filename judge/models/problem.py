@@ -6,8 +6,8 @@ from django.contrib.contenttypes.fields import GenericRelation
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
-from django.db import models
-from django.db.models import CASCADE, F, Q, QuerySet, SET_NULL, FilteredRelation
+from django.db import models, transaction
+from django.db.models import CASCADE, Case, Count, F, FloatField, Q, QuerySet, SET_NULL, FilteredRelation, When
 from django.db.models.expressions import RawSQL
 from django.db.models.functions import Coalesce
 from django.urls import reverse
@@ -201,6 +201,10 @@ class Problem(models.Model):
     user_count = models.IntegerField(verbose_name=_('number of users'), default=0,
                                      help_text=_('The number of users who solved the problem.'))
     ac_rate = models.FloatField(verbose_name=_('solve rate'), default=0)
+    submission_count = models.IntegerField(verbose_name=_('number of submissions'), default=0,
+                                           help_text=_('The number of submissions by listed users.'))
+    accepted_count = models.IntegerField(verbose_name=_('number of accepted submissions'), default=0,
+                                         help_text=_('The number of accepted submissions by listed users.'))
     is_full_markup = models.BooleanField(verbose_name=_('allow full markdown access'), default=False)
     submission_source_visibility_mode = models.CharField(verbose_name=_('submission source visibility'), max_length=1,
                                                          default=SubmissionSourceAccess.FOLLOW,
@@ -436,19 +440,97 @@ class Problem(models.Model):
             }[settings.DMOJ_SUBMISSION_SOURCE_VISIBILITY]
         return self.submission_source_visibility_mode
 
+    # The statistics are kept up to date incrementally, using the counters submission_count, accepted_count and
+    # user_count. Changes to which submissions are accepted must hold lock_stats, see adjust_stats.
+    # reconcile_stats rebuilds the counters from scratch.
+
+    def is_accepted(self, result, points):
+        return result == 'AC' and points is not None and points >= self.points
+
+    def accepted_submissions(self):
+        return self.submission_set.filter(user__is_unlisted=False, points__gte=self.points, result='AC')
+
+    @classmethod
+    def lock_stats(cls, problem_ids):
+        # Must be called inside a transaction.
+        return list(cls.objects.filter(id__in=problem_ids).order_by('id').select_for_update()
+                    .values_list('id', flat=True))
+
+    @classmethod
+    def _update_ac_rate(cls, problem_ids):
+        from judge.utils.api_cache import model_changed
+        from judge.utils.problem_index import ProblemIndex
+
+        cls.objects.filter(id__in=problem_ids).update(ac_rate=Case(
+            When(submission_count__gt=0, then=100.0 * F('accepted_count') / F('submission_count')),
+            default=0.0, output_field=FloatField(),
+        ))
+        # QuerySet.update() sends no post_save, so nothing else tells the cached API responses.
+        ProblemIndex.stats_changed()
+        model_changed(cls)
+
+    @classmethod
+    def count_submissions(cls, problem_id, delta):
+        cls.objects.filter(id=problem_id).update(submission_count=F('submission_count') + delta)
+        cls._update_ac_rate([problem_id])
+
+    def adjust_stats(self, accepted, submissions=0):
+        """Updates the counters after submissions became accepted or stopped being so.
+
+        accepted maps user ids to the number of accepted submissions each gained, or if negative, lost. It must be
+        called after those changes are saved, in the same transaction and while holding lock_stats.
+        """
+        accepted = {user: delta for user, delta in accepted.items() if delta}
+        listed = set(Profile.objects.filter(id__in=accepted, is_unlisted=False).values_list('id', flat=True))
+        accepted = {user: delta for user, delta in accepted.items() if user in listed}
+        if not accepted and not submissions:
+            return
+
+        counts = dict(self.accepted_submissions().filter(user_id__in=accepted).values_list('user_id')
+                      .annotate(count=Count('id')))
+        users = 0
+        for user, delta in accepted.items():
+            # A user who gained accepted submissions solved the problem just now if those are all they have, and a
+            # user who lost some has unsolved it if none remain.
+            if delta > 0 and counts.get(user, 0) == delta:
+                users += 1
+            elif delta < 0 and not counts.get(user):
+                users -= 1
+
+        Problem.objects.filter(id=self.id).update(
+            submission_count=F('submission_count') + submissions,
+            accepted_count=F('accepted_count') + sum(accepted.values()),
+            user_count=F('user_count') + users,
+        )
+        Problem._update_ac_rate([self.id])
+
+    adjust_stats.alters_data = True
+
     def update_stats(self):
-        all_queryset = self.submission_set.filter(user__is_unlisted=False)
-        ac_queryset = all_queryset.filter(points__gte=self.points, result='AC')
-        self.user_count = ac_queryset.values('user').distinct().count()
-        submissions = all_queryset.count()
-        if submissions:
-            self.ac_rate = 100.0 * ac_queryset.count() / submissions
-        else:
-            self.ac_rate = 0
-        self.save()
+        Problem._update_ac_rate([self.id])
+        self.refresh_from_db(fields=['submission_count', 'accepted_count', 'user_count', 'ac_rate'])
 
     update_stats.alters_data = True
 
+    def reconcile_stats(self):
+        from judge.utils.api_cache import model_changed
+        from judge.utils.problem_index import ProblemIndex
+
+        with transaction.atomic():
+            Problem.lock_stats([self.id])
+            self.submission_count = self.submission_set.filter(user__is_unlisted=False).count()
+            self.accepted_count = self.accepted_submissions().count()
+            self.user_count = self.accepted_submissions().values('user').distinct().count()
+            self.ac_rate = 100.0 * self.accepted_count / self.submission_count if self.submission_count else 0
+            Problem.objects.filter(id=self.id).update(
+                submission_count=self.submission_count, accepted_count=self.accepted_count,
+                user_count=self.user_count, ac_rate=self.ac_rate,
+            )
+            ProblemIndex.stats_changed()
+            model_changed(Problem)
+
+    reconcile_stats.alters_data = True
+
     def _get_limits(self, key):
         global_limit = getattr(self, key)
         limits = {limit['language_id']: (limit['language__name'], limit[key])
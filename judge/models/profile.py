@@ -13,8 +13,8 @@ from django.contrib.auth.models import User
 from django.contrib.sessions.models import Session
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import F, Max
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.encoding import force_bytes
@@ -220,26 +220,27 @@ class Profile(models.Model):
     _pp_table = [pow(settings.DMOJ_PP_STEP, i) for i in range(settings.DMOJ_PP_ENTRIES)]
 
     def calculate_points(self, table=_pp_table):
-        from judge.models import Problem
-        public_problems = Problem.get_public_problems()
-        data = (
-            public_problems.filter(submission__user=self, submission__points__isnull=False)
-                           .annotate(max_points=Max('submission__points')).order_by('-max_points')
-                           .values_list('max_points', flat=True).filter(max_points__gt=0)
-        )
-        extradata = (
-            public_problems.filter(submission__user=self, submission__result='AC').values('id').distinct().count()
+        from judge.models import BestSubmission
+        best = BestSubmission.objects.filter(user=self, problem__is_public=True,
+                                             problem__is_organization_private=False)
+        stats = best.aggregate(
+            total_points=Sum('points', filter=Q(points__gt=0)),
+            solved=Count('id', filter=Q(points__gt=0)),
+            accepted=Count('id', filter=Q(is_accepted=True)),
         )
+        data = list(best.filter(points__gt=0).order_by('-points').values_list('points', flat=True)[:len(table)])
         bonus_function = settings.DMOJ_PP_BONUS_FUNCTION
-        points = sum(data)
-        problems = len(data)
-        entries = min(len(data), len(table))
-        pp = sum(map(mul, table[:entries], data[:entries])) + bonus_function(extradata)
+        points = stats['total_points'] or 0
+        problems = stats['solved']
+        pp = sum(map(mul, table, data)) + bonus_function(stats['accepted'])
         if self.points != points or problems != self.problem_count or self.performance_points != pp:
             self.points = points
             self.problem_count = problems
             self.performance_points = pp
             self.save(update_fields=['points', 'problem_count', 'performance_points'])
+
+            from judge.utils.leaderboard import Leaderboard
+            Leaderboard.invalidate()
         return points
 
     calculate_points.alters_data = True
@@ -264,8 +265,11 @@ class Profile(models.Model):
     generate_scratch_codes.alters_data = True
 
     def remove_contest(self):
+        from judge.utils.session_state import SessionState
+
         self.current_contest = None
         self.save()
+        SessionState.invalidate(self.user_id)
 
     remove_contest.alters_data = True
 
@@ -285,11 +289,8 @@ class Profile(models.Model):
     def update_typo(self):
         contest = self.typo_contest
         if contest is not None:
-            if contest.ended:
-                self.remove_contest()
-            result = TypoResult.objects.get(user=self, contest=contest)
-            if result.is_finish:
-                self.remove_contest()
+            if contest.ended or TypoResult.objects.filter(user=self, contest=contest, is_finish=True).exists():
+                self.remove_typo()
 
     update_typo.alters_data = True
 
@@ -329,11 +330,31 @@ class Profile(models.Model):
     def pre_save(self):
         pass
 
+    def __init__(self, *args, **kwargs):
+        super(Profile, self).__init__(*args, **kwargs)
+        # Read from __dict__, so that profiles loaded without the field don't fetch it.
+        self.__original_is_unlisted = self.__dict__.get('is_unlisted')
+
     def save(self, force_insert=False, force_update=False, *args, **kwargs):
         if not self.verified and self.name != self.last_name:
             self.last_change_name = timezone.now() - datetime.timedelta(days=30) * (self.last_name is None)
             self.last_name = self.name
-        return super().save(force_insert, force_update, *args, **kwargs)
+        result = super().save(force_insert, force_update, *args, **kwargs)
+        is_unlisted = self.__dict__.get('is_unlisted')
+        if self.__original_is_unlisted is not None and is_unlisted != self.__original_is_unlisted:
+            # Problem statistics only count listed users, and are kept up to date one submission at a time.
+            transaction.on_commit(self.reconcile_problem_stats)
+        self.__original_is_unlisted = is_unlisted
+        return result
+
+    def reconcile_problem_stats(self):
+        from judge.models.problem import Problem
+
+        for problem in Problem.objects.filter(submission__user=self).distinct().order_by('id') \
+                .only('id', 'points', 'submission_count', 'accepted_count', 'user_count'):
+            problem.reconcile_stats()
+
+    reconcile_problem_stats.alters_data = True
 
     class Meta:
         ordering = ['id']
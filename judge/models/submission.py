@@ -1,10 +1,12 @@
 import hashlib
 import os
 import hmac
+from datetime import timezone as dt_timezone
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -16,7 +18,8 @@ from judge.models.profile import Profile
 from judge.models.runtime import Language
 from judge.utils.unicode import utf8bytes
 
-__all__ = ['SUBMISSION_RESULT', 'Submission', 'SubmissionSource', 'SubmissionTestCase']
+__all__ = ['SUBMISSION_RESULT', 'BestSubmission', 'Submission', 'SubmissionDailyCount', 'SubmissionSource',
+           'SubmissionTestCase']
 
 SUBMISSION_RESULT = (
     ('AC', _('Accepted')),
@@ -190,7 +193,7 @@ class Submission(models.Model):
 
         return False
 
-    def update_contest(self):
+    def update_contest(self, recompute=True):
         try:
             contest = self.contest
         except AttributeError:
@@ -202,7 +205,10 @@ class Submission(models.Model):
         if not contest_problem.partial and contest.points != contest_problem.points:
             contest.points = 0
         contest.save()
-        contest.participation.recompute_results()
+        if contest.points == contest_problem.points or contest_problem.first_accept_id == contest.participation_id:
+            contest_problem.update_first_accept()
+        if recompute:
+            contest.participation.recompute_results()
 
     update_contest.alters_data = True
 
@@ -288,3 +294,107 @@ class SubmissionTestCase(models.Model):
         unique_together = ('submission', 'case')
         verbose_name = _('submission test case')
         verbose_name_plural = _('submission test cases')
+
+
+class BestSubmission(models.Model):
+    """A user's highest scoring graded submission on a problem, the earliest one among ties.
+
+    Kept up to date by update_for as submissions are graded, and rebuilt from the submissions when they could have
+    lost points, e.g. when rejudged, rescored or deleted.
+    """
+
+    user = models.ForeignKey(Profile, verbose_name=_('user'), related_name='best_submissions',
+                             on_delete=models.CASCADE)
+    problem = models.ForeignKey(Problem, verbose_name=_('problem'), related_name='+', on_delete=models.CASCADE)
+    submission = models.ForeignKey(Submission, verbose_name=_('submission'), related_name='+',
+                                   on_delete=models.CASCADE)
+    points = models.FloatField(verbose_name=_('points'))
+    is_accepted = models.BooleanField(verbose_name=_('accepted'), default=False,
+                                      help_text=_('Whether any submission by the user on the problem was accepted.'))
+
+    @classmethod
+    def update_for(cls, submission):
+        if submission.points is None:
+            return
+
+        is_accepted = submission.result == 'AC'
+        with transaction.atomic():
+            best, created = cls.objects.select_for_update().get_or_create(
+                user_id=submission.user_id, problem_id=submission.problem_id,
+                defaults={'submission': submission, 'points': submission.points, 'is_accepted': is_accepted},
+            )
+            if created:
+                return
+            if submission.points > best.points:
+                best.submission = submission
+                best.points = submission.points
+            elif not is_accepted or best.is_accepted:
+                return
+            best.is_accepted |= is_accepted
+            best.save()
+
+    update_for.alters_data = True
+
+    @classmethod
+    def rebuild(cls, submissions):
+        """Rebuilds the best submissions of every user and problem with a submission in the given queryset."""
+        pairs = list(submissions.values_list('user_id', 'problem_id').distinct())
+        user_ids = {user_id for user_id, _ in pairs}
+        problem_ids = {problem_id for _, problem_id in pairs}
+        if not user_ids:
+            return
+
+        best = {}
+        graded = Submission.objects.filter(user_id__in=user_ids, problem_id__in=problem_ids, points__isnull=False)
+        for id, user_id, problem_id, points, result in (
+            graded.order_by('user_id', 'problem_id', '-points', 'id')
+                  .values_list('id', 'user_id', 'problem_id', 'points', 'result').iterator()
+        ):
+            key = user_id, problem_id
+            if key not in best:
+                best[key] = cls(user_id=user_id, problem_id=problem_id, submission_id=id, points=points)
+            best[key].is_accepted |= result == 'AC'
+
+        with transaction.atomic():
+            cls.objects.filter(user_id__in=user_ids, problem_id__in=problem_ids).delete()
+            cls.objects.bulk_create(best.values())
+
+    rebuild.alters_data = True
+
+    class Meta:
+        unique_together = ('user', 'problem')
+        indexes = [models.Index(fields=['user', '-points'], name='judge_bestsubmission_points')]
+        verbose_name = _('best submission')
+        verbose_name_plural = _('best submissions')
+
+
+class SubmissionDailyCount(models.Model):
+    """The number of submissions a user made on each day, in UTC, for their activity heatmap.
+
+    Counted as submissions are created and deleted.
+    """
+
+    user = models.ForeignKey(Profile, verbose_name=_('user'), related_name='daily_submission_counts',
+                             on_delete=models.CASCADE)
+    date = models.DateField(verbose_name=_('date'))
+    count = models.IntegerField(verbose_name=_('submission count'), default=0)
+
+    @classmethod
+    def add(cls, user_id, time, delta):
+        date = time.astimezone(dt_timezone.utc).date()
+        updated = cls.objects.filter(user_id=user_id, date=date).update(count=F('count') + delta)
+        if updated or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, date=date, count=delta)
+        except IntegrityError:
+            # Created concurrently.
+            cls.objects.filter(user_id=user_id, date=date).update(count=F('count') + delta)
+
+    add.alters_data = True
+
+    class Meta:
+        unique_together = ('user', 'date')
+        verbose_name = _('daily submission count')
+        verbose_name_plural = _('daily submission counts')
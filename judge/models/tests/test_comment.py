@@ -0,0 +1,110 @@
+import random
+import threading
+from collections import defaultdict
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from judge.models import Comment
+from judge.models.tests.util import create_user
+
+
+class CommentTreeMixin:
+    def post(self, author, parent=None, page='p:test'):
+        comment = Comment(author=author, page=page, body='comment', parent=parent)
+        with comment.lock_tree():
+            comment.save()
+        return comment
+
+    def assertValidTrees(self):
+        nodes = defaultdict(list)
+        for comment in Comment.objects.order_by('tree_id', 'lft'):
+            nodes[comment.tree_id].append(comment)
+
+        for tree_id, tree in nodes.items():
+            with self.subTest(tree_id=tree_id):
+                self.assertIsNone(tree[0].parent_id)
+                self.assertEqual((tree[0].lft, tree[0].rght, tree[0].level), (1, 2 * len(tree), 0))
+                self.assertEqual(sorted([node.lft for node in tree] + [node.rght for node in tree]),
+                                 list(range(1, 2 * len(tree) + 1)))
+                by_id = {node.id: node for node in tree}
+                for node in tree[1:]:
+                    parent = by_id[node.parent_id]
+                    self.assertEqual(node.level, parent.level + 1)
+                    self.assertTrue(parent.lft < node.lft < node.rght < parent.rght)
+
+
+class CommentTreeTestCase(CommentTreeMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(username='commenter').profile
+
+    def test_new_threads(self):
+        first = self.post(self.author)
+        second = self.post(self.author, page='p:other')
+        reply = self.post(self.author, parent=first)
+
+        # New threads go after the existing ones, leaving them alone.
+        with CaptureQueriesContext(connection) as queries:
+            third = self.post(self.author)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+        self.assertEqual([first.tree_id, second.tree_id, third.tree_id], [1, 2, 3])
+        self.assertEqual(Comment.objects.get(id=reply.id).tree_id, first.tree_id)
+        self.assertValidTrees()
+
+    def test_replies(self):
+        root = self.post(self.author)
+        first = self.post(self.author, parent=root)
+        second = self.post(self.author, parent=root)
+        nested = self.post(self.author, parent=first)
+        other = self.post(self.author)
+        self.post(self.author, parent=other)
+
+        self.assertEqual([comment.id for comment in Comment.objects.get(id=root.id).get_descendants()],
+                         [second.id, first.id, nested.id])
+        self.assertValidTrees()
+
+    def test_moved_thread(self):
+        root = self.post(self.author)
+        reply = self.post(self.author, parent=root)
+        Comment.objects.filter(tree_id=root.tree_id).update(tree_id=10)
+        self.assertEqual(self.post(self.author, parent=reply).tree_id, 10)
+        self.assertValidTrees()
+
+
+@skipUnless(connection.vendor == 'mysql', 'needs a database with concurrent writers')
+class CommentTreeStressTestCase(CommentTreeMixin, TransactionTestCase):
+    THREADS = 8
+    POSTS_PER_THREAD = 250
+
+    def test_concurrent_posts(self):
+        author = create_user(username='commenter').profile
+        pages = ['p:test%d' % page for page in range(4)]
+        errors = []
+
+        def poster(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(self.POSTS_PER_THREAD):
+                    parents = list(Comment.objects.order_by('-id').values_list('id', flat=True)[:50])
+                    comment = Comment(author=author, page=rng.choice(pages), body='comment')
+                    if parents and rng.random() < 0.8:
+                        comment.parent_id = rng.choice(parents)
+                    with comment.lock_tree():
+                        comment.save()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=poster, args=(seed,)) for seed in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Comment.objects.count(), self.THREADS * self.POSTS_PER_THREAD)
+        self.assertValidTrees()
@@ -1,8 +1,9 @@
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.test import SimpleTestCase, TestCase
 from django.utils import timezone
 
-from judge.models import Language, LanguageLimit, Problem
+from judge.models import Language, LanguageLimit, Problem, Submission
 from judge.models.problem import disallowed_characters_validator
 from judge.models.tests.util import CommonDataMixin, create_organization, create_problem, create_problem_type, \
     create_solution, create_user
@@ -371,6 +372,80 @@ class SolutionTestCase(CommonDataMixin, TestCase):
         self._test_object_methods_with_users(self.unpublished_solution, data)
 
 
+class ProblemStatsTestCase(CommonDataMixin, TestCase):
+    def setUp(self):
+        self.problem = create_problem(code='stats', points=10)
+        self.unlisted = create_user(username='unlisted')
+        self.unlisted.profile.is_unlisted = True
+        self.unlisted.profile.save()
+
+    def submit(self, user, result=None, points=None):
+        submission = Submission.objects.create(user=user.profile, problem=self.problem,
+                                               language=Language.get_python3())
+        if result is not None:
+            self.grade(submission, result, points)
+        return submission
+
+    def grade(self, submission, result, points):
+        submission.result, submission.points = result, points
+        with transaction.atomic():
+            Problem.lock_stats([self.problem.id])
+            submission.save()
+            if self.problem.is_accepted(result, points):
+                self.problem.adjust_stats(accepted={submission.user_id: 1})
+
+    def assertStats(self, submissions, accepted, users):
+        self.problem.update_stats()
+        self.assertEqual((self.problem.submission_count, self.problem.accepted_count, self.problem.user_count),
+                         (submissions, accepted, users))
+        self.assertAlmostEqual(self.problem.ac_rate, 100.0 * accepted / submissions if submissions else 0)
+
+        self.problem.reconcile_stats()
+        self.assertEqual((self.problem.submission_count, self.problem.accepted_count, self.problem.user_count),
+                         (submissions, accepted, users))
+
+    def test_counters(self):
+        normal, superuser = self.users['normal'], self.users['superuser']
+        self.assertStats(0, 0, 0)
+
+        first = self.submit(normal, 'AC', 10)
+        self.submit(normal, 'WA', 0)
+        self.submit(self.unlisted, 'AC', 10)
+        self.assertStats(2, 1, 1)
+
+        second = self.submit(normal, 'AC', 10)
+        self.submit(superuser, 'AC', 5)
+        self.assertStats(4, 2, 1)
+
+        with transaction.atomic():
+            Problem.lock_stats([self.problem.id])
+            Submission.objects.filter(id__in=[first.id, second.id]).update(result=None, points=None)
+            self.problem.adjust_stats(accepted={normal.profile.id: -2})
+        self.assertStats(4, 0, 0)
+
+        self.grade(second, 'AC', 10)
+        self.assertStats(4, 1, 1)
+
+        second.delete()
+        self.assertStats(3, 0, 0)
+
+    def test_unlisted_changed(self):
+        normal = self.users['normal']
+        self.submit(normal, 'AC', 10)
+        self.submit(self.unlisted, 'AC', 10)
+        self.submit(self.unlisted, 'WA', 0)
+        self.assertStats(1, 1, 1)
+
+        for profile, is_unlisted, stats in ((self.unlisted.profile, False, (3, 2, 2)),
+                                            (normal.profile, True, (2, 1, 1))):
+            profile.is_unlisted = is_unlisted
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.save()
+            self.problem.refresh_from_db()
+            self.assertEqual((self.problem.submission_count, self.problem.accepted_count, self.problem.user_count),
+                             stats)
+
+
 class DisallowedCharactersValidatorTestCase(SimpleTestCase):
     def test_valid(self):
         with self.settings(DMOJ_PROBLEM_STATEMENT_DISALLOWED_CHARACTERS={'“', '”', '‘', '’'}):
@@ -1,9 +1,14 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
 from django.test import TestCase
 from django.utils import timezone
 
-from judge.models import ContestSubmission, Language, Submission, SubmissionSource
+from judge.models import BestSubmission, ContestSubmission, Language, Profile, Submission, SubmissionDailyCount, \
+    SubmissionSource
 from judge.models.tests.util import CommonDataMixin, create_contest, create_contest_participation, \
     create_contest_problem, create_problem, create_user
+from judge.performance_points import get_pp_breakdown
 
 
 class SubmissionTestCase(CommonDataMixin, TestCase):
@@ -188,3 +193,83 @@ class SubmissionTestCase(CommonDataMixin, TestCase):
             },
         }
         self._test_object_methods_with_users(self.ie_submission, data)
+
+
+class BestSubmissionTestCase(CommonDataMixin, TestCase):
+    def setUp(self):
+        self.profile = self.users['normal'].profile
+        self.problems = {
+            'best_a': create_problem(code='best_a', points=10, is_public=True, partial=True),
+            'best_b': create_problem(code='best_b', points=5, is_public=True),
+            'best_private': create_problem(code='best_private', points=7),
+        }
+
+    def grade(self, problem, result, points):
+        submission = Submission.objects.create(user=self.profile, problem=self.problems[problem],
+                                               language=Language.get_python3(), result=result, points=points,
+                                               status='D')
+        BestSubmission.update_for(submission)
+        return submission
+
+    def best(self):
+        return {
+            best.problem.code: (best.submission_id, best.points, best.is_accepted)
+            for best in BestSubmission.objects.filter(user=self.profile).select_related('problem')
+        }
+
+    def test_best_submissions(self):
+        self.grade('best_a', 'WA', 4)
+        first = self.grade('best_a', 'AC', 10)
+        second = self.grade('best_a', 'AC', 10)
+        b = self.grade('best_b', 'AC', 5)
+        private = self.grade('best_private', 'WA', 3)
+
+        best = self.best()
+        self.assertEqual(best, {
+            'best_a': (first.id, 10, True),
+            'best_b': (b.id, 5, True),
+            'best_private': (private.id, 3, False),
+        })
+        BestSubmission.rebuild(Submission.objects.filter(user=self.profile))
+        self.assertEqual(self.best(), best)
+
+        self.profile.calculate_points()
+        self.assertEqual(self.profile.points, 15)
+        self.assertEqual(self.profile.problem_count, 2)
+        self.assertAlmostEqual(self.profile.performance_points,
+                               10 + 5 * settings.DMOJ_PP_STEP + settings.DMOJ_PP_BONUS_FUNCTION(2))
+
+        breakdown, has_more = get_pp_breakdown(self.profile)
+        self.assertEqual([(entry.problem_code, entry.sub_id) for entry in breakdown],
+                         [('best_a', first.id), ('best_b', b.id)])
+        self.assertFalse(has_more)
+
+        Submission.objects.filter(id=first.id).update(points=None, result=None)
+        BestSubmission.rebuild(Submission.objects.filter(id=first.id))
+        self.assertEqual(self.best()['best_a'], (second.id, 10, True))
+
+        second.delete()
+        self.assertEqual(self.best()['best_a'][1:], (4, False))
+        self.assertEqual(Profile.objects.get(id=self.profile.id).points, 9)
+
+
+class SubmissionDailyCountTestCase(CommonDataMixin, TestCase):
+    def counts(self):
+        return dict(self.profile.daily_submission_counts.values_list('date', 'count'))
+
+    def test_daily_counts(self):
+        self.profile = self.users['normal'].profile
+        self.problem = create_problem(code='daily')
+        today = timezone.now().astimezone(dt_timezone.utc).date()
+
+        first = Submission.objects.create(user=self.profile, problem=self.problem, language=Language.get_python3())
+        Submission.objects.create(user=self.profile, problem=self.problem, language=Language.get_python3())
+        self.assertEqual(self.counts(), {today: 2})
+
+        first.delete()
+        self.assertEqual(self.counts(), {today: 1})
+
+        # Counted on the UTC day of the submission.
+        local = dt_timezone(timedelta(hours=-7))
+        SubmissionDailyCount.add(self.profile.id, datetime(2020, 1, 1, 23, 30, tzinfo=local), 1)
+        self.assertEqual(self.counts(), {today: 1, date(2020, 1, 2): 1})
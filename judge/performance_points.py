@@ -1,10 +1,8 @@
 from collections import namedtuple
 
 from django.conf import settings
-from django.db import connection
 
-from judge.models import Submission
-from judge.timezone import from_database_time
+from judge.models import BestSubmission, Submission
 
 PP_WEIGHT_TABLE = [pow(settings.DMOJ_PP_STEP, i) for i in range(settings.DMOJ_PP_ENTRIES)]
 
@@ -14,41 +12,15 @@ PPBreakdown = namedtuple('PPBreakdown', 'points weight scaled_points problem_nam
 
 
 def get_pp_breakdown(user, start=0, end=settings.DMOJ_PP_ENTRIES):
-    with connection.cursor() as cursor:
-        cursor.execute('''
-            SELECT max_points_table.problem_code,
-                   max_points_table.problem_name,
-                   max_points_table.max_points,
-                   judge_submission.id,
-                   judge_submission.date,
-                   judge_submission.case_points,
-                   judge_submission.case_total,
-                   judge_submission.result,
-                   judge_language.short_name,
-                   judge_language.key
-            FROM judge_submission
-            JOIN (SELECT judge_problem.id problem_id,
-                         judge_problem.name problem_name,
-                         judge_problem.code problem_code,
-                         MAX(judge_submission.points) AS max_points
-                FROM judge_problem
-                INNER JOIN judge_submission ON (judge_problem.id = judge_submission.problem_id)
-                WHERE (judge_problem.is_public = True AND
-                       judge_problem.is_organization_private = False AND
-                       judge_submission.points IS NOT NULL AND
-                       judge_submission.user_id = %s)
-                GROUP BY judge_problem.id
-                HAVING MAX(judge_submission.points) > 0.0) AS max_points_table
-            ON (judge_submission.problem_id = max_points_table.problem_id AND
-                judge_submission.points = max_points_table.max_points AND
-                judge_submission.user_id = %s)
-            JOIN judge_language
-            ON judge_submission.language_id = judge_language.id
-            GROUP BY max_points_table.problem_id
-            ORDER BY max_points DESC, judge_submission.date DESC
-            LIMIT %s OFFSET %s
-        ''', (user.id, user.id, end - start + 1, start))
-        data = cursor.fetchall()
+    data = list(
+        BestSubmission.objects.filter(user=user, points__gt=0, problem__is_public=True,
+                                      problem__is_organization_private=False)
+                              .order_by('-points', '-submission__date')
+                              .values_list('problem__code', 'problem__name', 'points', 'submission_id',
+                                           'submission__date', 'submission__case_points', 'submission__case_total',
+                                           'submission__result', 'submission__language__short_name',
+                                           'submission__language__key')[start:end + 1],
+    )
 
     breakdown = []
     for weight, contrib in zip(PP_WEIGHT_TABLE[start:end], data):
@@ -66,7 +38,7 @@ def get_pp_breakdown(user, start=0, end=settings.DMOJ_PP_ENTRIES):
             problem_name=name,
             problem_code=code,
             sub_id=id,
-            sub_date=from_database_time(date),
+            sub_date=date,
             sub_points=case_points,
             sub_total=case_total,
             sub_short_status=result,
@@ -2,11 +2,18 @@ import math
 from bisect import bisect
 from operator import attrgetter, itemgetter
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Count, OuterRef, Subquery, IntegerField
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Subquery
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 def tie_ranker(iterable, key=attrgetter('points')):
     rank = 0
@@ -54,9 +61,111 @@ def WP(RA, RB, VA, VB):
     return (math.erf((RB - RA) / math.sqrt(2 * (VA * VA + VB * VB))) + 1) / 2.0
 
 
-def recalculate_ratings(old_rating, old_volatility, actual_rank, times_rated, is_disqualified):
+# math.erf, as a piecewise polynomial for evaluating over numpy arrays: each ERF_STEP wide interval of [0, ERF_LIMIT)
+# is interpolated at Chebyshev points, which keeps the error within a few ulps. math.erf(ERF_LIMIT) rounds to 1.
+ERF_LIMIT = 6
+ERF_STEP = 1 / 64
+ERF_DEGREE = 7
+
+# Number of win probabilities computed at once when finding expected ranks.
+ERANK_BLOCK_SIZE = 65536
+
+_erf_table = None
+
+
+def _get_erf_table():
+    global _erf_table
+    if _erf_table is None:
+        from numpy.polynomial import chebyshev
+
+        rows = []
+        for interval in range(int(ERF_LIMIT / ERF_STEP)):
+            start = interval * ERF_STEP
+            coefficients = chebyshev.cheb2poly(chebyshev.chebinterpolate(
+                lambda t: np.array([math.erf(start + (x + 1) * ERF_STEP / 2) for x in t]), ERF_DEGREE))
+            rows.append(np.pad(coefficients, (0, ERF_DEGREE + 1 - len(coefficients))))
+        # Arguments past the limit are clamped into one more interval, where erf is 1.
+        rows.append(np.eye(ERF_DEGREE + 1)[0])
+        _erf_table = np.array(rows).T.copy()
+    return _erf_table
+
+
+def _erf(x):
+    table = _get_erf_table()
+    t = np.minimum(np.abs(x), ERF_LIMIT)
+    t *= 1 / ERF_STEP
+    interval = t.astype(np.intp)
+    t -= interval
+    t *= 2
+    t -= 1
+    result = table[ERF_DEGREE].take(interval)
+    for coefficients in table[ERF_DEGREE - 1::-1]:
+        result *= t
+        result += coefficients.take(interval)
+    return np.copysign(result, x, out=result)
+
+
+def _erf_totals(users, opponents, weights):
+    # Sum of erf((RB - RA) / sqrt(2 * (VA^2 + VB^2))) over all opponents, for every user, a block of users at a time.
+    rating, variance = opponents[:, 0], opponents[:, 1] ** 2
+    totals = np.empty(len(users))
+    step = max(1, ERANK_BLOCK_SIZE // len(opponents))
+    for start in range(0, len(users), step):
+        block = users[start:start + step]
+        totals[start:start + step] = _erf(
+            (rating - block[:, 0:1]) / np.sqrt(2 * (block[:, 1:2] ** 2 + variance)),
+        ) @ weights
+    return totals
+
+
+def expected_ranks(rating, volatility, resolution=None):
+    """Returns each user's expected rank: 0.5 plus their win probabilities against every user, themselves included.
+
+    With numpy, users with the same rating and volatility are computed once, and opponents with the same rating and
+    volatility are weighted by their number, so the work is quadratic in the number of distinct users.
+
+    If resolution, a (rating, volatility) pair, is given, the expected ranks are approximated: opponents are grouped
+    after rounding to multiples of it, and expected ranks are interpolated from a grid with that spacing. The work
+    then depends on the spread of ratings rather than on the number of users.
+    """
+    if np is None:
+        ranks = []
+        for RA, VA in zip(rating, volatility):
+            ERank = 0.5
+            for RB, VB in zip(rating, volatility):
+                ERank += WP(RA, RB, VA, VB)
+            ranks.append(ERank)
+        return ranks
+
+    users = np.column_stack((np.asarray(rating, dtype=float), np.asarray(volatility, dtype=float)))
+    if not resolution:
+        distinct, inverse, counts = np.unique(users, axis=0, return_inverse=True, return_counts=True)
+        totals = _erf_totals(distinct, distinct, counts.astype(float))[inverse.reshape(-1)]
+    else:
+        resolution = np.asarray(resolution, dtype=float)
+        opponents, counts = np.unique(np.round(users / resolution) * resolution, axis=0, return_counts=True)
+
+        # Grid points from the lowest to one past the highest user, so every user lies within a cell.
+        low = np.floor(users.min(axis=0) / resolution)
+        high = np.floor(users.max(axis=0) / resolution) + 1
+        axes = [np.arange(low[k], high[k] + 1) * resolution[k] for k in range(2)]
+        grid = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 2)
+        grid_totals = _erf_totals(grid, opponents, counts.astype(float)).reshape(len(axes[0]), len(axes[1]))
+
+        position = users / resolution - low
+        cell = position.astype(np.intp)
+        fraction = position - cell
+        i, j = cell[:, 0], cell[:, 1]
+        x, y = fraction[:, 0], fraction[:, 1]
+        totals = ((grid_totals[i, j] * (1 - y) + grid_totals[i, j + 1] * y) * (1 - x) +
+                  (grid_totals[i + 1, j] * (1 - y) + grid_totals[i + 1, j + 1] * y) * x)
+    return (0.5 + (len(users) + totals) / 2).tolist()
+
+
+def recalculate_ratings(old_rating, old_volatility, actual_rank, times_rated, is_disqualified, resolution=None):
     # actual_rank: 1 is first place, N is last place
     # if there are ties, use the average of places (if places 2, 3, 4, 5 tie, use 3.5 for all of them)
+    # resolution: approximate expected ranks, see expected_ranks
 
     N = len(old_rating)
     new_rating = old_rating[:]
@@ -72,11 +181,9 @@ def recalculate_ratings(old_rating, old_volatility, actual_rank, times_rated, is
     sum2 = sum((i - ave_rating) ** 2 for i in old_rating) / (N - 1)
     CF = math.sqrt(sum1 + sum2)
 
+    expected_rank = expected_ranks(old_rating, old_volatility, resolution)
     for i in range(N):
-        ERank = 0.5
-        for j in range(N):
-            ERank += WP(old_rating[i], old_rating[j], old_volatility[i], old_volatility[j])
-
+        ERank = expected_rank[i]
         EPerf = -normal_CDF_inverse((ERank - 0.5) / N)
         APerf = -normal_CDF_inverse((actual_rank[i] - 0.5) / N)
         PerfAs = old_rating[i] + CF * (APerf - EPerf)
@@ -120,6 +227,8 @@ def recalculate_ratings(old_rating, old_volatility, actual_rank, times_rated, is
 
 def rate_contest(contest):
     from judge.models import Rating, Profile
+    from judge.utils.leaderboard import Leaderboard
+    from judge.utils.scoreboard import ContestScoreboard
 
     rating_subquery = Rating.objects.filter(user=OuterRef('user'))
     rating_sorted = rating_subquery.order_by('-contest__end_time')
@@ -147,7 +256,11 @@ def rate_contest(contest):
     old_rating = list(map(itemgetter('last_rating'), users))
     old_volatility = list(map(itemgetter('volatility'), users))
     times_ranked = list(map(itemgetter('times'), users))
-    rating, volatility = recalculate_ratings(old_rating, old_volatility, ranking, times_ranked, is_disqualified)
+    resolution = None
+    if settings.DMOJ_RATING_APPROXIMATE_ABOVE is not None and len(users) > settings.DMOJ_RATING_APPROXIMATE_ABOVE:
+        resolution = settings.DMOJ_RATING_APPROXIMATE_RESOLUTION
+    rating, volatility = recalculate_ratings(old_rating, old_volatility, ranking, times_ranked, is_disqualified,
+                                             resolution)
 
     now = timezone.now()
     ratings = [Rating(user_id=i, contest=contest, rating=r, volatility=v, last_rated=now, participation_id=p, rank=z)
@@ -158,6 +271,20 @@ def rate_contest(contest):
         Profile.objects.filter(contest_history__contest=contest, contest_history__virtual=0).update(
             rating=Subquery(Rating.objects.filter(user=OuterRef('id'))
                             .order_by('-contest__end_time').values('rating')[:1]))
+        transaction.on_commit(lambda: cache.delete('rating_bounds'))
+        Leaderboard.invalidate()
+    ContestScoreboard(contest).invalidate()
+
+
+def get_rating_bounds():
+    """Returns the lowest and highest ratings anyone ever had, or Nones if no contest was rated."""
+    bounds = cache.get('rating_bounds')
+    if bounds is None:
+        from judge.models import Rating
+        data = Rating.objects.aggregate(Min('rating'), Max('rating'))
+        bounds = data['rating__min'], data['rating__max']
+        cache.set('rating_bounds', bounds, settings.DMOJ_RATING_BOUNDS_CACHE_TIMEOUT)
+    return bounds
 
 
 RATING_LEVELS = ['Newbie', 'Amateur', 'Expert', 'Candidate Master', 'Master', 'Grandmaster', 'Target']
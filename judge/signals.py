@@ -5,13 +5,22 @@ from django.conf import settings
 from django.contrib.sites.models import Site
 from django.core.cache import cache
 from django.core.cache.utils import make_template_fragment_key
-from django.db.models.signals import post_delete, post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import user_logged_in, user_logged_out
 
 from .caching import finished_submission
-from .models import BlogPost, Comment, Contest, ContestSubmission, EFFECTIVE_MATH_ENGINES, Judge, Language, License, \
-    MiscConfig, Organization, Problem, Profile, Submission, WebAuthnCredential, LoggedInUser
+from .models import BestSubmission, BlogPost, Comment, Contest, ContestParticipation, ContestProblem, \
+    ContestSubmission, EFFECTIVE_MATH_ENGINES, Judge, Language, License, MiscConfig, Organization, Problem, \
+    ProblemGroup, ProblemTranslation, ProblemType, Profile, Submission, SubmissionDailyCount, WebAuthnCredential, \
+    LoggedInUser
+from .utils.api_cache import model_changed
+from .utils.leaderboard import Leaderboard
+from .utils.problem_index import ProblemIndex
+from .utils.scoreboard import ContestScoreboard
+from .utils.session_state import SessionState
+from .views.api.api_v2 import get_response_cache_models
 
 
 def get_pdf_path(basename):
@@ -33,6 +42,7 @@ def problem_update(sender, instance, **kwargs):
     if hasattr(instance, '_updating_stats_only'):
         return
 
+    ProblemIndex.invalidate()
     cache.delete_many([
         make_template_fragment_key('submission_problem', (instance.id,)),
         make_template_fragment_key('problem_feed', (instance.id,)),
@@ -48,15 +58,34 @@ def problem_update(sender, instance, **kwargs):
         unlink_if_exists(get_pdf_path('%s.%s.pdf' % (instance.code, lang)))
 
 
+@receiver(post_delete, sender=Problem)
+@receiver(post_save, sender=ProblemTranslation)
+@receiver(post_delete, sender=ProblemTranslation)
+@receiver(post_save, sender=ProblemGroup)
+@receiver(post_delete, sender=ProblemGroup)
+@receiver(post_save, sender=ProblemType)
+@receiver(post_delete, sender=ProblemType)
+@receiver(m2m_changed, sender=Problem.types.through)
+@receiver(m2m_changed, sender=Problem.organizations.through)
+@receiver(m2m_changed, sender=Problem.authors.through)
+@receiver(m2m_changed, sender=Problem.curators.through)
+@receiver(m2m_changed, sender=Problem.testers.through)
+def problem_index_update(sender, **kwargs):
+    ProblemIndex.invalidate()
+
+
 @receiver(post_save, sender=Profile)
 def profile_update(sender, instance, **kwargs):
     if hasattr(instance, '_updating_stats_only'):
         return
 
+    # Whether the user is listed, or their points, may have been edited.
+    Leaderboard.invalidate()
     cache.delete_many([make_template_fragment_key('user_about', (instance.id, engine))
                        for engine in EFFECTIVE_MATH_ENGINES] +
                       [make_template_fragment_key('org_member_count', (org_id,))
                        for org_id in instance.organizations.values_list('id', flat=True)])
+    ContestScoreboard.invalidate_contests(instance.contest_history.values_list('contest_id', flat=True).distinct())
 
 
 @receiver(post_delete, sender=WebAuthnCredential)
@@ -78,6 +107,29 @@ def contest_update(sender, instance, **kwargs):
     cache.delete_many(['generated-meta-contest:%d' % instance.id] +
                       [make_template_fragment_key('contest_html', (instance.id, engine))
                        for engine in EFFECTIVE_MATH_ENGINES])
+    ContestScoreboard(instance).invalidate()
+
+
+@receiver(post_save, sender=ContestProblem)
+@receiver(post_delete, sender=ContestProblem)
+def contest_problem_update(sender, instance, **kwargs):
+    if kwargs.get('update_fields') == frozenset({'first_accept'}):
+        return
+    ContestScoreboard.invalidate_contests([instance.contest_id])
+
+
+@receiver(post_save, sender=ContestParticipation)
+def contest_participation_create(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ContestScoreboard(instance.contest).update(instance)
+
+
+@receiver(post_delete, sender=ContestParticipation)
+def contest_participation_delete(sender, instance, **kwargs):
+    ContestScoreboard(instance.contest).remove(instance)
+    # Deleting a participation nulls the first accepts it held before its submissions go, so they are found again here.
+    for problem in instance.contest.contest_problems.filter(first_accept=None):
+        problem.update_first_accept()
 
 
 @receiver(post_save, sender=License)
@@ -112,13 +164,28 @@ def post_update(sender, instance, **kwargs):
                        for engine in EFFECTIVE_MATH_ENGINES])
 
 
+@receiver(post_save, sender=Submission)
+def submission_create(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        SubmissionDailyCount.add(instance.user_id, instance.date, 1)
+        if not instance.user.is_unlisted:
+            Problem.count_submissions(instance.problem_id, 1)
+
+
 @receiver(post_delete, sender=Submission)
 def submission_delete(sender, instance, **kwargs):
     finished_submission(instance)
+    SubmissionDailyCount.add(instance.user_id, instance.date, -1)
+    BestSubmission.rebuild(Submission.objects.filter(user_id=instance.user_id, problem_id=instance.problem_id))
     instance.user._updating_stats_only = True
     instance.user.calculate_points()
-    instance.problem._updating_stats_only = True
-    instance.problem.update_stats()
+    problem = instance.problem
+    with transaction.atomic():
+        Problem.lock_stats([problem.id])
+        problem.adjust_stats(
+            accepted={instance.user_id: -1} if problem.is_accepted(instance.result, instance.points) else {},
+            submissions=0 if instance.user.is_unlisted else -1,
+        )
 
 
 @receiver(post_delete, sender=ContestSubmission)
@@ -126,6 +193,8 @@ def contest_submission_delete(sender, instance, **kwargs):
     participation = instance.participation
     participation.recompute_results()
     Submission.objects.filter(id=instance.submission_id).update(contest_object=None)
+    if instance.problem.first_accept_id == instance.participation_id:
+        instance.problem.update_first_accept()
 
 
 @receiver(post_save, sender=Organization)
@@ -173,8 +242,29 @@ def contest_submission_update(sender, instance, **kwargs):
 @receiver(user_logged_in)
 def user_logged_in_signal(sender, **kwargs):
     LoggedInUser.objects.get_or_create(user=kwargs.get('user'))
+    SessionState.invalidate(kwargs.get('user').id)
 
 
 @receiver(user_logged_out)
 def user_logged_out_signal(sender, **kwargs):
-    LoggedInUser.objects.filter(user=kwargs.get('user')).delete()
\ No newline at end of file
+    LoggedInUser.objects.filter(user=kwargs.get('user')).delete()
+
+
+# Only the models some API response is cached on, so that saving any other model costs nothing.
+api_cache_models = get_response_cache_models()
+
+
+def api_cache_model_update(sender, **kwargs):
+    model_changed(sender)
+
+
+for api_cache_model in api_cache_models:
+    post_save.connect(api_cache_model_update, sender=api_cache_model)
+    post_delete.connect(api_cache_model_update, sender=api_cache_model)
+
+
+@receiver(m2m_changed)
+def api_cache_m2m_update(sender, instance, action, model, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        for changed in {type(instance), model} & api_cache_models:
+            model_changed(changed)
@@ -13,16 +13,17 @@ __all__ = ('rescore_contest', 'run_moss')
 @shared_task(bind=True)
 def rescore_contest(self, contest_key):
     contest = Contest.objects.get(key=contest_key)
-    participations = contest.users
-
-    rescored = 0
-    with Progress(self, participations.count(), stage=_('Recalculating contest scores')) as p:
-        for participation in participations.iterator():
-            participation.recompute_results()
-            rescored += 1
-            if rescored % 10 == 0:
-                p.done = rescored
-    return rescored
+    for problem in contest.contest_problems.all():
+        problem.update_first_accept()
+    participations = list(contest.users.all())
+    batch_size = settings.DMOJ_CONTEST_RESCORE_BATCH_SIZE
+
+    with Progress(self, len(participations), stage=_('Recalculating contest scores')) as p:
+        for start in range(0, len(participations), batch_size):
+            batch = participations[start:start + batch_size]
+            contest.recompute_results(batch)
+            p.did(len(batch))
+    return len(participations)
 
 
 @shared_task(bind=True)
@@ -3,7 +3,8 @@ from django.core.cache import cache
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
-from judge.models import Problem, Profile, Submission
+from judge.judgeapi import BATCH_REQUEST_SIZE, judge_submissions
+from judge.models import BestSubmission, Problem, Profile, Submission
 from judge.utils.celery import Progress
 
 __all__ = ('apply_submission_filter', 'rejudge_problem_filter', 'rescore_problem')
@@ -27,14 +28,12 @@ def rejudge_problem_filter(self, problem_id, id_range=None, languages=None, resu
     queryset = Submission.objects.filter(problem_id=problem_id)
     queryset = apply_submission_filter(queryset, id_range, languages, results)
 
-    rejudged = 0
-    with Progress(self, queryset.count()) as p:
-        for submission in queryset.iterator():
-            submission.judge(rejudge=True, batch_rejudge=True)
-            rejudged += 1
-            if rejudged % 10 == 0:
-                p.done = rejudged
-    return rejudged
+    submission_ids = list(queryset.values_list('id', flat=True))
+    with Progress(self, len(submission_ids)) as p:
+        for start in range(0, len(submission_ids), BATCH_REQUEST_SIZE):
+            judge_submissions(submission_ids[start:start + BATCH_REQUEST_SIZE], rejudge=True, batch_rejudge=True)
+            p.done = min(start + BATCH_REQUEST_SIZE, len(submission_ids))
+    return len(submission_ids)
 
 
 @shared_task(bind=True)
@@ -55,6 +54,7 @@ def rescore_problem(self, problem_id):
             if rescored % 10 == 0:
                 p.done = rescored
 
+    BestSubmission.rebuild(submissions)
     with Progress(self, submissions.values('user_id').distinct().count(), stage=_('Recalculating user points')) as p:
         users = 0
         profiles = Profile.objects.filter(id__in=submissions.values_list('user_id', flat=True).distinct())
@@ -66,4 +66,6 @@ def rescore_problem(self, problem_id):
             users += 1
             if users % 10 == 0:
                 p.done = users
+
+    problem.reconcile_stats()
     return rescored
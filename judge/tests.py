@@ -1 +1,39 @@
-# Create your tests here.
+import random
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase
+
+from judge import ratings
+
+
+@skipIf(ratings.np is None, 'numpy is not installed')
+class RatingsTestCase(SimpleTestCase):
+    def contest(self, rng, size):
+        rating = [rng.choice((600, rng.randint(0, 3500))) for _ in range(size)]
+        volatility = [rng.choice((400, rng.randint(80, 535))) for _ in range(size)]
+        scores = sorted((rng.randint(0, 20) for _ in range(size)), reverse=True)
+        rank = list(ratings.tie_ranker(scores, key=lambda score: score))
+        times_rated = [rng.randint(0, 30) for _ in range(size)]
+        is_disqualified = [rng.random() < 0.05 for _ in range(size)]
+        return rating, volatility, rank, times_rated, is_disqualified
+
+    def test_erf(self):
+        values = [x / 7 for x in range(-60, 61)] + [-1e6, -6, 6, 6.01, 1e6]
+        for value, result in zip(values, ratings._erf(ratings.np.array(values))):
+            self.assertAlmostEqual(result, ratings.math.erf(value), places=14)
+
+    def test_vectorized_matches_reference(self):
+        rng = random.Random(0)
+        for size in (10, 11, 50, 200):
+            for _ in range(5):
+                contest = self.contest(rng, size)
+                with mock.patch.object(ratings, 'np', None):
+                    reference = ratings.recalculate_ratings(*contest)
+                self.assertEqual(ratings.recalculate_ratings(*contest), reference)
+
+    def test_approximate(self):
+        contest = self.contest(random.Random(1), 500)
+        exact = ratings.recalculate_ratings(*contest)
+        approximate = ratings.recalculate_ratings(*contest, resolution=(10, 50))
+        for a, b in zip(exact[0], approximate[0]):
+            self.assertLessEqual(abs(a - b), 1)
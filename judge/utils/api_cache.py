@@ -0,0 +1,43 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+__all__ = ['get_etag', 'get_model_versions', 'model_changed']
+
+
+def get_version_key(model):
+    return 'api_cache_version:%s' % model._meta.label_lower
+
+
+def model_changed(model):
+    key = get_version_key(model)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not set, so no cached response depends on it.
+            pass
+
+    # Responses cached before the change is visible would never be invalidated.
+    transaction.on_commit(bump)
+
+
+def get_model_versions(models):
+    """Returns a string which changes whenever an object of any of `models` is saved or deleted."""
+    keys = [get_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        # Start from the time rather than 0, so that an evicted version can't come back to one already seen.
+        for key in keys:
+            cache.add(key, int(time.time() * 1000), None)
+        versions = cache.get_many(keys)
+    return '.'.join(str(versions.get(key)) for key in keys)
+
+
+def get_etag(data):
+    return '"%s"' % hashlib.sha1(json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()).hexdigest()
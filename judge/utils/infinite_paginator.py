@@ -2,6 +2,7 @@ import collections
 import inspect
 from math import ceil
 
+from django.core.exceptions import ValidationError
 from django.core.paginator import EmptyPage, InvalidPage
 from django.http import Http404
 from django.utils.functional import cached_property
@@ -93,6 +94,45 @@ class InfinitePage(collections.abc.Sequence):
         return result
 
 
+class KeysetPage(collections.abc.Sequence):
+    """A page of objects ordered by a unique field, which starts after the object with a given value of that field.
+
+    The database seeks straight to the first object rather than skipping over all the objects before it, so deep pages
+    cost the same as the first. Pages have no numbers: the next page starts after `next_cursor`.
+    """
+
+    def __init__(self, object_list, after, field, page_size, paginator):
+        object_list = list(object_list)
+        self.object_list = object_list[:page_size]
+        self._has_next = len(object_list) > page_size
+        self.after = after
+        self.field = field
+        self.number = None
+        self.paginator = paginator
+
+    def __repr__(self):
+        return '<Page after %s>' % self.after
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.after is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @cached_property
+    def next_cursor(self):
+        return getattr(self.object_list[-1], self.field) if self._has_next else None
+
+
 class DummyPaginator:
     is_infinite = True
 
@@ -109,14 +149,58 @@ def infinite_paginate(queryset, page, page_size, pad_pages, paginator=None):
     return InfinitePage(sliced, page, queryset, page_size, pad_pages, paginator)
 
 
+def keyset_paginate(queryset, order, after, page_size, paginator=None):
+    """Returns the page of `queryset`, ordered by `order`, a unique field optionally prefixed with '-', that starts
+    after the object whose value of the field is `after`, or the first page if `after` is None."""
+    field = order.lstrip('-')
+    if after is not None:
+        queryset = queryset.filter(**{'%s__%s' % (field, 'lt' if order.startswith('-') else 'gt'): after})
+    return KeysetPage(queryset.order_by(order)[:page_size + 1], after, field, page_size, paginator)
+
+
 class InfinitePaginationMixin:
     pad_pages = 2
+    # A unique field the queryset is ordered by, to enable paginating with ?after_<field>= instead of page numbers.
+    cursor_order = None
+
+    @property
+    def cursor_field(self):
+        return self.cursor_order and self.cursor_order.lstrip('-')
+
+    @property
+    def cursor_kwarg(self):
+        return self.cursor_order and 'after_' + self.cursor_field
+
+    @property
+    def use_keyset_pagination(self):
+        return self.cursor_order is not None and self.cursor_kwarg in self.request.GET
+
+    def get_next_cursor(self, page):
+        """Returns the value of ?after_<field>= which gives the page following `page`, whichever way it was found."""
+        if isinstance(page, KeysetPage):
+            return page.next_cursor
+        if self.cursor_order is None or not page.has_next() or not len(page):
+            return None
+        return getattr(page[-1], self.cursor_field)
+
+    def keyset_paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get(self.cursor_kwarg)
+        try:
+            after = queryset.model._meta.get_field(self.cursor_field).to_python(after)
+        except ValidationError:
+            raise Http404('Invalid cursor (%s).' % after)
+        paginator = DummyPaginator(page_size)
+        page = keyset_paginate(queryset, self.cursor_order, after, page_size, paginator)
+        return paginator, page, page.object_list, page.has_other_pages()
 
     @property
     def use_infinite_pagination(self):
         return True
 
     def paginate_queryset(self, queryset, page_size):
+        if self.use_keyset_pagination:
+            return self.keyset_paginate_queryset(queryset, page_size)
+
         if not self.use_infinite_pagination:
             paginator, page, object_list, has_other = super().paginate_queryset(queryset, page_size)
             paginator.is_infinite = False
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from judge.models import Profile
+
+__all__ = ['Leaderboard', 'RankedUserList', 'leaderboard']
+
+
+class Leaderboard(object):
+    """The listed users in the order of each column of the leaderboard, with their global ranks, kept in each process.
+
+    Ranks and positions are looked up here, so that a page of the leaderboard only loads the users on it. Changes to
+    points and ratings bump a version number in the cache, and each process rebuilds its snapshot on the next request
+    after that, but at most every DMOJ_LEADERBOARD_INTERVAL seconds.
+    """
+    version_key = 'leaderboard_version'
+    fields = ('points', 'problem_count', 'rating', 'performance_points')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.loaded = None
+        self.values = []
+        self.orders = {}
+
+    @classmethod
+    def invalidate(cls):
+        def bump():
+            try:
+                cache.incr(cls.version_key)
+            except ValueError:
+                # Not set, so processes will rebuild anyway.
+                pass
+
+        # Other processes must not rebuild before the change is visible to them.
+        transaction.on_commit(bump)
+
+    def _get_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            # Start from the time rather than 0, so that an evicted version can't come back to one already seen.
+            cache.add(self.version_key, int(time.time() * 1000), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def _build(self):
+        self.values = list(Profile.objects.filter(is_unlisted=False, user__is_active=True)
+                           .values_list('id', *self.fields))
+        self.orders = {}
+        self.loaded = time.monotonic()
+
+    def _sort(self, order):
+        index = self.fields.index(order.lstrip('-')) + 1
+        descending = order.startswith('-')
+
+        # Like the database, sort missing values below all others, breaking ties by id.
+        def key(values):
+            value = values[index]
+            return (value is not None, value if value is not None else 0, -values[0] if descending else values[0])
+
+        entries, rank, last = [], 0, object()
+        for position, values in enumerate(sorted(self.values, key=key, reverse=descending)):
+            if values[index] != last:
+                rank, last = position + 1, values[index]
+            entries.append((rank, values[0]))
+        return entries, {id: position for position, (_, id) in enumerate(entries)}
+
+    def get(self, order):
+        """Returns the ranks and ids of the users in the given order, a field prefixed with '-' if descending, and
+        a dict of their positions in it by id."""
+        version = self._get_version()
+        with self.lock:
+            if self.loaded is None or (version != self.version and
+                                       time.monotonic() - self.loaded >= settings.DMOJ_LEADERBOARD_INTERVAL):
+                self._build()
+                self.version = version
+            if order not in self.orders:
+                self.orders[order] = self._sort(order)
+            return self.orders[order]
+
+
+leaderboard = Leaderboard()
+
+
+class RankedUserList(object):
+    """Ranks and ids of users, paginated as a list of (rank, profile): slicing loads just the profiles in the slice."""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def count(self):
+        return len(self.entries)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1 or None][0]
+        entries = self.entries[item]
+        profiles = Profile.objects.filter(id__in=[id for _, id in entries]).select_related('user') \
+            .only('display_rank', 'user__username', 'points', 'rating', 'performance_points', 'problem_count')
+        profiles = {profile.id: profile for profile in profiles}
+        return [(rank, profiles[id]) for rank, id in entries if id in profiles]
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import os
 import re
@@ -6,6 +7,7 @@ import zipfile
 
 import yaml
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.core.files.storage import FileSystemStorage
 from django.urls import reverse
@@ -65,31 +67,32 @@ def get_testcase_data(archive, case):
     }
 
 
-def get_problem_testcases_data(problem):
+def read_problem_testcases_data(problem):
     """ Read test data of a problem and store
-    result in a dictionary.
+    result in a dictionary. Returns the path of
+    the archive as well, if there is one.
 
-    If an error occurs, this method will return an empty dict.
+    If an error occurs, the dictionary will be empty.
     """
     from judge.models import problem_data_storage
 
     init_path = '%s/init.yml' % problem.code
     if not problem_data_storage.exists(init_path):
-        return {}
+        return None, {}
 
     init_content = yaml.safe_load(problem_data_storage.open(init_path).read())
     archive_path = init_content.get('archive', None)
     if not archive_path:
-        return {}
+        return None, {}
 
     archive_path = '%s/%s' % (problem.code, archive_path)
     if not problem_data_storage.exists(archive_path):
-        return {}
+        return archive_path, {}
 
     try:
         archive = zipfile.ZipFile(problem_data_storage.open(archive_path))
     except zipfile.BadZipfile:
-        return {}
+        return archive_path, {}
 
     testcases_data = {}
     # TODO:
@@ -103,8 +106,68 @@ def get_problem_testcases_data(problem):
             order += 1
             testcases_data[order] = get_testcase_data(archive, case)
         except Exception:
-            return {}
-    return testcases_data
+            return archive_path, {}
+    return archive_path, testcases_data
+
+
+def get_file_version(path):
+    from judge.models import problem_data_storage
+
+    try:
+        return problem_data_storage.get_modified_time(path).timestamp(), problem_data_storage.size(path)
+    except OSError:
+        return None
+
+
+def get_testcases_index_key(problem):
+    return 'problem_testcases:%d' % problem.id
+
+
+def get_testcase_data_key(index, case):
+    return 'problem_testcase:%s:%d' % (index['version'], case)
+
+
+def cache_problem_testcases_data(problem):
+    """Reads the previews of the test cases of a problem, and caches them one by one, under the versions of its
+    init.yml and archive, along with an index of them. Returns the index and the previews."""
+    init_version = get_file_version('%s/init.yml' % problem.code)
+    archive_path, testcases_data = read_problem_testcases_data(problem)
+    archive_version = archive_path and get_file_version(archive_path)
+
+    index = {
+        'init': init_version,
+        'archive': archive_path,
+        'archive_version': archive_version,
+        'version': hashlib.sha1(repr((problem.id, init_version, archive_path, archive_version)).encode()).hexdigest(),
+        'count': len(testcases_data),
+    }
+    timeout = settings.DMOJ_TESTCASE_PREVIEW_CACHE_TIMEOUT
+    cache.set_many({get_testcase_data_key(index, case): data for case, data in testcases_data.items()}, timeout)
+    cache.set(get_testcases_index_key(problem), index, timeout)
+    return index, testcases_data
+
+
+def get_problem_testcases_data(problem, cases=None):
+    """Returns the previews of the input and answer of test cases of a problem by case number, for the given case
+    numbers or all of them. They are read from the archive once, when the problem data is saved or on the first request
+    after the archive changes, and served from the cache afterwards.
+
+    If an error occurs, this method will return an empty dict.
+    """
+    index = cache.get(get_testcases_index_key(problem))
+    if index is not None and index['init'] == get_file_version('%s/init.yml' % problem.code) and \
+            (index['archive'] is None or index['archive_version'] == get_file_version(index['archive'])):
+        numbers = range(1, index['count'] + 1) if cases is None else \
+            sorted({case for case in cases if 1 <= case <= index['count']})
+        keys = {get_testcase_data_key(index, case): case for case in numbers}
+        found = cache.get_many(keys)
+        if len(found) == len(keys):
+            return {case: found[key] for key, case in keys.items()}
+
+    _, testcases_data = cache_problem_testcases_data(problem)
+    if cases is None:
+        return testcases_data
+    return {case: testcases_data[case] for case in cases if case in testcases_data}
 
 
 class ProblemDataCompiler(object):
@@ -298,6 +361,7 @@ class ProblemDataCompiler(object):
                 # judge-server#670 will not update cache on empty init.yml,
                 # but will do so if there is no init.yml, so we delete the init.yml
                 problem_data_storage.delete(yml_file)
+        cache_problem_testcases_data(self.problem)
 
     @classmethod
     def generate(cls, *args, **kwargs):
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from judge.models import Problem, ProblemGroup, ProblemTranslation, ProblemType
+
+__all__ = ['IndexedProblemList', 'ProblemIndex', 'ProblemIndexEntry', 'problem_index']
+
+ProblemIndexEntry = namedtuple(
+    'ProblemIndexEntry',
+    'id code name points ac_rate user_count group_id type_ids organization_ids editor_ids translations '
+    'is_public public_description is_organization_private',
+)
+
+
+class ProblemIndex(object):
+    """Everything the problem list filters and sorts on, for every problem, kept in each process.
+
+    The index is rebuilt when problems, their types, groups, organizations or translations change, and the statistics
+    are reloaded, at most every DMOJ_PROBLEM_INDEX_STATS_INTERVAL seconds, when submissions change them. Processes
+    find out about changes through two version numbers in the cache.
+    """
+    version_key = 'problem_index_version'
+    stats_version_key = 'problem_index_stats_version'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.stats_version = None
+        self.stats_loaded = 0
+        self.entries = []
+        self.group_names = {}
+        self.type_names = {}
+
+    @classmethod
+    def _bump(cls, key):
+        def bump():
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Not set, so processes will load everything anyway.
+                pass
+
+        # Other processes must not reload before the change is visible to them.
+        transaction.on_commit(bump)
+
+    @classmethod
+    def invalidate(cls):
+        cls._bump(cls.version_key)
+
+    @classmethod
+    def stats_changed(cls):
+        cls._bump(cls.stats_version_key)
+
+    def _get_versions(self):
+        keys = [self.version_key, self.stats_version_key]
+        versions = cache.get_many(keys)
+        if len(versions) < len(keys):
+            # Start from the time rather than 0, so that an evicted version can't come back to one already seen.
+            for key in keys:
+                cache.add(key, int(time.time() * 1000), None)
+            versions = cache.get_many(keys)
+        return versions.get(self.version_key), versions.get(self.stats_version_key)
+
+    def _build(self):
+        types, organizations, editors, translations = {}, {}, {}, {}
+        for problem, type in Problem.types.through.objects.order_by('problemtype__full_name') \
+                .values_list('problem_id', 'problemtype_id'):
+            types.setdefault(problem, []).append(type)
+        organization_pairs = Problem.organizations.through.objects.values_list('problem_id', 'organization_id')
+        for problem, organization in organization_pairs:
+            organizations.setdefault(problem, set()).add(organization)
+        for field in ('authors', 'curators', 'testers'):
+            for problem, profile in getattr(Problem, field).through.objects.values_list('problem_id', 'profile_id'):
+                editors.setdefault(problem, set()).add(profile)
+        for problem, language, name in ProblemTranslation.objects.values_list('problem_id', 'language', 'name'):
+            translations.setdefault(problem, {})[language] = name
+
+        self.entries = [
+            ProblemIndexEntry(
+                id=id, code=code, name=name, points=points, ac_rate=ac_rate, user_count=user_count,
+                group_id=group_id, type_ids=types.get(id, []), organization_ids=organizations.get(id, set()),
+                editor_ids=editors.get(id, set()), translations=translations.get(id, {}), is_public=is_public,
+                public_description=public_description, is_organization_private=is_organization_private,
+            ) for id, code, name, points, ac_rate, user_count, group_id, is_public, public_description,
+            is_organization_private in Problem.objects.values_list(
+                'id', 'code', 'name', 'points', 'ac_rate', 'user_count', 'group_id', 'is_public',
+                'public_description', 'is_organization_private',
+            )
+        ]
+        self.group_names = dict(ProblemGroup.objects.values_list('id', 'name'))
+        self.type_names = dict(ProblemType.objects.values_list('id', 'full_name'))
+        self.stats_loaded = time.monotonic()
+
+    def _load_stats(self):
+        stats = {id: (ac_rate, user_count) for id, ac_rate, user_count in
+                 Problem.objects.values_list('id', 'ac_rate', 'user_count')}
+        self.entries = [entry._replace(ac_rate=stats[entry.id][0], user_count=stats[entry.id][1])
+                        for entry in self.entries if entry.id in stats]
+        self.stats_loaded = time.monotonic()
+
+    def get(self):
+        """Returns the entries of all problems, in the default order of problems."""
+        # The versions must be read before the problems: changes after that will be picked up next time.
+        version, stats_version = self._get_versions()
+        with self.lock:
+            if version is None or version != self.version:
+                self._build()
+                self.version, self.stats_version = version, stats_version
+            elif stats_version != self.stats_version and \
+                    time.monotonic() - self.stats_loaded >= settings.DMOJ_PROBLEM_INDEX_STATS_INTERVAL:
+                self._load_stats()
+                self.stats_version = stats_version
+            return self.entries
+
+
+problem_index = ProblemIndex()
+
+
+class IndexedProblemList(object):
+    """A list of index entries, paginated as a list of problems: slicing loads just the problems in the slice."""
+
+    def __init__(self, entries, language):
+        self.entries = entries
+        self.language = language
+
+    def __len__(self):
+        return len(self.entries)
+
+    def count(self):
+        return len(self.entries)
+
+    def sort(self, key, reverse=False):
+        self.entries.sort(key=key, reverse=reverse)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1 or None][0]
+        entries = self.entries[item]
+        problems = {problem.id: problem for problem in
+                    Problem.objects.filter(id__in=[entry.id for entry in entries])
+                                   .add_i18n_name(self.language).select_related('group')
+                                   .defer('description', 'summary')}
+        return [problems[entry.id] for entry in entries if entry.id in problems]
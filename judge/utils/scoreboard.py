@@ -0,0 +1,213 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from judge.models import ContestParticipation
+
+__all__ = ['ContestRankingProfile', 'ContestScoreboard', 'base_contest_ranking_list', 'get_contest_problems',
+           'make_contest_ranking_profile']
+
+# Reading further back than this many changes rebuilds the scoreboard instead.
+SCOREBOARD_MAX_CHANGES = 1000
+
+ContestRankingProfile = namedtuple(
+    'ContestRankingProfile',
+    'id user css_class username points cumtime tiebreaker organization participation '
+    'participation_rating problem_cells result_cell',
+)
+
+
+def make_contest_ranking_profile(contest, participation, contest_problems):
+    def display_user_problem(contest_problem):
+        # When the contest format is changed, `format_data` might be invalid.
+        # This will cause `display_user_problem` to error, so we display '???' instead.
+        try:
+            return contest.format.display_user_problem(participation, contest_problem)
+        except (KeyError, TypeError, ValueError):
+            return mark_safe('<td>???</td>')
+
+    user = participation.user
+    return ContestRankingProfile(
+        id=user.id,
+        user=user.user,
+        css_class=user.css_class,
+        username=user.username,
+        points=participation.score,
+        cumtime=participation.cumtime,
+        tiebreaker=participation.tiebreaker,
+        organization=user.organization,
+        participation_rating=participation.rating.rating if hasattr(participation, 'rating') else None,
+        problem_cells=[display_user_problem(contest_problem) for contest_problem in contest_problems],
+        result_cell=contest.format.display_participation_result(participation),
+        participation=participation,
+    )
+
+
+def base_contest_ranking_list(contest, problems, queryset):
+    return [make_contest_ranking_profile(contest, participation, problems) for participation in
+            queryset.select_related('user__user', 'rating').defer('user__about', 'user__organizations__about')]
+
+
+def get_contest_problems(contest):
+    # Cells only need the id of the first accept of every problem, which ContestProblem.update_first_accept maintains.
+    return list(contest.contest_problems.select_related('problem').defer('problem__description').order_by('order'))
+
+
+def ranking_key(profile):
+    # The order of ContestScoreboard.ranking, as used to be done by the database.
+    return profile.participation.is_disqualified, -profile.points, profile.cumtime, profile.tiebreaker, profile.id
+
+
+class ContestScoreboard(object):
+    """The live scoreboard of a contest: the ranking rows of every live participation, with their cells rendered.
+
+    The rows are kept in the cache, and built from the database when missing. Afterwards, every participation touched by
+    recompute_results gets its row rendered again and recorded as a change, under a new version number. Readers apply
+    the changes made since the version of the cached rows, and pollers can ask for the rows changed since the version
+    they have last seen.
+    """
+
+    def __init__(self, contest):
+        self.contest = contest
+        self.key = 'contest_scoreboard:%d' % contest.id
+        self.version_key = 'contest_scoreboard_version:%d' % contest.id
+
+    def _change_key(self, version):
+        return 'contest_scoreboard_change:%d:%d' % (self.contest.id, version)
+
+    def _queryset(self):
+        return self.contest.users.filter(virtual=ContestParticipation.LIVE).prefetch_related('user__organizations')
+
+    def _attach(self, rows):
+        for row in rows:
+            participation = row.participation
+            participation.__dict__.pop('_now', None)
+            participation.contest = self.contest
+
+    def _detach(self, rows):
+        # The contest is the same for every row, so there is no point in storing it.
+        for row in rows:
+            row.participation._state.fields_cache.pop('contest', None)
+
+    def _set(self, key, rows, value):
+        self._detach(rows)
+        try:
+            cache.set(key, value, settings.DMOJ_CONTEST_SCOREBOARD_CACHE_TIMEOUT)
+        finally:
+            self._attach(rows)
+
+    def current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, 0, None)
+            version = cache.get(self.version_key, 0)
+        return version
+
+    def _get_changes(self, since, version):
+        # Returns the changes after since, up to version, as (version, participation id, row) tuples. Changes are
+        # recorded right after their version is taken, so only the most recent ones may be missing, and then the
+        # list stops short of version. None if some change is lost.
+        if version - since > SCOREBOARD_MAX_CHANGES:
+            return None
+        keys = [self._change_key(number) for number in range(since + 1, version + 1)]
+        found = cache.get_many(keys)
+        changes = []
+        for number, key in enumerate(keys, since + 1):
+            if key not in found:
+                return changes if not any(key in found for key in keys[number - since:]) else None
+            changes.append((number,) + found[key])
+        return changes
+
+    def _build(self, version):
+        problems = get_contest_problems(self.contest)
+        rows = {row.participation.id: row
+                for row in base_contest_ranking_list(self.contest, problems, self._queryset())}
+        board = {'version': version, 'rows': rows}
+        self._set(self.key, rows.values(), board)
+        return board
+
+    def get_board(self):
+        # The version must be read before the rows: changes after it may or may not be in the rows built.
+        version = self.current_version()
+        board = cache.get(self.key)
+        if board is None or board['version'] > version:
+            return self._build(version)
+
+        changes = self._get_changes(board['version'], version)
+        if changes is None:
+            return self._build(version)
+
+        rows = board['rows']
+        self._attach(rows.values())
+        if changes:
+            for _, participation_id, row in changes:
+                if row is None:
+                    rows.pop(participation_id, None)
+                else:
+                    self._attach([row])
+                    rows[participation_id] = row
+            board['version'] = changes[-1][0]
+            self._set(self.key, rows.values(), board)
+        return board
+
+    def ranking(self):
+        return sorted(self.get_board()['rows'].values(), key=ranking_key)
+
+    def changes_since(self, since):
+        """Returns the current version, the ranking, and the ids of the participations whose rows changed after the
+        version since. None if that can't be told, e.g. when the changes have expired from the cache."""
+        board = self.get_board()
+        version = board['version']
+        if since > version:
+            return None
+        changes = self._get_changes(since, version)
+        if changes is None or len(changes) != version - since:
+            return None
+        return version, sorted(board['rows'].values(), key=ranking_key), {change[1] for change in changes}
+
+    def _record(self, participation_id, row):
+        try:
+            version = cache.incr(self.version_key)
+        except ValueError:
+            # Nobody has looked at the scoreboard, so there is nothing to update.
+            return
+        rows = [row] if row is not None else []
+        self._set(self._change_key(version), rows, (participation_id, row))
+
+    def update(self, participation):
+        if participation.virtual == ContestParticipation.LIVE:
+            self.update_rows([participation.id])
+
+    def update_rows(self, participation_ids):
+        """Renders the rows of the participations again, e.g. when they stop or start being the first to solve a
+        problem. Those not on the scoreboard are recorded as removed."""
+        if cache.get(self.version_key) is None:
+            return
+
+        problems = get_contest_problems(self.contest)
+        rows = {row.participation.id: row for row in
+                base_contest_ranking_list(self.contest, problems, self._queryset().filter(id__in=participation_ids))}
+        for participation_id in participation_ids:
+            self._record(participation_id, rows.get(participation_id))
+
+    def remove(self, participation):
+        if participation.virtual == ContestParticipation.LIVE:
+            self._record(participation.id, None)
+
+    def invalidate(self):
+        cache.delete(self.key)
+
+    def reset(self):
+        """Rebuilds the rows after many participations have changed at once, and has pollers reload all of them."""
+        try:
+            # A version without a recorded change can't be caught up with, only rebuilt from.
+            cache.incr(self.version_key)
+        except ValueError:
+            pass
+        self.invalidate()
+
+    @classmethod
+    def invalidate_contests(cls, contest_ids):
+        cache.delete_many(['contest_scoreboard:%d' % contest_id for contest_id in contest_ids])
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+
+__all__ = ['SessionState']
+
+
+class SessionState(object):
+    """Facts about a user which the middleware would otherwise check against the database on every request: the
+    session they were last seen with, and until when their current contest and typo contest need not be checked.
+
+    The state is shared by all requests of the user, and must be invalidated whenever those facts change, i.e. on
+    login, and when joining or leaving a contest.
+    """
+
+    def __init__(self, user_id):
+        self.key = self.get_key(user_id)
+        self.data = cache.get(self.key) or {}
+
+    @staticmethod
+    def get_key(user_id):
+        return 'session_state:%d' % user_id
+
+    @classmethod
+    def for_request(cls, request):
+        # Fetched once per request, for all the middleware.
+        state = getattr(request, '_session_state', None)
+        if state is None:
+            state = request._session_state = cls(request.user.id)
+        return state
+
+    @classmethod
+    def invalidate(cls, user_id):
+        cache.delete(cls.get_key(user_id))
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value):
+        if self.data.get(name) != value:
+            self.data[name] = value
+            cache.set(self.key, self.data, settings.DMOJ_SESSION_STATE_CACHE_TIMEOUT)
@@ -1,6 +1,14 @@
-from django.test import SimpleTestCase
+import json
 
-from judge.utils.infinite_paginator import infinite_paginate
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from judge.models import Problem
+from judge.models.tests.util import create_problem
+from judge.utils.infinite_paginator import infinite_paginate, keyset_paginate
+from judge.views.api.api_v2 import APIProblemList
 
 
 class InfinitePaginatorTestCase(SimpleTestCase):
@@ -30,3 +38,55 @@ class InfinitePaginatorTestCase(SimpleTestCase):
         self.assertEqual(infinite_paginate(range(1, 101), 10, 10, 2).page_range, [1, 2, False, 8, 9, 10])
         self.assertEqual(infinite_paginate(range(1, 100), 10, 10, 2).page_range, [1, 2, False, 8, 9, 10])
         self.assertEqual(infinite_paginate(range(1, 100), 10, 10, 2).object_list, list(range(91, 100)))
+
+
+class SmallPageProblemList(APIProblemList):
+    paginate_by = 3
+
+
+class KeysetPaginatorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            create_problem(code='keyset%d' % i, is_public=True)
+        create_problem(code='keysethidden', is_public=False)
+
+    def get_api_data(self, **params):
+        request = RequestFactory().get('/api/v2/problems', params)
+        request.user = AnonymousUser()
+        request.profile = None
+        return json.loads(SmallPageProblemList.as_view()(request).content)['data']
+
+    def test_keyset_paginate(self):
+        queryset = Problem.objects.filter(code__startswith='keyset', is_public=True)
+        page = keyset_paginate(queryset, 'code', None, 3)
+        self.assertEqual([problem.code for problem in page], ['keyset0', 'keyset1', 'keyset2'])
+        self.assertEqual((page.has_previous(), page.has_next(), page.next_cursor), (False, True, 'keyset2'))
+
+        page = keyset_paginate(queryset, 'code', 'keyset5', 3)
+        self.assertEqual([problem.code for problem in page], ['keyset6'])
+        self.assertEqual((page.has_previous(), page.has_next(), page.next_cursor), (True, False, None))
+
+        page = keyset_paginate(queryset, '-code', 'keyset5', 3)
+        self.assertEqual([problem.code for problem in page], ['keyset4', 'keyset3', 'keyset2'])
+        self.assertEqual(page.next_cursor, 'keyset2')
+
+    def test_deep_pages(self):
+        queryset = Problem.objects.filter(code__startswith='keyset').order_by('id')
+        ids = list(queryset.values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            page = keyset_paginate(queryset, 'id', ids[-3], 2)
+        self.assertEqual([problem.id for problem in page], ids[-2:])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_api(self):
+        pages, params = [], {}
+        while True:
+            data = self.get_api_data(**params)
+            pages.append([problem['code'] for problem in data['objects']])
+            if data['next_after_code'] is None:
+                self.assertFalse(data['has_more'])
+                break
+            params = {'after_code': data['next_after_code']}
+        self.assertEqual(pages, [['keyset0', 'keyset1', 'keyset2'], ['keyset3', 'keyset4', 'keyset5'], ['keyset6']])
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from judge.models import Profile
+from judge.models.tests.util import create_user
+from judge.utils.leaderboard import Leaderboard, RankedUserList
+
+
+class LeaderboardTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for username, points, rating, is_unlisted, is_active in (
+            ('first', 30, 2000, False, True), ('second', 20, None, False, True), ('tied', 20, 1500, False, True),
+            ('last', 0, 1000, False, True), ('unlisted', 50, 3000, True, True), ('inactive', 40, 2500, False, False),
+        ):
+            user = create_user(username=username, is_active=is_active)
+            Profile.objects.filter(user=user).update(performance_points=points, points=points, rating=rating,
+                                                     is_unlisted=is_unlisted)
+
+    def setUp(self):
+        cache.clear()
+
+    def usernames(self, entries):
+        return [(rank, profile.user.username) for rank, profile in RankedUserList(entries)[:]]
+
+    def test_orders(self):
+        board = Leaderboard()
+        queryset = Profile.objects.filter(is_unlisted=False, user__is_active=True)
+        for order in ('-performance_points', 'performance_points', '-rating', 'rating', '-problem_count'):
+            with self.subTest(order=order):
+                entries, positions = board.get(order)
+                self.assertEqual([id for _, id in entries],
+                                 list(queryset.order_by(order, 'id').values_list('id', flat=True)))
+                self.assertEqual([positions[id] for _, id in entries], list(range(len(entries))))
+
+        entries, _ = board.get('-performance_points')
+        self.assertEqual(self.usernames(entries), [(1, 'first'), (2, 'second'), (2, 'tied'), (4, 'last')])
+        entries, _ = board.get('-rating')
+        self.assertEqual(self.usernames(entries), [(1, 'first'), (2, 'tied'), (3, 'last'), (4, 'second')])
+
+    def test_pages(self):
+        entries, _ = Leaderboard().get('-performance_points')
+        users = RankedUserList(entries)
+        self.assertEqual(users.count(), 4)
+        with self.assertNumQueries(1):
+            page = users[2:4]
+        # Ranks are global, so ties carry over from the previous page.
+        self.assertEqual([(rank, profile.user.username) for rank, profile in page], [(2, 'tied'), (4, 'last')])
+
+    def test_invalidate(self):
+        board = Leaderboard()
+        board.get('-points')
+        with self.assertNumQueries(0):
+            board.get('-points')
+
+        profile = Profile.objects.get(user__username='last')
+        with self.captureOnCommitCallbacks(execute=True):
+            Leaderboard.invalidate()
+        Profile.objects.filter(id=profile.id).update(points=100)
+        with self.settings(DMOJ_LEADERBOARD_INTERVAL=0):
+            entries, positions = board.get('-points')
+        self.assertEqual(entries[0], (1, profile.id))
+        self.assertEqual(positions[profile.id], 0)
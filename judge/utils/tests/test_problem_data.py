@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from judge.models import ProblemTestCase
+from judge.models.tests.util import create_problem
+from judge.utils import problem_data
+from judge.utils.problem_data import get_problem_testcases_data
+
+
+class ProblemTestCasesDataTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.problem = create_problem(code='preview')
+        for order in (1, 2, 3):
+            ProblemTestCase.objects.create(dataset=cls.problem, order=order, type='C', input_file='%d.in' % order,
+                                           output_file='%d.out' % order, points=1, is_pretest=False)
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(MEDIA_ROOT=self.root, TMATH_TESTCASE_VISIBLE_LENGTH=4)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+
+        os.mkdir(os.path.join(self.root, 'preview'))
+        with open(os.path.join(self.root, 'preview', 'init.yml'), 'w') as init:
+            init.write('archive: preview.zip\n')
+        self.write_archive('answer')
+
+    def write_archive(self, answer):
+        with zipfile.ZipFile(os.path.join(self.root, 'preview', 'preview.zip'), 'w') as archive:
+            for order in (1, 2, 3):
+                archive.writestr('%d.in' % order, '%d' % order)
+                archive.writestr('%d.out' % order, '%s %d' % (answer, order))
+
+    def get_data(self, cases=None):
+        with mock.patch.object(problem_data.zipfile, 'ZipFile', wraps=zipfile.ZipFile) as opened:
+            data = get_problem_testcases_data(self.problem, cases)
+        return data, opened.call_count
+
+    def test_cached(self):
+        self.assertEqual(self.get_data(), ({
+            1: {'input': '1', 'answer': 'answ...'},
+            2: {'input': '2', 'answer': 'answ...'},
+            3: {'input': '3', 'answer': 'answ...'},
+        }, 1))
+        self.assertEqual(self.get_data([3, 2, 7]), ({
+            2: {'input': '2', 'answer': 'answ...'},
+            3: {'input': '3', 'answer': 'answ...'},
+        }, 0))
+
+    def test_evicted_case(self):
+        self.get_data()
+        index = cache.get(problem_data.get_testcases_index_key(self.problem))
+        cache.delete(problem_data.get_testcase_data_key(index, 2))
+        self.assertEqual(self.get_data([2]), ({2: {'input': '2', 'answer': 'answ...'}}, 1))
+        self.assertEqual(self.get_data([2])[1], 0)
+
+    def test_archive_changed(self):
+        self.get_data()
+        self.write_archive('ok')
+        self.assertEqual(self.get_data([1]), ({1: {'input': '1', 'answer': 'ok 1'}}, 1))
+
+    def test_no_data(self):
+        os.remove(os.path.join(self.root, 'preview', 'init.yml'))
+        self.assertEqual(self.get_data(), ({}, 0))
+        self.assertEqual(self.get_data([1]), ({}, 0))
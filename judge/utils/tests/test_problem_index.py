@@ -0,0 +1,98 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from judge.models import Problem, ProblemTranslation, ProblemType
+from judge.models.tests.util import create_organization, create_problem, create_problem_group, create_user
+from judge.utils.problem_index import problem_index
+from judge.views.problem import ProblemList
+
+
+class ProblemIndexTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(username='author')
+        cls.member = create_user(username='member')
+        cls.normal = create_user(username='normal')
+        cls.superuser = create_user(username='superuser', is_superuser=True)
+        organization = create_organization(name='index')
+        cls.member.profile.organizations.add(organization)
+        cls.types = [ProblemType.objects.create(name=name, full_name=name, priority=True) for name in ('dp', 'graph')]
+
+        create_problem(code='public', name='Public', is_public=True, points=5, user_count=3, types=('dp',))
+        create_problem(code='graph', name='Graph', is_public=True, points=5, user_count=7, types=('dp', 'graph'),
+                       group=create_problem_group('other'))
+        create_problem(code='hidden', name='Hidden', is_public=False, user_count=9)
+        create_problem(code='authored', name='Authored', is_public=False, authors=('author',), points=2)
+        create_problem(code='description', name='Description', is_public=False, public_description=True, points=3)
+        create_problem(code='private', name='Private', is_public=True, is_organization_private=True,
+                       organizations=('index',))
+        ProblemTranslation.objects.create(problem=Problem.objects.get(code='graph'), language='vi', name='Do thi')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_view(self, user, **params):
+        language = params.pop('language', 'en')
+        request = RequestFactory().get('/problems/', params)
+        request.user = user
+        request.profile = getattr(user, 'profile', None)
+        request.session = {}
+        request.LANGUAGE_CODE = language
+        view = ProblemList()
+        view.setup(request)
+        view.setup_problem_list(request)
+        view.order = params.get('order', ProblemList.default_sort)
+        return view
+
+    def assertSameProblems(self, view):
+        indexed = view.get_normal_queryset()
+        view.sort_indexed_problems(indexed)
+        queryset = view.get_database_queryset().add_i18n_name(view.request.LANGUAGE_CODE)
+        order = view.order.replace('name', 'i18n_name').replace('group', 'group__name')
+        self.assertEqual([entry.code for entry in indexed.entries],
+                         list(queryset.order_by(order, 'id').values_list('code', flat=True)))
+        return indexed
+
+    def test_visibility(self):
+        for user in (AnonymousUser(), self.normal, self.author, self.member, self.superuser):
+            with self.subTest(user=str(user)):
+                self.assertSameProblems(self.get_view(user))
+
+    def test_filters(self):
+        for params in ({'search': 'GRA'}, {'search': 'thi', 'language': 'vi'}, {'type': self.types[1].id},
+                       {'category': Problem.objects.get(code='graph').group_id}):
+            with self.subTest(params=params):
+                self.assertSameProblems(self.get_view(self.normal, **params))
+
+    def test_sorts(self):
+        for order in ('points', '-points', 'code', '-name', 'group', '-user_count'):
+            with self.subTest(order=order):
+                self.assertSameProblems(self.get_view(self.normal, order=order))
+
+    def test_hydration(self):
+        indexed = self.assertSameProblems(self.get_view(self.normal))
+        with self.assertNumQueries(1):
+            problems = indexed[:2]
+        self.assertEqual([problem.code for problem in problems], ['graph', 'public'])
+        self.assertEqual(problems[0].group.name, 'other')
+        self.assertEqual(problems[0].i18n_name, 'Graph')
+        self.assertEqual(indexed.count(), 3)
+
+    def test_updates(self):
+        problem_index.get()
+        with self.assertNumQueries(0):
+            problem_index.get()
+
+        problem = Problem.objects.get(code='hidden')
+        problem.is_public = True
+        with self.captureOnCommitCallbacks(execute=True):
+            problem.save()
+        self.assertIn('hidden', [entry.code for entry in problem_index.get()])
+
+        Problem.objects.filter(id=problem.id).update(submission_count=4, accepted_count=1, user_count=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Problem._update_ac_rate([problem.id])
+        with self.settings(DMOJ_PROBLEM_INDEX_STATS_INTERVAL=0), self.assertNumQueries(1):
+            entry = next(entry for entry in problem_index.get() if entry.id == problem.id)
+        self.assertEqual((entry.ac_rate, entry.user_count), (25.0, 1))
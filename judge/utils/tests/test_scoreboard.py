@@ -0,0 +1,157 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from judge.models import ContestParticipation, ContestSubmission, Language, Profile, Submission
+from judge.models.tests.util import create_contest, create_contest_participation, create_contest_problem, \
+    create_problem, create_user
+from judge.utils.scoreboard import ContestScoreboard
+
+
+class ContestScoreboardTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        _now = timezone.now()
+        self.contest = create_contest(
+            key='scoreboard',
+            start_time=_now - timezone.timedelta(days=1),
+            end_time=_now + timezone.timedelta(days=1),
+        )
+        create_contest_problem(contest=self.contest, problem=create_problem(code='scoreboard_problem'))
+        self.first = create_contest_participation(contest=self.contest, user='first', score=10)
+        self.second = create_contest_participation(contest=self.contest, user='second', score=5)
+        create_contest_participation(contest=self.contest, user='first', virtual=1, score=100)
+
+    def ranking(self):
+        return [row.username for row in ContestScoreboard(self.contest).ranking()]
+
+    def set_score(self, participation, score):
+        ContestParticipation.objects.filter(id=participation.id).update(score=score)
+        participation.score = score
+        ContestScoreboard(self.contest).update(participation)
+
+    def test_ranking(self):
+        self.assertEqual(self.ranking(), ['first', 'second'])
+        self.assertEqual(ContestScoreboard(self.contest).current_version(), 0)
+
+    def test_update(self):
+        self.ranking()
+        self.set_score(self.second, 20)
+        self.assertEqual(ContestScoreboard(self.contest).current_version(), 1)
+
+        # The change is applied to the cached rows, without going back to the database.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.ranking(), ['second', 'first'])
+
+        version, ranking, changed = ContestScoreboard(self.contest).changes_since(0)
+        self.assertEqual(version, 1)
+        self.assertEqual([row.username for row in ranking], ['second', 'first'])
+        self.assertEqual(changed, {self.second.id})
+        self.assertEqual(ContestScoreboard(self.contest).changes_since(1)[2], set())
+        self.assertIsNone(ContestScoreboard(self.contest).changes_since(2))
+
+    def test_update_before_built(self):
+        self.set_score(self.second, 20)
+        self.assertIsNone(cache.get('contest_scoreboard_version:%d' % self.contest.id))
+        self.assertEqual(self.ranking(), ['second', 'first'])
+
+    def test_join_and_leave(self):
+        self.ranking()
+        third = create_contest_participation(contest=self.contest, user=create_user(username='third').profile,
+                                             score=7)
+        self.assertEqual(self.ranking(), ['first', 'third', 'second'])
+        third_id = third.id
+        third.delete()
+        self.assertEqual(self.ranking(), ['first', 'second'])
+        self.assertEqual(ContestScoreboard(self.contest).changes_since(0)[2], {third_id})
+
+    def test_lost_change(self):
+        self.ranking()
+        self.set_score(self.second, 20)
+        self.set_score(self.first, 30)
+        cache.delete('contest_scoreboard_change:%d:1' % self.contest.id)
+        self.assertIsNone(ContestScoreboard(self.contest).changes_since(0))
+        self.assertEqual(self.ranking(), ['first', 'second'])
+
+    def test_first_accept(self):
+        self.ranking()
+        problem = self.contest.contest_problems.get()
+        for participation, points in ((self.second, 1), (self.first, 0)):
+            submission = Submission.objects.create(user=participation.user, problem=problem.problem, points=points,
+                                                   language=Language.get_python3(), case_points=points, case_total=1)
+            ContestSubmission.objects.create(submission=submission, problem=problem, participation=participation)
+            with self.captureOnCommitCallbacks(execute=True):
+                submission.update_contest(recompute=False)
+        problem.refresh_from_db()
+        self.assertEqual(problem.first_accept_id, self.second.id)
+        self.assertEqual(ContestScoreboard(self.contest).changes_since(0)[2], {self.second.id})
+
+        # A rejudge taking the full points away passes the first accept on, and both rows are rendered again.
+        first_submission = Submission.objects.get(contest__participation=self.first)
+        first_submission.case_points = 1
+        second_submission = Submission.objects.get(contest__participation=self.second)
+        second_submission.case_points = 0
+        with self.captureOnCommitCallbacks(execute=True):
+            first_submission.update_contest(recompute=False)
+            second_submission.update_contest(recompute=False)
+        problem.refresh_from_db()
+        self.assertEqual(problem.first_accept_id, self.first.id)
+        self.assertEqual(ContestScoreboard(self.contest).changes_since(1)[2], {self.first.id, self.second.id})
+
+        # Deleting the participation holding the first accept passes it on too.
+        second_submission.case_points = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            second_submission.update_contest(recompute=False)
+        problem.refresh_from_db()
+        self.assertEqual(problem.first_accept_id, self.second.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.delete()
+        problem.refresh_from_db()
+        self.assertEqual(problem.first_accept_id, self.first.id)
+
+
+class ContestScoreboardQueriesTestCase(TestCase):
+    fixtures = ['language_all.json']
+    USERS = 2000
+    PROBLEMS = 15
+
+    @classmethod
+    def setUpTestData(cls):
+        _now = timezone.now()
+        cls.contest = create_contest(
+            key='large_scoreboard',
+            start_time=_now - timezone.timedelta(days=1),
+            end_time=_now + timezone.timedelta(days=1),
+        )
+        cls.problems = [
+            create_contest_problem(contest=cls.contest, problem=create_problem(code='large%d' % i), points=10, order=i)
+            for i in range(cls.PROBLEMS)
+        ]
+        users = User.objects.bulk_create([User(username='large%d' % i) for i in range(cls.USERS)])
+        profiles = Profile.objects.bulk_create([Profile(user=user) for user in users])
+        cls.participations = ContestParticipation.objects.bulk_create([
+            ContestParticipation(contest=cls.contest, user=profile, score=i % 7, format_data={
+                str(problem.id): {'time': 60, 'points': (i + j) % 3 * 5} for j, problem in enumerate(cls.problems)
+            }) for i, profile in enumerate(profiles)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_render(self):
+        # The first user has full points on every third problem.
+        first = self.participations[1]
+        for problem in self.problems[1::3]:
+            problem.first_accept = first
+            problem.save(update_fields=['first_accept'])
+
+        # The problems, and the participations with their users and organizations, no matter the size of the board.
+        with self.assertNumQueries(3):
+            ranking = ContestScoreboard(self.contest).ranking()
+        self.assertEqual(len(ranking), self.USERS)
+        row = next(row for row in ranking if row.participation.id == first.id)
+        self.assertIn('first-accept', str(row.problem_cells[1]))
+        self.assertNotIn('first-accept', str(row.problem_cells[0]))
+        self.assertEqual(sum('first-accept' in str(cell) for row in ranking for cell in row.problem_cells),
+                         len(self.problems[1::3]))
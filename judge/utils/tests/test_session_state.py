@@ -0,0 +1,71 @@
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from judge.middleware import ContestMiddleware, OneSessionPerUser
+from judge.models import LoggedInUser
+from judge.models.tests.util import create_contest, create_contest_participation, create_user
+
+
+class SessionStateMiddlewareTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        _now = timezone.now()
+        self.user = create_user(username='session_state')
+        self.contest = create_contest(
+            key='session_state',
+            start_time=_now - timezone.timedelta(days=1),
+            end_time=_now + timezone.timedelta(days=1),
+            is_visible=True,
+        )
+        profile = self.user.profile
+        profile.current_contest = create_contest_participation(contest=self.contest, user=profile)
+        profile.save()
+
+        self.session = SessionStore()
+        self.session.create()
+        LoggedInUser.objects.create(user=self.user)
+
+    def request(self, middleware, queries=None):
+        request = RequestFactory().get('/')
+        request.session = self.session
+        request.user = type(self.user).objects.get(id=self.user.id)
+        request.profile = request.user.profile
+        if queries is None:
+            middleware(lambda request: HttpResponse())(request)
+        else:
+            with self.assertNumQueries(queries):
+                middleware(lambda request: HttpResponse())(request)
+        return request
+
+    def test_contest(self):
+        self.assertEqual(self.request(ContestMiddleware).participation.contest, self.contest)
+        # Only the participation itself is loaded.
+        self.assertTrue(self.request(ContestMiddleware, queries=1).in_contest)
+
+        self.user.profile.remove_contest()
+        self.assertFalse(self.request(ContestMiddleware).in_contest)
+
+    def test_contest_ended(self):
+        self.request(ContestMiddleware)
+        self.contest.end_time = timezone.now() - timezone.timedelta(minutes=1)
+        self.contest.save()
+        # The check is cached until the participation ends, at the latest.
+        cache.clear()
+        self.assertFalse(self.request(ContestMiddleware).in_contest)
+        self.user.profile.refresh_from_db()
+        self.assertIsNone(self.user.profile.current_contest)
+
+    def test_one_session(self):
+        self.request(OneSessionPerUser)
+        self.assertEqual(LoggedInUser.objects.get(user=self.user).session_key, self.session.session_key)
+        self.request(OneSessionPerUser, queries=0)
+
+        old_session = self.session
+        self.session = SessionStore()
+        self.session.create()
+        self.request(OneSessionPerUser)
+        self.assertEqual(LoggedInUser.objects.get(user=self.user).session_key, self.session.session_key)
+        self.assertFalse(SessionStore().exists(old_session.session_key))
@@ -0,0 +1,42 @@
+from django.test import TestCase
+
+from judge.models import Profile
+from judge.models.tests.util import create_user
+from judge.utils.user_ranks import UserRanks
+
+
+class UserRanksTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for username, points, rating, is_unlisted in (('first', 30, 2000, False), ('second', 20, None, False),
+                                                      ('tied', 20, 1500, False), ('last', 0, 1000, False),
+                                                      ('unlisted', 50, 3000, True)):
+            Profile.objects.filter(user=create_user(username=username)).update(
+                performance_points=points, rating=rating, is_unlisted=is_unlisted,
+            )
+
+    def test_ranks(self):
+        ranks = UserRanks()
+        listed = Profile.objects.filter(is_unlisted=False)
+        for profile in Profile.objects.all():
+            with self.subTest(user=profile.user.username):
+                expected = listed.filter(performance_points__gt=profile.performance_points).count() + 1
+                self.assertEqual(ranks.points_rank(profile.performance_points), expected)
+                if profile.rating is not None:
+                    self.assertEqual(ranks.rating_rank(profile.rating),
+                                     listed.filter(rating__gt=profile.rating).count() + 1)
+        self.assertEqual(ranks.rated_users(), 3)
+        self.assertEqual([ranks.points_rank(points) for points in (30, 20, 0, 50)], [1, 2, 4, 1])
+
+    def test_reload(self):
+        ranks = UserRanks()
+        with self.assertNumQueries(2):
+            ranks.rating_rank(1500)
+        with self.assertNumQueries(0):
+            ranks.points_rank(20)
+
+        Profile.objects.filter(user__username='last').update(performance_points=40)
+        self.assertEqual(ranks.points_rank(40), 1)
+        with self.settings(DMOJ_USER_RANK_INTERVAL=0):
+            self.assertEqual(ranks.points_rank(40), 1)
+            self.assertEqual(ranks.points_rank(30), 2)
@@ -0,0 +1,50 @@
+import threading
+import time
+from bisect import bisect_right
+
+from django.conf import settings
+
+from judge.models import Profile
+
+__all__ = ['UserRanks', 'user_ranks']
+
+
+class UserRanks(object):
+    """The performance points and ratings of all listed users, sorted and kept in each process, so that ranking a user
+    is a binary search rather than a count over every profile.
+
+    They are reloaded every DMOJ_USER_RANK_INTERVAL seconds, so ranks may lag behind by that much.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = None
+        self.points = []
+        self.ratings = []
+
+    def _load(self):
+        listed = Profile.objects.filter(is_unlisted=False)
+        self.points = sorted(listed.values_list('performance_points', flat=True))
+        self.ratings = sorted(listed.filter(rating__isnull=False).values_list('rating', flat=True))
+        self.loaded = time.monotonic()
+
+    def get(self):
+        with self.lock:
+            if self.loaded is None or time.monotonic() - self.loaded >= settings.DMOJ_USER_RANK_INTERVAL:
+                self._load()
+            return self.points, self.ratings
+
+    def points_rank(self, performance_points):
+        points, _ = self.get()
+        return len(points) - bisect_right(points, performance_points) + 1
+
+    def rating_rank(self, rating):
+        _, ratings = self.get()
+        return len(ratings) - bisect_right(ratings, rating) + 1
+
+    def rated_users(self):
+        _, ratings = self.get()
+        return len(ratings)
+
+
+user_ranks = UserRanks()
@@ -1,19 +1,26 @@
+import csv
+import hashlib
+import json
 from operator import attrgetter
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Count, F, OuterRef, Prefetch, Q, Subquery
-from django.http import Http404, JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.utils.functional import cached_property
 from django.views.generic.detail import BaseDetailView
 from django.views.generic.list import BaseListView
 
 from judge.models import (
-    Contest, ContestParticipation, ContestTag, Judge, Language, Organization, Problem, ProblemType, Profile, Rating,
-    Submission,
+    Contest, ContestParticipation, ContestProblem, ContestTag, Judge, Language, LanguageLimit, Organization, Problem,
+    ProblemGroup, ProblemType, Profile, Rating, Submission,
 )
-from judge.utils.infinite_paginator import InfinitePaginationMixin
+from judge.utils.api_cache import get_etag, get_model_versions
+from judge.utils.infinite_paginator import InfinitePaginationMixin, keyset_paginate
 from judge.utils.raw_sql import join_sql_subquery, use_straight_join
 from judge.views.submission import group_test_cases
 
@@ -67,6 +74,11 @@ class APILoginRequiredMixin:
 
 
 class APIMixin:
+    # Responses to anonymous users are cached for this many seconds, or until an object of one of
+    # response_cache_models is saved or deleted. None disables the cache.
+    response_cache_timeout = None
+    response_cache_models = ()
+
     @cached_property
     def _now(self):
         return timezone.now()
@@ -86,9 +98,6 @@ class APIMixin:
         resp.update(kwargs)
         return resp
 
-    def get_data(self, context):
-        return self.get_base_response(data=self.get_api_data(context))
-
     def get_error(self, exception):
         caught_exceptions = {
             ValueError: (400, 'invalid filter value type'),
@@ -110,11 +119,28 @@ class APIMixin:
         else:
             raise exception
 
+    def get_response_cache_key(self):
+        """Returns the key the response to the request is cached under, or None if it must not be cached."""
+        request = self.request
+        if self.response_cache_timeout is None or request.method != 'GET' or request.user.is_authenticated:
+            return None
+        return 'api_v2:%s:%s:%s' % (type(self).__name__, get_model_versions(self.response_cache_models),
+                                    hashlib.sha1(request.get_full_path().encode()).hexdigest())
+
+    def get_etag_response(self, etag, data, **response_kwargs):
+        # The ETag covers only the data, not when it was fetched, so that unchanged data is not sent again.
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            response = JsonResponse(self.get_base_response(data=data), **response_kwargs)
+        response['ETag'] = etag
+        return response
+
     def render_to_response(self, context, **response_kwargs):
-        return JsonResponse(
-            self.get_data(context),
-            **response_kwargs,
-        )
+        data = self.get_api_data(context)
+        etag = get_etag(data)
+        if self.response_cache_key is not None:
+            cache.set(self.response_cache_key, (etag, data), self.response_cache_timeout)
+        return self.get_etag_response(etag, data, **response_kwargs)
 
     def setup_api(self, request, *args, **kwargs):
         pass
@@ -122,11 +148,27 @@ class APIMixin:
     def dispatch(self, request, *args, **kwargs):
         try:
             self.setup_api(request, *args, **kwargs)
+            self.response_cache_key = self.get_response_cache_key()
+            if self.response_cache_key is not None:
+                cached = cache.get(self.response_cache_key)
+                if cached is not None:
+                    return self.get_etag_response(*cached)
             return super().dispatch(request, *args, **kwargs)
         except Exception as e:
             return self.get_error(e)
 
 
+def get_response_cache_models():
+    """Returns the set of models whose changes invalidate the cached responses of some API view."""
+    models = set()
+    views = [APIMixin]
+    while views:
+        view = views.pop()
+        models.update(view.response_cache_models)
+        views.extend(view.__subclasses__())
+    return models
+
+
 class APIListView(APIMixin, InfinitePaginationMixin, BaseListView):
     paginate_by = settings.DMOJ_API_PAGE_SIZE
     basic_filters = ()
@@ -180,6 +222,8 @@ class APIListView(APIMixin, InfinitePaginationMixin, BaseListView):
             'has_more': page.has_next(),
             'objects': [self.get_object_data(obj) for obj in objects],
         }
+        if self.cursor_order is not None:
+            result['next_' + self.cursor_kwarg] = self.get_next_cursor(page)
         if not page.paginator.is_infinite:
             result['total_objects'] = page.paginator.count
             result['total_pages'] = page.paginator.num_pages
@@ -195,6 +239,8 @@ class APIDetailView(APIMixin, BaseDetailView):
 
 class APIContestList(APIListView):
     model = Contest
+    response_cache_timeout = settings.DMOJ_API_CACHE_TIMEOUT
+    response_cache_models = (Contest, ContestTag)
     basic_filters = (
         ('is_rated', 'is_rated'),
     )
@@ -231,6 +277,8 @@ class APIContestList(APIListView):
 
 class APIContestDetail(APIDetailView):
     model = Contest
+    response_cache_timeout = settings.DMOJ_API_CACHE_TIMEOUT
+    response_cache_models = (Contest, ContestProblem, ContestParticipation, Rating, Problem)
     slug_field = 'key'
     slug_url_kwarg = 'contest'
 
@@ -327,6 +375,7 @@ class APIContestDetail(APIDetailView):
 
 class APIContestParticipationList(APIListView):
     model = ContestParticipation
+    cursor_order = 'id'
     basic_filters = (
         ('contest', 'contest__key'),
         ('user', 'user__user__username'),
@@ -388,6 +437,9 @@ class APIContestParticipationList(APIListView):
 
 class APIProblemList(APIListView):
     model = Problem
+    cursor_order = 'code'
+    response_cache_timeout = settings.DMOJ_API_CACHE_TIMEOUT
+    response_cache_models = (Problem, ProblemGroup, ProblemType)
     basic_filters = (
         ('partial', 'partial'),
     )
@@ -435,6 +487,8 @@ class APIProblemList(APIListView):
 
 class APIProblemDetail(APIDetailView):
     model = Problem
+    response_cache_timeout = settings.DMOJ_API_CACHE_TIMEOUT
+    response_cache_models = (Problem, ProblemGroup, ProblemType, LanguageLimit, Language)
     slug_field = 'code'
     slug_url_kwarg = 'problem'
 
@@ -476,6 +530,7 @@ class APIProblemDetail(APIDetailView):
 
 class APIUserList(APIListView):
     model = Profile
+    cursor_order = 'id'
     list_filters = (
         ('organization', 'organizations'),
     )
@@ -566,6 +621,7 @@ class APIUserDetail(APIDetailView):
 
 class APISubmissionList(APIListView):
     model = Submission
+    cursor_order = 'id'
     basic_filters = (
         ('user', ProfileSimpleFilter('user')),
         ('problem', ProblemSimpleFilter('problem')),
@@ -678,6 +734,8 @@ class APISubmissionDetail(APILoginRequiredMixin, APIDetailView):
 
 class APIOrganizationList(APIListView):
     model = Organization
+    response_cache_timeout = settings.DMOJ_API_CACHE_TIMEOUT
+    response_cache_models = (Organization,)
     basic_filters = (
         ('is_open', 'is_open'),
     )
@@ -697,6 +755,8 @@ class APIOrganizationList(APIListView):
 
 class APILanguageList(APIListView):
     model = Language
+    response_cache_timeout = settings.DMOJ_API_CACHE_TIMEOUT
+    response_cache_models = (Language,)
     basic_filters = (
         ('common_name', 'common_name'),
     )
@@ -727,3 +787,79 @@ class APIJudgeList(APIListView):
             'load': judge.load,
             'languages': list(judge.runtimes.values_list('key', flat=True)),
         }
+
+
+class CSVBuffer:
+    def write(self, value):
+        return value
+
+
+class APIExportMixin:
+    """Streams every object of a list, in the format given by ?format=: newline-delimited JSON, or CSV.
+
+    Objects are loaded in chunks of DMOJ_API_EXPORT_CHUNK_SIZE with keyset pagination, which keeps the memory of the
+    server constant however much is exported, unlike a single query whose results the MySQL client buffers in full.
+    """
+    formats = ('ndjson', 'csv')
+    export_name = None
+
+    def iter_objects(self, queryset):
+        after = None
+        while True:
+            page = keyset_paginate(queryset, self.cursor_order, after, settings.DMOJ_API_EXPORT_CHUNK_SIZE)
+            yield from map(self.get_object_data, page)
+            after = page.next_cursor
+            if after is None:
+                return
+
+    def stream_ndjson(self, objects):
+        for data in objects:
+            yield json.dumps(data, cls=DjangoJSONEncoder) + '\n'
+
+    def stream_csv(self, objects):
+        writer = None
+        for data in objects:
+            if writer is None:
+                writer = csv.DictWriter(CSVBuffer(), fieldnames=list(data))
+                yield writer.writeheader()
+            yield writer.writerow({
+                key: json.dumps(value, cls=DjangoJSONEncoder) if isinstance(value, (dict, list)) else value
+                for key, value in data.items()
+            })
+
+    def get(self, request, *args, **kwargs):
+        format = request.GET.get('format', 'ndjson')
+        if format not in self.formats:
+            raise ValueError('invalid export format: %s' % format)
+
+        objects = self.iter_objects(self.get_queryset())
+        if format == 'csv':
+            response = StreamingHttpResponse(self.stream_csv(objects), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(self.stream_ndjson(objects), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename=%s.%s' % (self.export_name, format)
+        return response
+
+
+class APISubmissionExport(APIExportMixin, APISubmissionList):
+    export_name = 'submissions'
+    basic_filters = APISubmissionList.basic_filters + (
+        ('contest', 'contest_object__key'),
+        ('min_id', 'id__gte'),
+        ('max_id', 'id__lte'),
+    )
+
+
+class APIContestParticipationExport(APIExportMixin, APIContestParticipationList):
+    export_name = 'participations'
+
+    def get_unfiltered_queryset(self):
+        queryset = super().get_unfiltered_queryset()
+        fields, _ = queryset.query.deferred_loading
+        return queryset.only(*fields, 'format_data')
+
+    def get_object_data(self, participation):
+        data = super().get_object_data(participation)
+        data['id'] = participation.id
+        data['format_data'] = participation.format_data
+        return data
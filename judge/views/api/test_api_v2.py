@@ -0,0 +1,131 @@
+import csv
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from judge.models import Language, Problem, ProblemClarification, Submission
+from judge.models.tests.util import create_contest, create_contest_participation, create_problem, create_user
+from judge.utils.api_cache import get_model_versions
+from judge.views.api.api_v2 import APIContestParticipationExport, APIProblemDetail, APIProblemList, APISubmissionExport
+
+
+@override_settings(DMOJ_API_EXPORT_CHUNK_SIZE=2)
+class APIExportTestCase(TestCase):
+    fixtures = ['language_all.json']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(username='exporter')
+        public = create_problem(code='public', is_public=True)
+        hidden = create_problem(code='hidden', is_public=False)
+        contest = create_contest(key='exported', is_visible=True, start_time=timezone.now() - timedelta(days=2),
+                                 end_time=timezone.now() - timedelta(days=1))
+        cls.participation = create_contest_participation(contest=contest, user='exporter', virtual=0,
+                                                         format_data={'1': {'points': 100}})
+
+        language = Language.objects.get(key='PY2')
+        cls.submissions = [
+            Submission.objects.create(user=cls.user.profile, problem=problem, language=language, result='AC',
+                                      contest_object=contest if i % 2 else None)
+            for i, problem in enumerate([public] * 5 + [hidden])
+        ]
+
+    def export(self, view, **params):
+        request = RequestFactory().get('/api/v2/export/', params)
+        request.user = AnonymousUser()
+        request.profile = None
+        return view.as_view()(request)
+
+    def export_ids(self, **params):
+        response = self.export(APISubmissionExport, **params)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line)['id'] for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_submissions(self):
+        ids = [submission.id for submission in self.submissions[:5]]
+        with self.assertNumQueries(3):
+            self.assertEqual(self.export_ids(), ids)
+        self.assertEqual(self.export_ids(contest='exported'), ids[1::2])
+        self.assertEqual(self.export_ids(min_id=ids[1], max_id=ids[3], user='exporter'), ids[1:4])
+        self.assertEqual(self.export_ids(problem='hidden'), [])
+
+    def test_csv(self):
+        response = self.export(APIContestParticipationExport, format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], str(self.participation.id))
+        self.assertEqual(rows[0]['user'], 'exporter')
+        self.assertEqual(json.loads(rows[0]['format_data']), {'1': {'points': 100}})
+
+    def test_invalid_format(self):
+        self.assertEqual(self.export(APISubmissionExport, format='xml').status_code, 400)
+
+
+class APIResponseCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(username='cached')
+        create_problem(code='cached', is_public=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, view, user=None, **headers):
+        request = RequestFactory().get('/api/v2/problem/cached', **headers)
+        request.user = user or AnonymousUser()
+        request.profile = getattr(request.user, 'profile', None)
+        return view.as_view()(request, problem='cached')
+
+    def test_cache(self):
+        response = self.get(APIProblemDetail)
+        etag = response['ETag']
+        self.assertEqual(json.loads(response.content)['data']['object']['code'], 'cached')
+
+        with self.assertNumQueries(0):
+            response = self.get(APIProblemDetail)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['data']['object']['code'], 'cached')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(APIProblemDetail, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(APIProblemDetail, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+        problem = Problem.objects.get(code='cached')
+        problem.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            problem.save()
+        response = self.get(APIProblemDetail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['data']['object']['name'], 'Renamed')
+
+    def test_model_changes(self):
+        problem = Problem.objects.get(code='cached')
+        versions = get_model_versions([Problem, ProblemClarification])
+        with self.captureOnCommitCallbacks(execute=True):
+            ProblemClarification.objects.create(problem=problem, description='unrelated')
+        self.assertEqual(get_model_versions([Problem, ProblemClarification]), versions)
+
+        # Statistics are changed with QuerySet.update(), which sends no signals.
+        with self.captureOnCommitCallbacks(execute=True):
+            Problem.count_submissions(problem.id, 1)
+        self.assertNotEqual(get_model_versions([Problem]), versions.split('.')[0])
+
+    def test_views(self):
+        # Keyed by view, not only by path.
+        self.get(APIProblemDetail)
+        self.assertIn('objects', json.loads(self.get(APIProblemList).content)['data'])
+
+    def test_authenticated(self):
+        for user in (self.user, self.user, None):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get(APIProblemDetail, user=user)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(queries)
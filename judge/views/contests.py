@@ -17,7 +17,7 @@ from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
 from django.db import IntegrityError
 from django.db.models import Case, Count, F, FloatField, IntegerField, Max, Min, Q, Sum, Value, When
 from django.db.models.expressions import CombinedExpression
-from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.template.defaultfilters import date as date_filter
 from django.urls import reverse
@@ -28,7 +28,7 @@ from django.utils.safestring import mark_safe
 from django.utils.timezone import make_aware
 from django.utils.translation import gettext as _, gettext_lazy
 from django.views.generic import ListView, TemplateView, CreateView
-from django.template.loader import get_template
+from django.template.loader import get_template, render_to_string
 from django.views.generic.detail import BaseDetailView, DetailView, SingleObjectMixin, View
 from reversion import revisions
 
@@ -46,6 +46,9 @@ from judge.utils.celery import redirect_to_task_status
 from judge.utils.opengraph import generate_opengraph
 from judge.utils.problems import _get_result_data
 from judge.utils.ranker import ranker
+from judge.utils.scoreboard import ContestScoreboard, base_contest_ranking_list, get_contest_problems, \
+    make_contest_ranking_profile
+from judge.utils.session_state import SessionState
 from judge.utils.stats import get_bar_chart, get_pie_chart
 from judge.utils.views import DiggPaginatorMixin, QueryStringSortMixin, SingleObjectFormView, TitleMixin, add_file_response, \
     generic_message
@@ -311,6 +314,7 @@ class ContestClone(ContestMixin, PermissionRequiredMixin, TitleMixin, SingleObje
             for problem in contest_problems:
                 problem.contest = contest
                 problem.pk = None
+                problem.first_accept = None
             ContestProblem.objects.bulk_create(contest_problems)
 
             revisions.set_user(self.request.user)
@@ -407,6 +411,7 @@ class ContestJoin(LoginRequiredMixin, ContestMixin, BaseDetailView):
 
         profile.current_contest = participation
         profile.save()
+        SessionState.invalidate(profile.user_id)
         contest._updating_stats_only = True
         contest.update_user_count()
         return HttpResponseRedirect(reverse('problem_list'))
@@ -603,61 +608,16 @@ class ContestStats(TitleMixin, ContestMixin, DetailView):
         return context
 
 
-ContestRankingProfile = namedtuple(
-    'ContestRankingProfile',
-    'id user css_class username points cumtime tiebreaker organization participation '
-    'participation_rating problem_cells result_cell',
-)
-
 BestSolutionData = namedtuple('BestSolutionData', 'code points time state is_pretested')
 
 
-def make_contest_ranking_profile(contest, participation, contest_problems):
-    def display_user_problem(contest_problem):
-        # When the contest format is changed, `format_data` might be invalid.
-        # This will cause `display_user_problem` to error, so we display '???' instead.
-        try:
-            return contest.format.display_user_problem(participation, contest_problem)
-        except (KeyError, TypeError, ValueError):
-            return mark_safe('<td>???</td>')
-
-    user = participation.user
-    return ContestRankingProfile(
-        id=user.id,
-        user=user.user,
-        css_class=user.css_class,
-        username=user.username,
-        points=participation.score,
-        cumtime=participation.cumtime,
-        tiebreaker=participation.tiebreaker,
-        organization=user.organization,
-        participation_rating=participation.rating.rating if hasattr(participation, 'rating') else None,
-        problem_cells=[display_user_problem(contest_problem) for contest_problem in contest_problems],
-        result_cell=contest.format.display_participation_result(participation),
-        participation=participation,
-    )
-
-
-def base_contest_ranking_list(contest, problems, queryset):
-    return [make_contest_ranking_profile(contest, participation, problems) for participation in
-            queryset.select_related('user__user', 'rating').defer('user__about', 'user__organizations__about')]
-
-
 def contest_ranking_list(contest, problems):
-    return base_contest_ranking_list(contest, problems, contest.users.filter(virtual=0)
-                                     .prefetch_related('user__organizations')
-                                     .order_by('is_disqualified', '-score', 'cumtime', 'tiebreaker'))
+    return ContestScoreboard(contest).ranking()
 
 
 def get_contest_ranking_list(request, contest, participation=None, ranking_list=contest_ranking_list,
                              show_current_virtual=True, ranker=ranker):
-    problems = list(contest.contest_problems.select_related('problem').defer('problem__description').order_by('order'))
-
-    contest_problems = ContestProblem.objects.filter(contest=contest)
-
-    for problem in contest_problems:
-        problem.update_first_accept()
-
+    problems = get_contest_problems(contest)
     users = ranker(ranking_list(contest, problems), key=attrgetter('points', 'cumtime', 'tiebreaker'))
 
     if show_current_virtual:
@@ -678,12 +638,41 @@ def contest_ranking_ajax(request, contest, participation=None):
     if not contest.can_see_full_scoreboard(request.user):
         raise Http404()
 
-    users, problems = get_contest_ranking_list(request, contest, participation)
-    return render(request, 'contest/ranking-table.html', {
-        'users': users,
-        'problems': problems,
-        'contest': contest,
-        'has_rating': contest.ratings.exists(),
+    if 'version' not in request.GET or participation is not None:
+        users, problems = get_contest_ranking_list(request, contest, participation)
+        return render(request, 'contest/ranking-table.html', {
+            'users': users,
+            'problems': problems,
+            'contest': contest,
+            'has_rating': contest.ratings.exists(),
+        })
+
+    # Pollers pass the version of the scoreboard they have, and get back the rows changed since then, along with the
+    # new ranks of every user.
+    try:
+        since = int(request.GET['version'])
+    except ValueError:
+        return HttpResponseBadRequest('Invalid version', content_type='text/plain')
+
+    scoreboard = ContestScoreboard(contest)
+    changes = scoreboard.changes_since(since)
+    if changes is None:
+        version = scoreboard.current_version()
+        ranking, changed = scoreboard.ranking(), None
+    else:
+        version, ranking, changed = changes
+
+    users = list(ranker(ranking, key=attrgetter('points', 'cumtime', 'tiebreaker')))
+    return JsonResponse({
+        'version': version,
+        'full': changed is None,
+        'ranks': [[user.username, rank] for rank, user in users],
+        'html': render_to_string('contest/ranking-table.html', {
+            'users': [(rank, user) for rank, user in users if changed is None or user.participation.id in changed],
+            'problems': get_contest_problems(contest),
+            'contest': contest,
+            'has_rating': contest.ratings.exists(),
+        }, request),
     })
 
 
@@ -715,6 +704,7 @@ class ContestRankingBase(LoginRequiredMixin, ContestMixin, TitleMixin, DetailVie
 
 class ContestRanking(ContestRankingBase):
     tab = 'ranking'
+    scoreboard_version = None
 
     def get_title(self):
         return _('%s Rankings') % self.object.name
@@ -728,11 +718,13 @@ class ContestRanking(ContestRankingBase):
                 ranker=lambda users, key: ((_('???'), user) for user in users),
             )
 
+        self.scoreboard_version = ContestScoreboard(self.object).current_version()
         return get_contest_ranking_list(self.request, self.object)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['has_rating'] = self.object.ratings.exists()
+        context['scoreboard_version'] = self.scoreboard_version
         return context
 
 
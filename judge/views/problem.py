@@ -4,7 +4,7 @@ import os
 import shutil
 import zipfile
 from datetime import timedelta
-from operator import itemgetter
+from operator import attrgetter, itemgetter
 from random import randrange
 
 from django.conf import settings
@@ -41,8 +41,10 @@ from judge.models.contest import Contest
 from judge.models.problem import ProblemClass
 from judge.models.problem_data import ProblemData, ProblemTestCase, PublicSolution, SolutionVote
 from judge.pdf_problems import DefaultPdfMaker, HAS_PDF
+from judge.user_translations import gettext as user_gettext
 from judge.utils.diggpaginator import DiggPaginator
 from judge.utils.opengraph import generate_opengraph
+from judge.utils.problem_index import IndexedProblemList, problem_index
 from judge.utils.problems import contest_attempted_ids, contest_completed_ids, hot_problems, user_attempted_ids, \
     user_completed_ids
 from judge.utils.strings import safe_float_or_none, safe_int_or_none
@@ -313,6 +315,11 @@ class ProblemList(QueryStringSortMixin, TitleMixin, SolvedProblemMixin, ListView
 
     def get_paginator(self, queryset, per_page, orphans=0,
                       allow_empty_first_page=True, **kwargs):
+        if isinstance(queryset, IndexedProblemList):
+            self.sort_indexed_problems(queryset)
+            return DiggPaginator(queryset, per_page, body=6, padding=2, orphans=orphans,
+                                 allow_empty_first_page=allow_empty_first_page, **kwargs)
+
         paginator = DiggPaginator(queryset, per_page, body=6, padding=2, orphans=orphans,
                                   allow_empty_first_page=allow_empty_first_page, **kwargs)
         if not self.in_contest:
@@ -350,6 +357,33 @@ class ProblemList(QueryStringSortMixin, TitleMixin, SolvedProblemMixin, ListView
             paginator.object_list = queryset
         return paginator
 
+    def sort_indexed_problems(self, problems):
+        # The same orders as get_paginator gives querysets, ties included.
+        sort_key = self.order.lstrip('-')
+        reverse = self.order.startswith('-')
+        if sort_key in self.sql_sort or sort_key in ('name', 'group'):
+            problems.sort(key=attrgetter('id'))
+
+        if sort_key in self.sql_sort:
+            problems.sort(key=attrgetter(sort_key), reverse=reverse)
+        elif sort_key == 'name':
+            language = self.request.LANGUAGE_CODE
+            problems.sort(key=lambda problem: problem.translations.get(language, problem.name).casefold(),
+                          reverse=reverse)
+        elif sort_key == 'group':
+            group_names = problem_index.group_names
+            problems.sort(key=lambda problem: group_names.get(problem.group_id, ''), reverse=reverse)
+        elif sort_key == 'solved':
+            if self.profile is not None:
+                solved = user_completed_ids(self.profile)
+                attempted = user_attempted_ids(self.profile)
+                problems.sort(key=lambda problem: 1 if problem.id in solved else 0 if problem.id in attempted else -1,
+                              reverse=reverse)
+        elif sort_key == 'type':
+            type_names = problem_index.type_names
+            problems.sort(key=lambda problem: user_gettext(type_names[problem.type_ids[0]]) if problem.type_ids else '',
+                          reverse=reverse)
+
     @cached_property
     def profile(self):
         if not self.request.user.is_authenticated:
@@ -379,7 +413,45 @@ class ProblemList(QueryStringSortMixin, TitleMixin, SolvedProblemMixin, ListView
                                    'problem__group__full_name', 'points', 'partial', 'user_count')]
 
     def get_normal_queryset(self):
+        if 'search' in self.request.GET:
+            self.search_query = ' '.join(self.request.GET.getlist('search')).strip()
+        if self.search_query and settings.ENABLE_FTS and self.full_text:
+            return self.get_database_queryset()
+        return self.get_indexed_problems()
+
+    def get_indexed_problems(self):
+        # The problems of get_database_queryset, filtered in memory against the problem index.
+        profile = self.profile
+        see_organization_problems = self.request.user.has_perm('see_organization_problem')
+        organizations = set()
+        if profile is not None and not see_organization_problems:
+            organizations = set(profile.organizations.values_list('id', flat=True))
+        hidden = user_completed_ids(profile) if profile is not None and self.hide_solved else set()
+        selected_types = set(self.selected_types or ())
+        query = (self.search_query or '').casefold()
+        language = self.request.LANGUAGE_CODE
+
+        def is_listed(problem):
+            if not (problem.is_public or problem.public_description or
+                    profile is not None and profile.id in problem.editor_ids):
+                return False
+            if not see_organization_problems and problem.is_organization_private and \
+                    not problem.public_description and organizations.isdisjoint(problem.organization_ids):
+                return False
+            if problem.id in hidden:
+                return False
+            if self.category is not None and problem.group_id != self.category:
+                return False
+            if selected_types and selected_types.isdisjoint(problem.type_ids):
+                return False
+            return not query or query in problem.code.casefold() or query in problem.name.casefold() or \
+                query in problem.translations.get(language, '').casefold()
+
+        return IndexedProblemList([problem for problem in problem_index.get() if is_listed(problem)], language)
+
+    def get_database_queryset(self):
         filter = Q(is_public=True) | Q(public_description=True)
+
         if self.profile is not None:
             filter |= Q(authors=self.profile)
             filter |= Q(curators=self.profile)
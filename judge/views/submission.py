@@ -21,7 +21,7 @@ from django.views.decorators.http import require_POST
 from django.views.generic import DetailView, ListView
 
 # from judge import event_poster as event
-from judge.highlight_code import highlight_code
+from judge.highlight_code import highlight_code, highlight_code_lines
 from judge.models import Contest, Language, Problem, ProblemTranslation, Profile, Submission, Log
 from judge.utils.infinite_paginator import InfinitePaginationMixin
 from judge.utils.problem_data import get_problem_testcases_data
@@ -88,10 +88,38 @@ class SubmissionSource(SubmissionDetailBase):
             object_title = submission
         )
         context['raw_source'] = submission.source.source.rstrip('\n')
-        context['highlighted_source'] = highlight_code(submission.source.source, submission.language.pygments)
+        if len(submission.source.source) > settings.DMOJ_SUBMISSION_SOURCE_HIGHLIGHT_LIMIT:
+            # Highlighting is left to SubmissionSourceHighlight, a chunk at a time, so the page is shown right away.
+            context['highlighted_source'] = None
+            context['source_chunks'] = get_source_chunks(context['raw_source'])
+        else:
+            context['highlighted_source'] = highlight_code(submission.source.source, submission.language.pygments)
         return context
 
 
+def get_source_chunks(source):
+    lines = source.split('\n')
+    size = settings.DMOJ_SUBMISSION_SOURCE_HIGHLIGHT_CHUNK_LINES
+    return ['\n'.join(lines[i:i + size]) for i in range(0, len(lines), size)]
+
+
+class SubmissionSourceHighlight(SubmissionDetailBase):
+    def get_queryset(self):
+        return super().get_queryset().select_related('source', 'language')
+
+    def get(self, request, *args, **kwargs):
+        if 'chunk' not in request.GET or not request.GET['chunk'].isdigit():
+            return HttpResponseBadRequest()
+        submission = self.get_object()
+        source = submission.source.source.rstrip('\n')
+        size = settings.DMOJ_SUBMISSION_SOURCE_HIGHLIGHT_CHUNK_LINES
+        start = int(request.GET['chunk']) * size
+        if start > source.count('\n'):
+            raise Http404()
+        # The whole source is highlighted once and cached, and each chunk is a slice of its lines.
+        return HttpResponse(highlight_code_lines(source, submission.language.pygments, start, start + size))
+
+
 def make_batch(batch, cases):
     result = {'id': batch, 'cases': cases}
     if batch:
@@ -157,11 +185,12 @@ class SubmissionStatus(SubmissionDetailBase):
         context = super(SubmissionStatus, self).get_context_data(**kwargs)
         submission = self.object
 
-        context['batches'], statuses, context['max_execution_time'] = group_test_cases(submission.test_cases.all())
+        test_cases = list(submission.test_cases.all())
+        context['batches'], statuses, context['max_execution_time'] = group_test_cases(test_cases)
         context['statuses'] = combine_statuses(statuses, submission)
         context['can_view_test'] = submission.problem.is_testcase_accessible_by(self.request.user)
         if context['can_view_test']:
-            context['cases_data'] = get_problem_testcases_data(submission.problem)
+            context['cases_data'] = get_problem_testcases_data(submission.problem, [case.case for case in test_cases])
         else:
             context['cases_data'] = {}
 
@@ -504,6 +533,7 @@ def single_submission(request):
 
 class AllSubmissions(InfinitePaginationMixin, SubmissionsListBase):
     stats_update_interval = 3600
+    cursor_order = '-id'
 
     @property
     def use_infinite_pagination(self):
@@ -517,6 +547,16 @@ class AllSubmissions(InfinitePaginationMixin, SubmissionsListBase):
         context = super(AllSubmissions, self).get_context_data(**kwargs)
         context['dynamic_update'] = context['page_obj'].number == 1
         context['stats_update_interval'] = self.stats_update_interval
+        context['keyset_pagination'] = self.use_keyset_pagination
+        query = self.request.GET.copy()
+        if self.use_keyset_pagination:
+            query.pop(self.cursor_kwarg)
+            context['first_page_href'] = '.' + ('?' + query.urlencode() if query else '')
+        # Numbered pages lead on to cursor pages too, so that paging deeper never needs an OFFSET.
+        next_cursor = self.get_next_cursor(context['page_obj'])
+        if next_cursor is not None:
+            query[self.cursor_kwarg] = next_cursor
+            context['next_page_href'] = '.?' + query.urlencode()
         return context
 
     def _get_result_data(self, queryset=None):
@@ -0,0 +1,121 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+
+from judge import highlight_code
+from judge.models import Language, Submission, SubmissionSource
+from judge.models.tests.util import create_problem, create_user
+from judge.views.submission import AllSubmissions, SubmissionSourceHighlight, get_source_chunks
+
+
+class HighlightCacheTestCase(TestCase):
+    def setUp(self):
+        highlight_code.highlight_cache.clear()
+
+    def highlight(self, code, language):
+        with mock.patch.object(highlight_code.pygments, 'highlight', wraps=highlight_code.pygments.highlight) as lexed:
+            html = highlight_code.highlight_code(code, language)
+        return html, lexed.call_count
+
+    def test_cached(self):
+        html, count = self.highlight('print(1)\n', 'python3')
+        self.assertIn('codehilite', html)
+        self.assertEqual(count, 1)
+        self.assertEqual(self.highlight('print(1)\n', 'python3'), (html, 0))
+        self.assertEqual(self.highlight('print(1)\n', 'cpp')[1], 1)
+        self.assertEqual(self.highlight('unknown', 'no-such-language'), ('<pre>unknown</pre>', 0))
+
+    def test_lines(self):
+        code = 'x = 1\n\ny = 2'
+        self.assertEqual(highlight_code.highlight_code_lines(code, 'python3', 0, 10),
+                         highlight_code.highlight_code(code, 'python3'))
+        self.assertEqual(highlight_code.highlight_code_lines(code, 'no-such-language', 1, 3), '<pre>\ny = 2</pre>')
+
+    def test_eviction(self):
+        first, _ = self.highlight('a = 1\n', 'python3')
+        second, _ = self.highlight('b = 2\n', 'python3')
+        with self.settings(DMOJ_HIGHLIGHT_CACHE_SIZE=len(first) + len(second)):
+            self.highlight('a = 1\n', 'python3')
+            self.highlight('c = 3\n', 'python3')
+            self.assertLessEqual(highlight_code.highlight_cache.size, len(first) + len(second))
+            self.assertEqual(self.highlight('a = 1\n', 'python3')[1], 0)
+            self.assertEqual(self.highlight('b = 2\n', 'python3')[1], 1)
+
+
+@override_settings(DMOJ_SUBMISSION_SOURCE_HIGHLIGHT_CHUNK_LINES=2)
+class SubmissionSourceHighlightTestCase(TestCase):
+    fixtures = ['language_all.json']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(username='highlight', is_superuser=True)
+        submission = Submission.objects.create(user=cls.user.profile, problem=create_problem(code='highlight'),
+                                               language=Language.objects.get(key='PY2'))
+        SubmissionSource.objects.create(submission=submission, source='alpha = 1\n"""\nbeta\n"""\ngamma = 3\n\n')
+        cls.submission = submission
+
+    def get(self, **params):
+        request = RequestFactory().get('/src/%d/highlight' % self.submission.id, params)
+        request.user = self.user
+        return SubmissionSourceHighlight.as_view()(request, submission=str(self.submission.id))
+
+    def test_chunks(self):
+        self.assertEqual(get_source_chunks('a = 1\nb = 2\nc = 3'), ['a = 1\nb = 2', 'c = 3'])
+        first, second, third = (self.get(chunk=chunk).content.decode() for chunk in ('0', '1', '2'))
+        self.assertIn('codehilite', first)
+        self.assertIn('alpha', first)
+        self.assertNotIn('beta', first)
+        # The string opened at the end of the first chunk carries on into the second.
+        self.assertIn('<span class="sd">beta</span>', second)
+        self.assertNotIn('gamma', second)
+        self.assertIn('<span class="n">gamma</span>', third)
+
+    def test_bad_chunk(self):
+        self.assertEqual(self.get().status_code, 400)
+        self.assertEqual(self.get(chunk='x').status_code, 400)
+        with self.assertRaises(Http404):
+            self.get(chunk='3')
+
+
+class AllSubmissionsTestCase(TestCase):
+    fixtures = ['language_all.json']
+
+    @classmethod
+    def setUpTestData(cls):
+        profile = create_user(username='lister').profile
+        problem = create_problem(code='lister', is_public=True)
+        language = Language.objects.get(key='PY2')
+        cls.ids = sorted((Submission.objects.create(user=profile, problem=problem, language=language).id
+                          for _ in range(5)), reverse=True)
+
+    def get(self, page=None, **params):
+        request = RequestFactory().get('/submissions/', params)
+        request.user = AnonymousUser()
+        request.profile = None
+        request.LANGUAGE_CODE = 'en'
+        kwargs = {'page': page} if page else {}
+        response = AllSubmissions.as_view(paginate_by=2)(request, **kwargs)
+        return response.context_data
+
+    def test_after_id(self):
+        context = self.get()
+        self.assertFalse(context['keyset_pagination'])
+        self.assertEqual([submission.id for submission in context['submissions']], self.ids[:2])
+        self.assertEqual(context['next_page_href'], '.?after_id=%d' % self.ids[1])
+
+        context = self.get(after_id=self.ids[1], language_code='PY2')
+        self.assertTrue(context['keyset_pagination'])
+        self.assertEqual([submission.id for submission in context['submissions']], self.ids[2:4])
+        self.assertEqual(context['first_page_href'], '.?language_code=PY2')
+        self.assertEqual(context['next_page_href'], '.?language_code=PY2&after_id=%d' % self.ids[3])
+
+        context = self.get(after_id=self.ids[3])
+        self.assertEqual([submission.id for submission in context['submissions']], self.ids[4:])
+        self.assertNotIn('next_page_href', context)
+
+        # A numbered page leads on to the page after its last submission.
+        self.assertEqual(self.get(page=2)['next_page_href'], '.?after_id=%d' % self.ids[3])
+        with self.assertRaises(Http404):
+            self.get(after_id='x')
@@ -3,7 +3,7 @@ import json
 import os
 import datetime as dt
 from datetime import datetime, timedelta
-from operator import attrgetter, itemgetter
+from operator import itemgetter
 from typing import Any, Dict, Mapping, Optional, Type, Union
 from django.db import models, transaction
 from django.forms.utils import ErrorList
@@ -20,8 +20,6 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.db.models import Count, Max, Min
-from django.db.models.fields import DateField
-from django.db.models.functions import Cast, ExtractYear
 from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
@@ -35,17 +33,18 @@ from django.views.generic import DetailView, FormView, ListView, UpdateView, Vie
 from reversion import revisions
 
 from judge.forms import CustomAuthenticationForm, DownloadDataForm, ProfileForm, newsletter_id, CreateManyUserForm
-from judge.models import Profile, Rating, Submission, Language
+from judge.models import Profile, Submission, Language
 from judge.models.profile import Organization
 from judge.performance_points import get_pp_breakdown
-from judge.ratings import rating_class, rating_progress
+from judge.ratings import get_rating_bounds, rating_class, rating_progress
 from judge.tasks import prepare_user_data
 from judge.utils.celery import task_status_by_id, task_status_url_by_id
+from judge.utils.leaderboard import RankedUserList, leaderboard
 from judge.utils.problems import contest_completed_ids, user_completed_ids
 from judge.utils.pwned import PwnedPasswordsValidator
-from judge.utils.ranker import ranker
 from judge.utils.subscription import Subscription
 from judge.utils.unicode import utf8text
+from judge.utils.user_ranks import user_ranks
 from judge.utils.views import DiggPaginatorMixin, QueryStringSortMixin, TitleMixin, add_file_response, generic_message
 from .contests import ContestRanking
 from judge.widgets.fields import FileInput
@@ -119,15 +118,11 @@ class UserPage(TitleMixin, UserMixin, DetailView):
         rating = self.object.ratings.order_by('-contest__end_time')[:1]
         context['rating'] = rating[0] if rating else None
 
-        context['rank'] = Profile.objects.filter(
-            is_unlisted=False, performance_points__gt=self.object.performance_points,
-        ).count() + 1
+        context['rank'] = user_ranks.points_rank(self.object.performance_points)
 
         if rating:
-            context['rating_rank'] = Profile.objects.filter(
-                is_unlisted=False, rating__gt=self.object.rating,
-            ).count() + 1
-            context['rated_users'] = Profile.objects.filter(is_unlisted=False, rating__isnull=False).count()
+            context['rating_rank'] = user_ranks.rating_rank(self.object.rating)
+            context['rated_users'] = user_ranks.rated_users()
         context.update(self.object.ratings.aggregate(min_rating=Min('rating'), max_rating=Max('rating'),
                                                      contests=Count('contest')))
         return context
@@ -183,30 +178,19 @@ class UserAboutPage(UserPage):
         } for rating in ratings]))
 
         if ratings:
-            user_data = self.object.ratings.aggregate(Min('rating'), Max('rating'))
-            global_data = Rating.objects.aggregate(Min('rating'), Max('rating'))
-            min_ever, max_ever = global_data['rating__min'], global_data['rating__max']
-            min_user, max_user = user_data['rating__min'], user_data['rating__max']
+            min_ever, max_ever = get_rating_bounds()
+            min_user, max_user = context['min_rating'], context['max_rating']
             delta = max_user - min_user
             ratio = (max_ever - max_user) / (max_ever - min_ever) if max_ever != min_ever else 1.0
             context['max_graph'] = max_user + ratio * delta
             context['min_graph'] = min_user + ratio * delta - delta
 
-        submissions = (
-            self.object.submission_set
-            .annotate(date_only=Cast('date', DateField()))
-            .values('date_only').annotate(cnt=Count('id'))
-        )
+        submissions = self.object.daily_submission_counts.filter(count__gt=0).order_by('date') \
+            .values_list('date', 'count')
 
-        context['submission_data'] = mark_safe(json.dumps({
-            date_counts['date_only'].isoformat(): date_counts['cnt'] for date_counts in submissions
-        }))
+        context['submission_data'] = mark_safe(json.dumps({date.isoformat(): count for date, count in submissions}))
         context['submission_metadata'] = mark_safe(json.dumps({
-            'min_year': (
-                self.object.submission_set
-                .annotate(year_only=ExtractYear('date'))
-                .aggregate(min_year=Min('year_only'))['min_year']
-            ),
+            'min_year': submissions[0][0].year if submissions else None,
         }))
         return context
 
@@ -501,18 +485,12 @@ class UserList(QueryStringSortMixin, DiggPaginatorMixin, TitleMixin, ListView):
     default_sort = '-performance_points'
 
     def get_queryset(self):
-        return (Profile.objects.filter(is_unlisted=False, user__is_active=True).order_by(self.order).select_related('user')
-                .only('display_rank', 'user__username', 'points', 'rating', 'performance_points',
-                      'problem_count'))
+        entries, _ = leaderboard.get(self.order)
+        return RankedUserList(entries)
 
     def get_context_data(self, **kwargs):
         context = super(UserList, self).get_context_data(**kwargs)
-        context['users'] = ranker(
-            context['users'],
-            key=attrgetter('performance_points', 'problem_count'),
-            rank=self.paginate_by * (context['page_obj'].number - 1),
-        )
-        context['gold'], context['silver'], context['bronze'] = self.get_queryset()[:3]
+        context['gold'], context['silver'], context['bronze'] = [user for _, user in self.object_list[:3]]
         context['first_page_href'] = '.'
         context.update(self.get_sort_context())
         context.update(self.get_sort_paginate_context())
@@ -544,11 +522,8 @@ def user_ranking_redirect(request):
     except KeyError:
         raise Http404()
     user = get_object_or_404(Profile, user__username=username)
-    rank = Profile.objects.filter(is_unlisted=False, performance_points__gt=user.performance_points).count()
-    rank += Profile.objects.filter(
-        is_unlisted=False, performance_points__exact=user.performance_points, id__lt=user.id,
-    ).count()
-    page = rank // UserList.paginate_by
+    _, positions = leaderboard.get(UserList.default_sort)
+    page = positions.get(user.id, 0) // UserList.paginate_by
     return HttpResponseRedirect('%s%s#!%s' % (reverse('user_list'), '?page=%d' % (page + 1) if page else '', username))
 
 
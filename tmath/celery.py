@@ -22,6 +22,13 @@ if hasattr(settings, 'CELERY_RESULT_BACKEND_SECRET'):
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
+app.conf.beat_schedule = {
+    'sweep-typo-rooms': {
+        'task': 'typeracer.tasks.sweep_typo_rooms',
+        'schedule': 60.0,
+    },
+}
+
 # Logger to enable errors be reported.
 logger = logging.getLogger('judge.celery')
 
@@ -69,6 +69,30 @@ DMOJ_PROBLEM_MIN_PROBLEM_POINTS = 0
 DMOJ_PROBLEM_HOT_PROBLEM_COUNT = 7
 DMOJ_PROBLEM_STATEMENT_DISALLOWED_CHARACTERS = {'“', '”', '‘', '’'}
 DMOJ_RATING_COLORS = True
+# Test case previews show the first this many bytes of each input and answer, and are cached until the data changes.
+TMATH_TESTCASE_VISIBLE_LENGTH = 64
+DMOJ_TESTCASE_PREVIEW_CACHE_TIMEOUT = 86400
+DMOJ_CONTEST_SCOREBOARD_CACHE_TIMEOUT = 86400
+# Contests are rescored this many participations at a time, each batch with one query and one bulk update.
+DMOJ_CONTEST_RESCORE_BATCH_SIZE = 1000
+# How long the middleware trusts its cached check of a user's current contest, see judge.utils.session_state.
+DMOJ_SESSION_STATE_RECHECK = datetime.timedelta(minutes=1)
+DMOJ_SESSION_STATE_CACHE_TIMEOUT = 86400
+# Rendered markdown is cached by content. This many renders are also kept in each process.
+DMOJ_MARKDOWN_CACHE_SIZE = 1000
+DMOJ_MARKDOWN_CACHE_TIMEOUT = 86400
+# Each process reloads the solve rates and user counts of its problem index at most this often, in seconds.
+DMOJ_PROBLEM_INDEX_STATS_INTERVAL = 10
+# Each process reloads the points and ratings it ranks users by at most this often, in seconds.
+DMOJ_USER_RANK_INTERVAL = 300
+# Each process rebuilds its snapshot of the leaderboard after changes at most this often, in seconds.
+DMOJ_LEADERBOARD_INTERVAL = 60
+# The lowest and highest ratings ever, which rating graphs are scaled by, are cached until a contest is rated.
+DMOJ_RATING_BOUNDS_CACHE_TIMEOUT = 86400
+# Contests with more rated users than this have their expected ranks approximated on a grid of ratings and
+# volatilities, with DMOJ_RATING_APPROXIMATE_RESOLUTION spacing. Needs numpy.
+DMOJ_RATING_APPROXIMATE_ABOVE = None
+DMOJ_RATING_APPROXIMATE_RESOLUTION = (10, 50)
 DMOJ_EMAIL_THROTTLING = (10, 60)
 DMOJ_STATS_LANGUAGE_THRESHOLD = 10
 DMOJ_SUBMISSIONS_REJUDGE_LIMIT = 10
@@ -76,6 +100,11 @@ DMOJ_SUBMISSIONS_REJUDGE_LIMIT = 10
 DMOJ_SUBMISSION_LIMIT = 2
 # Whether to allow users to view source code: 'all' | 'all-solved' | 'only-own'
 DMOJ_SUBMISSION_SOURCE_VISIBILITY = 'all-solved'
+# Highlighted code is kept in each process up to this many characters in total.
+DMOJ_HIGHLIGHT_CACHE_SIZE = 16 * 1024 * 1024
+# Sources longer than this many characters are highlighted by the browser requesting this many lines at a time.
+DMOJ_SUBMISSION_SOURCE_HIGHLIGHT_LIMIT = 16384
+DMOJ_SUBMISSION_SOURCE_HIGHLIGHT_CHUNK_LINES = 200
 DMOJ_BLOG_NEW_PROBLEM_COUNT = 7
 DMOJ_BLOG_RECENTLY_ATTEMPTED_PROBLEMS_COUNT = 7
 DMOJ_TOTP_TOLERANCE_HALF_MINUTES = 1
@@ -96,6 +125,8 @@ DMOJ_STATS_SUBMISSION_RESULT_COLORS = {
     'ERR': '#ffa71c',
 }
 DMOJ_API_PAGE_SIZE = 1000
+DMOJ_API_EXPORT_CHUNK_SIZE = 1000
+DMOJ_API_CACHE_TIMEOUT = 60
 
 MARKDOWN_STYLES = {}
 MARKDOWN_DEFAULT_STYLE = {}
@@ -479,6 +510,15 @@ BRIDGED_JUDGE_ADDRESS = [('localhost', 9999)]
 BRIDGED_JUDGE_PROXIES = None
 BRIDGED_DJANGO_ADDRESS = [('localhost', 9998)]
 BRIDGED_DJANGO_CONNECT = None
+# Number of idle persistent connections each Django process keeps to the bridge; 0 opens one per request.
+BRIDGED_DJANGO_POOL_SIZE = 0
+# Seconds of inactivity after which the bridge closes a connection from Django, and Django stops reusing it.
+BRIDGED_DJANGO_IDLE_TIMEOUT = 60
+# Size of the thread pool handling packets, and so database work, in `runbridged --asyncio` mode.
+BRIDGED_DB_WORKERS = 8
+# Seconds the bridge waits to coalesce user points and contest result updates after grading; None does them right
+# away, on the thread handling the judge.
+BRIDGED_POST_GRADING_DELAY = 1
 
 # Event Server configuration
 EVENT_DAEMON_USE = False
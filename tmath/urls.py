@@ -176,6 +176,8 @@ urlpatterns = [
 
     path('src/<slug:submission>', submission.SubmissionSource.as_view(), name='submission_source'),
     path('src/<slug:submission>/raw', submission.SubmissionSourceRaw.as_view(), name='submission_source_raw'),
+    path('src/<slug:submission>/highlight', submission.SubmissionSourceHighlight.as_view(),
+         name='submission_source_highlight'),
 
     path('submission/<slug:submission>', include([
         path('', submission.SubmissionStatus.as_view(), name='submission_status'),
@@ -312,6 +314,10 @@ urlpatterns = [
             path('participations', api.api_v2.APIContestParticipationList.as_view()),
             path('languages', api.api_v2.APILanguageList.as_view()),
             path('judges', api.api_v2.APIJudgeList.as_view()),
+            path('export/', include([
+                path('submissions', api.api_v2.APISubmissionExport.as_view()),
+                path('participations', api.api_v2.APIContestParticipationExport.as_view()),
+            ])),
         ])),
     ])),
 
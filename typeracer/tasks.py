@@ -0,0 +1,12 @@
+from celery import shared_task
+
+from typeracer.models import TypoRoom
+
+__all__ = ('sweep_typo_rooms',)
+
+
+@shared_task
+def sweep_typo_rooms():
+    # Releases the contests of random rooms once they are over, so that the next player to join starts a new one.
+    rooms = TypoRoom.objects.filter(is_random=True, contest__isnull=False).select_related('contest')
+    return TypoRoom.objects.filter(id__in=[room.id for room in rooms if room.contest.ended]).update(contest=None)
@@ -1,3 +1,20 @@
 from django.test import TestCase
+from django.utils import timezone
 
-# Create your tests here.
+from typeracer.models import TypoContest, TypoRoom
+from typeracer.tasks import sweep_typo_rooms
+
+
+class SweepTypoRoomsTestCase(TestCase):
+    def test_sweep(self):
+        _now = timezone.now()
+        ended = TypoContest.objects.create(time_start=_now - timezone.timedelta(minutes=10), time_join=_now, limit=60)
+        running = TypoContest.objects.create(time_start=_now, time_join=_now, limit=300)
+        rooms = [
+            TypoRoom.objects.create(name='ended', contest=ended),
+            TypoRoom.objects.create(name='running', contest=running),
+            TypoRoom.objects.create(name='fixed', contest=ended, is_random=False),
+        ]
+
+        self.assertEqual(sweep_typo_rooms(), 1)
+        self.assertEqual([TypoRoom.objects.get(id=room.id).contest for room in rooms], [None, running, ended])
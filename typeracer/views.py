@@ -10,6 +10,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 # from judge import event_poster as event
 from judge.models import Profile
+from judge.utils.session_state import SessionState
 import datetime
 from random import randint
 
@@ -68,6 +69,7 @@ def finishTypoContest(request):
     result.order = rank + 1
     result.is_finish = True
     result.save()
+    SessionState.invalidate(int(user))
     # event.post('typocontestresult_%s' % contest, {
     #   'user': user,
     #   'ranking': get_rank(rank),